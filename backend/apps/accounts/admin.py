@@ -1,5 +1,5 @@
 from django.contrib import admin
 from .models import *
 
-for model in [User, UserProfile, UserApprovalRequest, PasswordHistory, LoginAttempt]:
+for model in [User, UserProfile, UserApprovalRequest, PasswordHistory, LoginAttempt, LoginAttemptSummary]:
     admin.site.register(model) 
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Authentification JWT avec résolution de l'utilisateur depuis le cache
+
+``JWTAuthentication`` charge la ligne complète de l'utilisateur (dont les
+colonnes texte motivation, expérience, user agent...) à chaque requête.
+``CachedJWTAuthentication`` ne charge que les colonnes utiles aux permissions
+et les garde en cache quelques secondes, sous une clé versionnée par
+utilisateur : les requêtes authentifiées évitent un aller-retour en base.
+
+Les autres colonnes restent accessibles (chargement différé par Django). Le
+cache est invalidé par ``User.save`` lorsqu'un champ mis en cache, le rôle,
+le statut, ``is_active`` ou le mot de passe change ; les ``update()`` qui
+touchent ces colonnes appellent ``invalidate_auth_user`` explicitement.
+
+Le cache doit être partagé entre processus (Redis, ``CACHES`` de base) :
+sinon une invalidation n'atteint que le worker qui l'a faite (contrôle
+``accounts.W001``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.core.utils import cache_key_for_user
+
+# Colonnes nécessaires à l'authentification et à la couche de permissions
+AUTH_USER_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name',
+    'role', 'status', 'is_active', 'is_staff', 'is_superuser',
+    'is_verified', 'must_change_password', 'password_changed_at', 'last_login',
+)
+
+def auth_user_cache_key(user_id) -> str:
+    """Clé de cache de l'utilisateur authentifié"""
+    return cache_key_for_user(str(user_id), 'auth_user')
+
+def _cache_options():
+    config = settings.AUTH_USER_CACHE
+    return config.get('TIMEOUT', 60), config.get('VERSION', 1)
+
+def _auth_fields(user_model):
+    """Colonnes chargées, dans l'ordre des champs du modèle (attendu par ``from_db``)"""
+    wanted = set(AUTH_USER_FIELDS)
+    # Avec la révocation des tokens au changement de mot de passe (simplejwt),
+    # le hash est comparé à chaque requête : il doit être en cache.
+    if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False):
+        wanted.add('password')
+    return tuple(field.attname for field in user_model._meta.concrete_fields if field.attname in wanted)
+
+def invalidate_auth_user(user_id):
+    """Supprime l'utilisateur du cache d'authentification"""
+    _, version = _cache_options()
+    cache.delete(auth_user_cache_key(user_id), version=version)
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Authentification JWT dont l'utilisateur est résolu depuis le cache"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        fields = _auth_fields(self.user_model)
+        timeout, version = _cache_options()
+        key = auth_user_cache_key(user_id)
+
+        values = cache.get(key, version=version)
+        if values is None or len(values) != len(fields):
+            values = self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*fields).first()
+            if values is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, values, timeout, version=version)
+
+        user = self.user_model.from_db(router.db_for_read(self.user_model), fields, values)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False):
+            from rest_framework_simplejwt.utils import get_md5_hash_password
+
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
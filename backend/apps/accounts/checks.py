@@ -0,0 +1,37 @@
+"""
+Contrôles système de l'authentification
+
+``CachedJWTAuthentication`` garde les utilisateurs en cache : un blocage de
+compte ou un changement de rôle n'est visible de tous les workers que si le
+cache est partagé entre processus.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Tags, Warning, register
+
+CACHED_AUTHENTICATION = 'apps.accounts.authentication.CachedJWTAuthentication'
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+
+@register(Tags.caches)
+def check_auth_user_cache(app_configs, **kwargs):
+    """Le cache d'authentification doit être partagé entre processus"""
+    authentication_classes = settings.REST_FRAMEWORK.get('DEFAULT_AUTHENTICATION_CLASSES', [])
+    if CACHED_AUTHENTICATION not in authentication_classes:
+        return []
+    backend = type(caches['default'])
+    if f"{backend.__module__}.{backend.__qualname__}" not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'CachedJWTAuthentication utilise un cache local au processus',
+        hint=(
+            "Un compte bloqué ou désactivé resterait authentifié sur les autres "
+            "workers jusqu'à expiration : configurez un cache partagé (Redis) "
+            "dans CACHES['default']."
+        ),
+        id='accounts.W001',
+    )]
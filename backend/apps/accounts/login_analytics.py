@@ -0,0 +1,306 @@
+"""
+Analyse des tentatives de connexion (détection d'anomalies)
+
+La tâche ``analyze_login_attempts`` reprend les ``LoginAttempt`` après le
+dernier identifiant traité (point haut conservé dans Redis) et, pour chaque
+lot, calcule avec NumPy des statistiques sur une fenêtre glissante de
+``WINDOW_SECONDS`` secondes se terminant à la dernière tentative du lot :
+
+* par compte : taux d'échec, nombre d'IP distinctes, connexions réussies
+  depuis des User-Agents jamais vus pour ce compte ;
+* par IP : taux d'échec, nombre de comptes distincts visés.
+
+Seules les tentatives des comptes et IP présents dans le lot sont relues
+(index ``(email, timestamp)`` et ``(ip_address, timestamp)``) : le coût suit
+le volume de nouvelles tentatives, pas la taille de la table. Les anomalies
+deviennent des ``SecurityIncident`` (prolongés tant qu'elles persistent).
+
+``rollup_login_attempts`` regroupe les tentatives de plus de
+``RETENTION_DAYS`` jours en ``LoginAttemptSummary`` horaires, puis les supprime.
+"""
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
+import logging
+
+import numpy as np
+
+from apps.core.incidents import incident_fingerprint, upsert_incidents
+from apps.core.redis_client import get_redis_connection
+from .models import LoginAttempt, LoginAttemptSummary, User
+
+logger = logging.getLogger('django.security')
+
+HIGH_WATER_KEY = 'accounts:login_analytics:high_water'
+
+ATTEMPT_FIELDS = ('id', 'email', 'ip_address', 'user_agent', 'success', 'timestamp')
+
+def _config():
+    return settings.LOGIN_ANALYTICS
+
+def _initial_high_water(window_seconds) -> int:
+    """Première exécution : ne pas analyser tout l'historique"""
+    since = timezone.now() - timedelta(seconds=window_seconds)
+    first_id = LoginAttempt.objects.filter(timestamp__gte=since).order_by('id').values_list('id', flat=True).first()  # type: ignore[attr-defined]
+    if first_id is not None:
+        return first_id - 1
+    return LoginAttempt.objects.aggregate(max_id=Max('id'))['max_id'] or 0  # type: ignore[attr-defined]
+
+def get_high_water() -> int:
+    value = get_redis_connection().get(HIGH_WATER_KEY)
+    if value is None:
+        return _initial_high_water(_config().get('WINDOW_SECONDS', 3600))
+    return int(value)
+
+def _window_stats(keys, others, timestamps, in_batch, window_seconds, key_count, other_count):
+    """Fenêtre glissante par clé, terminée à la dernière tentative du lot.
+
+    Retourne le masque des lignes dans la fenêtre de leur clé, le début et la
+    fin de chaque fenêtre, et le nombre de valeurs distinctes de ``others``.
+    """
+    window_end = np.full(key_count, -np.inf)
+    np.maximum.at(window_end, keys[in_batch], timestamps[in_batch])
+    window_start = window_end - window_seconds
+
+    in_window = (timestamps <= window_end[keys]) & (timestamps > window_start[keys])
+    pairs = np.unique(keys[in_window].astype(np.int64) * other_count + others[in_window])
+    distinct = np.bincount(pairs // other_count, minlength=key_count)
+    return in_window, window_start, window_end, distinct
+
+def _known_user_agent_pairs(emails, ua_index, since, until):
+    """Couples (compte, User-Agent) déjà utilisés avec succès avant la fenêtre"""
+    email_index = {email: code for code, email in enumerate(emails)}
+    ua_count = len(ua_index)
+    known = set()
+    accounts_with_history = np.zeros(len(emails), dtype=bool)
+
+    history = LoginAttempt.objects.filter(  # type: ignore[attr-defined]
+        email__in=list(emails), success=True, timestamp__gte=since, timestamp__lt=until,
+    ).values_list('email', 'user_agent').distinct()
+    for email, user_agent in history:
+        code = email_index[email]
+        accounts_with_history[code] = True
+        if user_agent in ua_index:
+            known.add(code * ua_count + ua_index[user_agent])
+    return known, accounts_with_history
+
+def detect_anomalies(batch):
+    """Calcule les statistiques des comptes et IP du lot et retourne les anomalies"""
+    config = _config()
+    window_seconds = config.get('WINDOW_SECONDS', 3600)
+    min_attempts = config.get('MIN_ATTEMPTS', 10)
+    failure_ratio = config.get('FAILURE_RATIO', 0.8)
+
+    batch_ids = {row[0] for row in batch}
+    since = min(row[5] for row in batch) - timedelta(seconds=window_seconds)
+    emails_in_batch = {row[1] for row in batch}
+    ips_in_batch = {row[2] for row in batch}
+
+    # Contexte : tentatives récentes des seuls comptes et IP du lot
+    rows = list(LoginAttempt.objects.filter(  # type: ignore[attr-defined]
+        Q(email__in=emails_in_batch) | Q(ip_address__in=ips_in_batch),
+        timestamp__gte=since,
+        id__lte=max(batch_ids),
+    ).values_list(*ATTEMPT_FIELDS))
+
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    emails, email_codes = np.unique(np.array([row[1] for row in rows], dtype=object), return_inverse=True)
+    ips, ip_codes = np.unique(np.array([row[2] for row in rows], dtype=object), return_inverse=True)
+    user_agents, ua_codes = np.unique(np.array([row[3] or '' for row in rows], dtype=object), return_inverse=True)
+    success = np.array([row[4] for row in rows], dtype=bool)
+    timestamps = np.array([row[5].timestamp() for row in rows], dtype=np.float64)
+    in_batch = np.isin(ids, np.fromiter(batch_ids, dtype=np.int64))
+
+    anomalies = []
+
+    # Statistiques par compte
+    in_window, starts, ends, distinct_ips = _window_stats(
+        email_codes, ip_codes, timestamps, in_batch, window_seconds, len(emails), len(ips)
+    )
+    attempts = np.bincount(email_codes, weights=in_window, minlength=len(emails))
+    failures = np.bincount(email_codes, weights=in_window & ~success, minlength=len(emails))
+
+    # User-Agents nouveaux : connexions réussies dans la fenêtre avec un User-Agent
+    # absent des connexions réussies antérieures du compte
+    ua_index = {user_agent: code for code, user_agent in enumerate(user_agents)}
+    history_since = since - timedelta(days=config.get('USER_AGENT_HISTORY_DAYS', 30))
+    known, has_history = _known_user_agent_pairs(emails, ua_index, history_since, since)
+    ua_pairs = email_codes.astype(np.int64) * len(user_agents) + ua_codes
+    before_window = success & (timestamps <= starts[email_codes])
+    known_pairs = np.union1d(np.fromiter(known, dtype=np.int64), ua_pairs[before_window])
+    has_history |= np.bincount(email_codes, weights=before_window, minlength=len(emails)) > 0
+    new_ua_rows = in_window & success & ~np.isin(ua_pairs, known_pairs)
+    new_user_agents = np.bincount(
+        np.unique(ua_pairs[new_ua_rows]) // len(user_agents), minlength=len(emails)
+    ) * has_history
+
+    for code, email in enumerate(emails):
+        if not np.isfinite(ends[code]):
+            continue
+        stats = {
+            'attempts': int(attempts[code]),
+            'failures': int(failures[code]),
+            'distinct_ips': int(distinct_ips[code]),
+            'new_user_agents': int(new_user_agents[code]),
+        }
+        if attempts[code] >= min_attempts and failures[code] / attempts[code] >= failure_ratio:
+            anomalies.append(_anomaly('account_failures', email, None, 'high', starts[code], ends[code], stats))
+        if distinct_ips[code] >= config.get('ACCOUNT_DISTINCT_IPS', 5):
+            anomalies.append(_anomaly('account_distinct_ips', email, None, 'medium', starts[code], ends[code], stats))
+        if new_user_agents[code] >= config.get('NEW_USER_AGENTS', 2):
+            anomalies.append(_anomaly('account_new_user_agents', email, None, 'medium', starts[code], ends[code], stats))
+
+    # Statistiques par IP
+    in_window, starts, ends, distinct_accounts = _window_stats(
+        ip_codes, email_codes, timestamps, in_batch, window_seconds, len(ips), len(emails)
+    )
+    attempts = np.bincount(ip_codes, weights=in_window, minlength=len(ips))
+    failures = np.bincount(ip_codes, weights=in_window & ~success, minlength=len(ips))
+
+    for code, ip_address in enumerate(ips):
+        if not np.isfinite(ends[code]):
+            continue
+        stats = {
+            'attempts': int(attempts[code]),
+            'failures': int(failures[code]),
+            'distinct_accounts': int(distinct_accounts[code]),
+        }
+        if attempts[code] >= min_attempts and failures[code] / attempts[code] >= failure_ratio:
+            anomalies.append(_anomaly('ip_failures', None, ip_address, 'high', starts[code], ends[code], stats))
+        if distinct_accounts[code] >= config.get('IP_DISTINCT_ACCOUNTS', 10):
+            anomalies.append(_anomaly('ip_distinct_accounts', None, ip_address, 'high', starts[code], ends[code], stats))
+
+    return anomalies
+
+ANOMALY_TITLES = {
+    'account_failures': "Échecs de connexion répétés sur un compte",
+    'account_distinct_ips': "Connexions à un compte depuis de nombreuses IP",
+    'account_new_user_agents': "Connexions réussies depuis des appareils inconnus",
+    'ip_failures': "Échecs de connexion répétés depuis une IP",
+    'ip_distinct_accounts': "Connexions à de nombreux comptes depuis une IP",
+}
+
+def _anomaly(kind, email, ip_address, severity, start, end, stats):
+    return {
+        'kind': kind,
+        'email': email,
+        'ip_address': ip_address,
+        'severity': severity,
+        'first_seen': datetime.fromtimestamp(float(start), tz=dt_timezone.utc),
+        'last_seen': datetime.fromtimestamp(float(end), tz=dt_timezone.utc),
+        'stats': stats,
+    }
+
+def report_anomalies(anomalies) -> int:
+    """Enregistre les anomalies comme incidents de sécurité"""
+    from apps.core.models import SecurityIncident
+
+    if not anomalies:
+        return 0
+
+    emails = {anomaly['email'] for anomaly in anomalies if anomaly['email']}
+    user_ids = dict(User.objects.filter(email__in=emails).values_list('email', 'id'))  # type: ignore[attr-defined]
+
+    candidates = []
+    for anomaly in anomalies:
+        subject = anomaly['email'] or anomaly['ip_address']
+        candidates.append(SecurityIncident(
+            title=ANOMALY_TITLES[anomaly['kind']],
+            description=f"{ANOMALY_TITLES[anomaly['kind']]}: {subject} ({anomaly['stats']})",
+            severity=anomaly['severity'],
+            ip_address=anomaly['ip_address'],
+            request_data={'kind': anomaly['kind'], 'email': anomaly['email'], **anomaly['stats']},
+            affected_user_id=user_ids.get(anomaly['email']),
+            fingerprint=incident_fingerprint(subject, f"login:{anomaly['kind']}", ''),
+            hit_count=1,
+            first_seen=anomaly['first_seen'],
+            last_seen=anomaly['last_seen'],
+        ))
+
+    incidents, _, _ = upsert_incidents(candidates)
+    for anomaly in anomalies:
+        logger.warning(f"Anomalie de connexion {anomaly['kind']}: {anomaly['email'] or anomaly['ip_address']}")
+    return len(incidents)
+
+def analyze_new_attempts(max_batches=None):
+    """Analyse les tentatives postérieures au point haut, par lots"""
+    batch_size = _config().get('BATCH_SIZE', 5000)
+    client = get_redis_connection()
+    high_water = get_high_water()
+    processed = 0
+    incidents = 0
+    batches = 0
+    failed = 0
+
+    while max_batches is None or batches < max_batches:
+        batch = list(
+            LoginAttempt.objects.filter(id__gt=high_water).order_by('id').values_list(*ATTEMPT_FIELDS)[:batch_size]  # type: ignore[attr-defined]
+        )
+        if not batch:
+            break
+
+        try:
+            with transaction.atomic():
+                incidents += report_anomalies(detect_anomalies(batch))
+        except (DataError, IntegrityError, ValueError) as e:
+            # Lot refusé par la base : le rejouer échouerait de nouveau et bloquerait
+            # l'analyse et le regroupement des anciennes tentatives. Les erreurs
+            # d'infrastructure (base ou Redis indisponible) sont propagées sans
+            # avancer le point haut : le passage suivant reprend ce lot.
+            failed += 1
+            logger.error(f"Anomalies de connexion rejetées (tentatives {batch[0][0]} à {batch[-1][0]}): {str(e)}")
+        high_water = batch[-1][0]
+        client.set(HIGH_WATER_KEY, high_water)
+
+        processed += len(batch)
+        batches += 1
+        if len(batch) < batch_size:
+            break
+
+    return {'processed': processed, 'incidents': incidents, 'failed_batches': failed}
+
+def rollup_old_attempts() -> int:
+    """Regroupe par heure puis supprime les tentatives au-delà de la rétention"""
+    config = _config()
+    cutoff = timezone.now() - timedelta(days=config.get('RETENTION_DAYS', 30))
+
+    # Ne jamais purger des tentatives pas encore analysées
+    analyzed_until = LoginAttempt.objects.filter(id__gt=get_high_water()).order_by('id').values_list('timestamp', flat=True).first()  # type: ignore[attr-defined]
+    if analyzed_until is not None:
+        cutoff = min(cutoff, analyzed_until)
+    cutoff = cutoff.replace(minute=0, second=0, microsecond=0)
+
+    rolled_up = 0
+    while True:
+        oldest = LoginAttempt.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list('timestamp', flat=True).first()  # type: ignore[attr-defined]
+        if oldest is None:
+            break
+        # Une journée par transaction, en heures entières
+        chunk_end = min(cutoff, oldest.replace(minute=0, second=0, microsecond=0) + timedelta(days=1))
+        attempts = LoginAttempt.objects.filter(timestamp__lt=chunk_end)  # type: ignore[attr-defined]
+
+        with transaction.atomic():
+            summaries = attempts.annotate(hour=TruncHour('timestamp')).values('hour', 'email', 'ip_address').annotate(
+                attempt_count=Count('id'),
+                failure_count=Count('id', filter=Q(success=False)),
+                user_agent_count=Count('user_agent', distinct=True),
+            ).order_by()
+            LoginAttemptSummary.objects.bulk_create([  # type: ignore[attr-defined]
+                LoginAttemptSummary(
+                    hour=summary['hour'],
+                    email=summary['email'],
+                    ip_address=summary['ip_address'],
+                    attempts=summary['attempt_count'],
+                    failures=summary['failure_count'],
+                    user_agents=summary['user_agent_count'],
+                )
+                for summary in summaries
+            ], batch_size=1000)
+            deleted, _ = attempts.delete()
+
+        rolled_up += deleted
+
+    return rolled_up
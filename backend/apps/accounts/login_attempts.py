@@ -0,0 +1,132 @@
+"""
+Journalisation différée des tentatives de connexion
+
+La vue de connexion n'écrit plus ``LoginAttempt`` dans la requête : chaque
+tentative est ajoutée à une liste Redis (une seule commande ``RPUSH``), puis
+la tâche ``flush_login_attempts`` les insère par lots avec ``bulk_create``.
+Le vidage est déclenché dès qu'un lot est plein, et périodiquement par beat
+pour les tentatives restantes.
+
+Si Redis est indisponible, la tentative est écrite directement en base : le
+journal de sécurité ne doit pas perdre d'entrées.
+
+Une entrée refusée par la base (adresse invalide, valeur trop longue...) ne
+bloque pas son lot : le lot est alors inséré entrée par entrée et les
+entrées refusées sont écartées dans ``LOGIN_ATTEMPTS_REJECTED``. Seules les
+erreurs d'infrastructure (base indisponible) remettent le lot en file.
+"""
+from django.conf import settings
+from django.db import DataError, IntegrityError
+from django.utils import timezone
+from datetime import datetime
+import ipaddress
+import json
+import logging
+
+from apps.core.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+LOGIN_ATTEMPTS_QUEUE = 'accounts:login_attempts'
+LOGIN_ATTEMPTS_REJECTED = 'accounts:login_attempts:rejected'
+
+# Erreurs propres à une entrée : la rejouer échouerait de nouveau
+ENTRY_ERRORS = (DataError, IntegrityError, ValueError, KeyError, TypeError)
+
+# Adresse enregistrée quand celle de la requête n'est pas une IP valide
+UNSPECIFIED_IP = '0.0.0.0'
+
+def _batch_size():
+    return settings.LOGIN_ATTEMPTS.get('BATCH_SIZE', 100)
+
+def record_login_attempt(email, ip_address, user_agent, success, user_id=None, failure_reason=''):
+    """Ajoute une tentative de connexion au tampon d'écriture"""
+    try:
+        ip_address = str(ipaddress.ip_address(ip_address))
+    except ValueError:
+        logger.warning(f"Adresse IP invalide pour la tentative de connexion de {email}: {ip_address!r}")
+        ip_address = UNSPECIFIED_IP
+    entry = {
+        'user_id': str(user_id) if user_id else None,
+        'email': email,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'success': success,
+        'failure_reason': failure_reason,
+        'timestamp': timezone.now().isoformat(),
+    }
+    try:
+        length = get_redis_connection().rpush(LOGIN_ATTEMPTS_QUEUE, json.dumps(entry))
+    except Exception as e:
+        logger.error(f"Tampon des tentatives de connexion indisponible: {str(e)}")
+        _create_attempts([entry])
+        return
+
+    if length % _batch_size() == 0:
+        from .tasks import flush_login_attempts
+        flush_login_attempts.delay()
+
+def _create_attempts(entries):
+    from .models import LoginAttempt
+
+    LoginAttempt.objects.bulk_create([  # type: ignore[attr-defined]
+        LoginAttempt(
+            user_id=entry['user_id'],
+            email=entry['email'],
+            ip_address=entry['ip_address'],
+            user_agent=entry['user_agent'],
+            success=entry['success'],
+            failure_reason=entry['failure_reason'],
+            timestamp=datetime.fromisoformat(entry['timestamp']),
+        )
+        for entry in entries
+    ])
+
+def _create_each(client, raw_entries):
+    """Insère les entrées d'un lot une par une en écartant celles que la base refuse"""
+    for index, raw in enumerate(raw_entries):
+        try:
+            _create_attempts([json.loads(raw)])
+        except ENTRY_ERRORS as e:
+            logger.error(f"Tentative de connexion rejetée: {str(e)} ({raw[:200]})")
+            pipe = client.pipeline(transaction=False)
+            pipe.rpush(LOGIN_ATTEMPTS_REJECTED, raw)
+            pipe.ltrim(LOGIN_ATTEMPTS_REJECTED, -settings.LOGIN_ATTEMPTS.get('MAX_REJECTED', 1000), -1)
+            pipe.execute()
+        except Exception:
+            # Base indisponible : les entrées restantes reviennent dans la file
+            client.rpush(LOGIN_ATTEMPTS_QUEUE, *raw_entries[index:])
+            raise
+
+def flush_pending_attempts(max_batches=None) -> int:
+    """Insère les tentatives en attente par lots et retourne leur nombre"""
+    client = get_redis_connection()
+    batch_size = _batch_size()
+    flushed = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        # Lecture et retrait atomiques d'un lot (plusieurs workers possibles)
+        pipe = client.pipeline(transaction=True)
+        pipe.lrange(LOGIN_ATTEMPTS_QUEUE, 0, batch_size - 1)
+        pipe.ltrim(LOGIN_ATTEMPTS_QUEUE, batch_size, -1)
+        raw_entries, _ = pipe.execute()
+        if not raw_entries:
+            break
+
+        try:
+            _create_attempts([json.loads(raw) for raw in raw_entries])
+        except ENTRY_ERRORS:
+            # Une entrée au moins est refusée : insertion une par une
+            _create_each(client, raw_entries)
+        except Exception:
+            # Base indisponible : remettre le lot dans la file pour le prochain passage
+            client.rpush(LOGIN_ATTEMPTS_QUEUE, *raw_entries)
+            raise
+
+        flushed += len(raw_entries)
+        batches += 1
+        if len(raw_entries) < batch_size:
+            break
+
+    return flushed
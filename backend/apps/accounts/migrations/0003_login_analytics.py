@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_loginattempt_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginAttemptSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Heure')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('ip_address', models.GenericIPAddressField(verbose_name='Adresse IP')),
+                ('attempts', models.PositiveIntegerField(verbose_name='Tentatives')),
+                ('failures', models.PositiveIntegerField(verbose_name='Échecs')),
+                ('user_agents', models.PositiveIntegerField(verbose_name='User Agents distincts')),
+            ],
+            options={
+                'verbose_name': 'Résumé horaire des connexions',
+                'verbose_name_plural': 'Résumés horaires des connexions',
+                'ordering': ['-hour'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='loginattempt',
+            index=models.Index(fields=['email', 'timestamp'], name='accounts_lo_email_f9be85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loginattempt',
+            index=models.Index(fields=['ip_address', 'timestamp'], name='accounts_lo_ip_addr_4f26f9_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='loginattemptsummary',
+            unique_together={('hour', 'email', 'ip_address')},
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import uuid
 
@@ -75,6 +76,26 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        # Invalider l'utilisateur mis en cache par l'authentification JWT
+        # (rôle, statut, activation, mot de passe...)
+        from .authentication import AUTH_USER_FIELDS, invalidate_auth_user
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & (set(AUTH_USER_FIELDS) | {'password'}):
+            user_id = self.pk
+            transaction.on_commit(lambda: invalidate_auth_user(user_id))
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        
+        from .authentication import invalidate_auth_user
+        transaction.on_commit(lambda: invalidate_auth_user(user_id))
+        return result
+    
     def has_role(self, role):
         """Vérifie si l'utilisateur a un rôle spécifique"""
         return self.role == role or self.role == 'admin'
@@ -144,18 +165,42 @@ class LoginAttempt(models.Model):
     ip_address = models.GenericIPAddressField(_('Adresse IP'))
     user_agent = models.TextField(_('User Agent'))
     success = models.BooleanField(_('Succès'))
-    timestamp = models.DateTimeField(_('Horodatage'), auto_now_add=True)
+    # Horodatage fourni par le journal différé (heure de la tentative, pas de l'insertion)
+    timestamp = models.DateTimeField(_('Horodatage'), default=timezone.now)
     failure_reason = models.CharField(_('Raison de l\'échec'), max_length=100, blank=True)
     
     class Meta:
         verbose_name = _('Tentative de connexion')
         verbose_name_plural = _('Tentatives de connexion')
         ordering = ['-timestamp']
+        indexes = [
+            # Fenêtres glissantes de l'analyse des connexions (apps.accounts.login_analytics)
+            models.Index(fields=['email', 'timestamp']),
+            models.Index(fields=['ip_address', 'timestamp']),
+        ]
     
     def __str__(self):
         status = "Réussie" if self.success else "Échouée"
         return f"{self.email} - {status} - {self.timestamp}"
 
+class LoginAttemptSummary(models.Model):
+    """Résumé horaire des tentatives de connexion purgées"""
+    hour = models.DateTimeField(_('Heure'))
+    email = models.EmailField(_('Email'))
+    ip_address = models.GenericIPAddressField(_('Adresse IP'))
+    attempts = models.PositiveIntegerField(_('Tentatives'))
+    failures = models.PositiveIntegerField(_('Échecs'))
+    user_agents = models.PositiveIntegerField(_('User Agents distincts'))
+    
+    class Meta:
+        verbose_name = _('Résumé horaire des connexions')
+        verbose_name_plural = _('Résumés horaires des connexions')
+        ordering = ['-hour']
+        unique_together = ['hour', 'email', 'ip_address']
+    
+    def __str__(self):
+        return f"{self.email} - {self.ip_address} - {self.hour}: {self.failures}/{self.attempts}"
+
 class PasswordHistory(models.Model):
     """Historique des mots de passe pour éviter la réutilisation"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='password_history')
@@ -169,3 +214,6 @@ class PasswordHistory(models.Model):
     
     def __str__(self):
         return f"Mot de passe de {self.user.get_full_name()} - {self.created_at}"  # type: ignore[attr-defined]
+
+# Contrôles système (pas d'AppConfig pour cette application)
+from . import checks  # noqa: E402,F401
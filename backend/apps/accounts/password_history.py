@@ -0,0 +1,77 @@
+"""
+Historique des mots de passe (interdiction de réutilisation)
+
+Chaque vérification d'un hash de l'historique est un calcul PBKDF2 complet.
+Les hashs sont vérifiés en parallèle dans un pool de threads (le calcul dans
+``hashlib`` libère le GIL) et la vérification s'arrête au premier
+correspondant : un changement de mot de passe coûte environ une seule durée
+de hachage au lieu d'une par entrée de l'historique.
+
+Réglages (``settings.PASSWORD_HISTORY``) :
+
+- ``DEPTH`` : nombre de mots de passe récents vérifiés ;
+- ``HASHER`` : algorithme des hashs d'historique (``None`` : copie du hash
+  courant de l'utilisateur, sinon re-hachage de l'ancien mot de passe) ;
+- ``MAX_WORKERS`` : taille du pool de vérification.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+import threading
+
+from .models import PasswordHistory
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_history_depth() -> int:
+    return settings.PASSWORD_HISTORY.get('DEPTH', 5)
+
+def _get_executor():
+    """Pool partagé par le processus, créé au premier usage"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HISTORY.get('MAX_WORKERS', 4),
+                    thread_name_prefix='password-history'
+                )
+    return _executor
+
+def any_password_matches(password, hashes) -> bool:
+    """Vrai si ``password`` correspond à l'un des hashs (arrêt au premier trouvé)"""
+    hashes = list(hashes)
+    if not hashes:
+        return False
+    if len(hashes) == 1:
+        return check_password(password, hashes[0])
+
+    pending = {_get_executor().submit(check_password, password, encoded) for encoded in hashes}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            if any(future.result() for future in done):
+                return True
+        return False
+    finally:
+        # Les vérifications pas encore démarrées sont abandonnées
+        for future in pending:
+            future.cancel()
+
+def is_password_in_history(user, password) -> bool:
+    """Vérifie si le mot de passe fait partie des derniers mots de passe de l'utilisateur"""
+    hashes = PasswordHistory.objects.filter(user=user).order_by(  # type: ignore[attr-defined]
+        '-created_at'
+    ).values_list('password_hash', flat=True)[:get_history_depth()]
+    return any_password_matches(password, hashes)
+
+def record_password_history(user, old_password=None):
+    """Ajoute le mot de passe actuel à l'historique (les entrées anciennes sont conservées)"""
+    hasher = settings.PASSWORD_HISTORY.get('HASHER')
+    if hasher and old_password is not None:
+        password_hash = make_password(old_password, hasher=hasher)
+    else:
+        password_hash = user.password
+
+    PasswordHistory.objects.create(user=user, password_hash=password_hash)  # type: ignore[attr-defined]
@@ -0,0 +1,111 @@
+"""
+Révocation des tokens JWT (déconnexion, rotation des refresh tokens)
+
+Les JTI révoqués sont stockés dans un ensemble trié Redis
+(``jwt:revoked``, membre ``<jti>:<exp>``, score = date de révocation). Chaque
+processus en garde une copie locale qu'il complète de façon incrémentale
+(révocations postérieures à la dernière synchronisation), au plus toutes les
+``REFRESH_SECONDS`` secondes : la vérification d'un token est une recherche
+en mémoire, sans requête SQL ni aller-retour Redis.
+
+Une révocation est visible immédiatement dans le processus qui l'a faite et
+au plus ``REFRESH_SECONDS`` secondes plus tard dans les autres. Les entrées
+expirées (``exp`` dépassé) sont purgées par ``cleanup_expired_tokens``.
+"""
+from django.conf import settings
+import logging
+import threading
+import time
+
+from apps.core.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+REVOKED_TOKENS_KEY = 'jwt:revoked'
+
+# Marge de recouvrement entre deux synchronisations (horloges des nœuds)
+SYNC_OVERLAP_SECONDS = 60
+
+def _member(jti, exp) -> str:
+    return f"{jti}:{int(exp)}"
+
+def _parse_member(member):
+    jti, exp = member.rsplit(':', 1)
+    return jti, int(exp)
+
+class RevocationFilter:
+    """Copie locale des JTI révoqués, synchronisée de façon incrémentale"""
+
+    def __init__(self):
+        self._revoked = {}
+        self._synced_at = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = int(exp)
+
+    def is_revoked(self, jti) -> bool:
+        self.refresh_if_due()
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    def refresh_if_due(self):
+        interval = settings.TOKEN_REVOCATION.get('REFRESH_SECONDS', 5)
+        if time.monotonic() - self._checked_at < interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < interval:
+                return
+            self._refresh()
+            self._checked_at = time.monotonic()
+
+    def _refresh(self):
+        now = time.time()
+        since = '-inf' if self._synced_at is None else self._synced_at - SYNC_OVERLAP_SECONDS
+        try:
+            members = get_redis_connection().zrangebyscore(REVOKED_TOKENS_KEY, since, '+inf')
+        except Exception as e:
+            # Redis indisponible : on garde la copie locale et on réessaiera
+            logger.error(f"Synchronisation des tokens révoqués impossible: {str(e)}")
+            return
+
+        for member in members:
+            jti, exp = _parse_member(member)
+            self._revoked[jti] = exp
+        self._synced_at = now
+
+        expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+        for jti in expired:
+            del self._revoked[jti]
+
+_filter = RevocationFilter()
+
+def revoke_jti(jti, exp):
+    """Révoque un JTI jusqu'à son expiration"""
+    get_redis_connection().zadd(REVOKED_TOKENS_KEY, {_member(jti, exp): time.time()})
+    _filter.add(jti, exp)
+
+def is_jti_revoked(jti) -> bool:
+    """Vérifie si un JTI est révoqué (recherche en mémoire)"""
+    return _filter.is_revoked(jti)
+
+def purge_expired_revocations(chunk_size=None) -> int:
+    """Supprime par lots les révocations de tokens déjà expirés"""
+    chunk_size = chunk_size or settings.TOKEN_REVOCATION.get('PURGE_CHUNK_SIZE', 1000)
+    client = get_redis_connection()
+    now = time.time()
+    purged = 0
+    expired = []
+
+    for member, _ in client.zscan_iter(REVOKED_TOKENS_KEY, count=chunk_size):
+        if _parse_member(member)[1] <= now:
+            expired.append(member)
+        if len(expired) >= chunk_size:
+            purged += client.zrem(REVOKED_TOKENS_KEY, *expired)
+            expired = []
+    if expired:
+        purged += client.zrem(REVOKED_TOKENS_KEY, *expired)
+
+    return purged
@@ -3,7 +3,9 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenObtainSerializer, TokenRefreshSerializer
 from .models import User, UserProfile
+from .tokens import RevocableRefreshToken
 import re
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -108,6 +110,26 @@ class UserLoginSerializer(serializers.Serializer):
         else:
             raise serializers.ValidationError(_("Email et mot de passe requis."))
 
+class LoginTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Tokens JWT de connexion.
+
+    ``last_login`` n'est pas enregistré ici : la vue de connexion l'écrit avec
+    les autres champs de connexion en une seule requête UPDATE.
+    """
+    token_class = RevocableRefreshToken
+    
+    def validate(self, attrs):
+        data = TokenObtainSerializer.validate(self, attrs)
+        
+        refresh = self.get_token(self.user)
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)  # type: ignore[attr-defined]
+        return data
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Rafraîchissement JWT : le refresh token présenté est vérifié puis révoqué (rotation)"""
+    token_class = RevocableRefreshToken
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer pour le profil utilisateur"""
     
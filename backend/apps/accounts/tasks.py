@@ -0,0 +1,42 @@
+from celery import shared_task
+import logging
+
+from apps.core.locks import single_flight
+from .login_analytics import analyze_new_attempts, rollup_old_attempts
+from .login_attempts import flush_pending_attempts
+from .revocation import purge_expired_revocations
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def flush_login_attempts():
+    """Insère par lots les tentatives de connexion en attente"""
+    flushed_count = flush_pending_attempts()
+    if flushed_count:
+        logger.info(f"Tentatives de connexion enregistrées: {flushed_count}")
+    return flushed_count
+
+@shared_task
+@single_flight(ttl=600)
+def cleanup_expired_tokens(chunk_size=None):
+    """Purge par lots les révocations de tokens JWT expirés"""
+    purged_count = purge_expired_revocations(chunk_size)
+    logger.info(f"Révocations de tokens expirés purgées: {purged_count}")
+    return f"Révocations purgées: {purged_count}"
+
+@shared_task
+@single_flight(ttl=600)
+def analyze_login_attempts():
+    """Détecte les anomalies dans les nouvelles tentatives de connexion"""
+    result = analyze_new_attempts()
+    if result['incidents']:
+        logger.warning(f"Anomalies de connexion détectées: {result['incidents']}")
+    return result
+
+@shared_task
+@single_flight(ttl=3600)
+def rollup_login_attempts():
+    """Regroupe par heure et purge les anciennes tentatives de connexion"""
+    rolled_up_count = rollup_old_attempts()
+    logger.info(f"Tentatives de connexion regroupées et purgées: {rolled_up_count}")
+    return f"Tentatives regroupées: {rolled_up_count}"
@@ -0,0 +1,33 @@
+"""
+Tokens JWT révocables
+
+L'application ``token_blacklist`` de simplejwt n'est pas installée : la
+révocation passe par ``apps.accounts.revocation`` (Redis + copie locale par
+processus). Ces classes remplacent ``AccessToken`` et ``RefreshToken`` dans
+l'authentification, la connexion, le rafraîchissement et la déconnexion.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .revocation import is_jti_revoked, revoke_jti
+
+class RevocableTokenMixin:
+    """Vérifie la révocation du token et permet de le révoquer"""
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)  # type: ignore[misc]
+
+        if is_jti_revoked(self.payload.get(api_settings.JTI_CLAIM)):  # type: ignore[attr-defined]
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """Révoque le token jusqu'à son expiration"""
+        revoke_jti(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])  # type: ignore[attr-defined]
+
+class RevocableAccessToken(RevocableTokenMixin, AccessToken):
+    pass
+
+class RevocableRefreshToken(RevocableTokenMixin, RefreshToken):
+    access_token_class = RevocableAccessToken
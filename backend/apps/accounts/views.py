@@ -2,30 +2,38 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import login, logout
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
 from django.db import transaction
+from django.db.models import Case, F, Value, When
 from django.core.cache import cache
 from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
 import logging
 from django.utils import timezone
+from redis.exceptions import RedisError
 
-from .models import User, LoginAttempt
+from .authentication import invalidate_auth_user
+from .login_attempts import record_login_attempt
+from .password_history import get_history_depth, is_password_in_history, record_password_history
+from .tokens import RevocableAccessToken, RevocableRefreshToken
+from .models import User
 from .serializers import (
-    UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
+    LoginTokenObtainPairSerializer, UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
     PasswordChangeSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer
 )
+from apps.core.blocklist import block_ip
 from apps.core.permissions import IsOwnerOrAdmin
 from apps.core.utils import get_client_ip, get_user_agent
+from apps.notifications.tasks import send_email
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +42,13 @@ class LoginRateThrottle(UserRateThrottle):
 
 @method_decorator(ratelimit(key='ip', rate='5/m', method='POST'), name='post')
 class CustomTokenObtainPairView(TokenObtainPairView):
-    """Vue personnalisée pour l'obtention de tokens JWT avec sécurité renforcée"""
+    """Vue personnalisée pour l'obtention de tokens JWT avec sécurité renforcée.
+    
+    L'utilisateur n'est lu qu'une fois (par ``authenticate``), les compteurs
+    d'échecs sont incrémentés atomiquement et les tentatives sont journalisées
+    de façon différée (``record_login_attempt``).
+    """
+    serializer_class = LoginTokenObtainPairSerializer
     throttle_classes = [LoginRateThrottle]
     
     def post(self, request, *args, **kwargs):
@@ -42,46 +56,14 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         user_agent = get_user_agent(request)
         email = request.data.get('email', '')  # type: ignore[attr-defined]
         
-        # Vérifier si l'IP est bloquée
-        blocked_key = f"blocked_ip_{ip_address}"
-        if cache.get(blocked_key):
-            logger.warning(f"Tentative de connexion depuis une IP bloquée: {ip_address}")
-            return Response(
-                {'error': _('Trop de tentatives échouées. Réessayez plus tard.')},
-                status=status.HTTP_429_TOO_MANY_REQUESTS
-            )
-        
+        serializer = self.get_serializer(data=request.data)
         try:
-            response = super().post(request, *args, **kwargs)
-            
-            if response.status_code == 200:
-                # Connexion réussie
-                try:
-                    user = User.objects.get(email=email)
-                    user.failed_login_attempts = 0
-                    user.last_ip_address = ip_address
-                    user.user_agent = user_agent
-                    user.save(update_fields=['failed_login_attempts', 'last_ip_address', 'user_agent'])
-                    
-                    # Enregistrer la tentative réussie
-                    LoginAttempt.objects.create(  # type: ignore[attr-defined]
-                        user=user,
-                        email=email,
-                        ip_address=ip_address,
-                        user_agent=user_agent,
-                        success=True
-                    )
-                    
-                    logger.info(f"Connexion réussie pour {email} depuis {ip_address}")
-                    
-                except User.DoesNotExist:  # type: ignore[attr-defined]
-                    pass
-            else:
-                # Connexion échouée
-                self._handle_failed_login(email, ip_address, user_agent)
-            
-            return response
-            
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        except (AuthenticationFailed, ValidationError):
+            self._handle_failed_login(email, ip_address, user_agent)
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la connexion: {str(e)}")
             self._handle_failed_login(email, ip_address, user_agent)
@@ -89,40 +71,75 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 {'error': _('Erreur interne du serveur.')},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        # Connexion réussie : une seule écriture pour tous les champs de connexion
+        user = serializer.user
+        User.objects.filter(pk=user.pk).update(
+            failed_login_attempts=0,
+            last_login=timezone.now(),
+            last_ip_address=ip_address,
+            user_agent=user_agent
+        )
+        # update() contourne User.save : last_login est en cache d'authentification
+        invalidate_auth_user(user.pk)
+        record_login_attempt(email, ip_address, user_agent, True, user_id=user.pk)
+        
+        logger.info(f"Connexion réussie pour {email} depuis {ip_address}")
+        
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
     
     def _handle_failed_login(self, email, ip_address, user_agent):
         """Gère les tentatives de connexion échouées"""
-        try:
-            user = User.objects.get(email=email)
-            user.failed_login_attempts += 1
-            user.last_failed_login = timezone.now()
-            user.save(update_fields=['failed_login_attempts', 'last_failed_login'])
-            
-            # Bloquer le compte après 5 tentatives
-            if user.failed_login_attempts >= 5:
-                user.is_active = False
-                user.save(update_fields=['is_active'])
-                logger.warning(f"Compte bloqué pour {email} après 5 tentatives échouées")
-        except User.DoesNotExist:  # type: ignore[attr-defined]
-            pass
+        config = settings.LOGIN_ATTEMPTS
+        user_limit = config.get('USER_FAILURE_LIMIT', 5)
+        ip_limit = config.get('IP_FAILURE_LIMIT', 10)
+        block_seconds = config.get('IP_BLOCK_SECONDS', 3600)
         
-        # Enregistrer la tentative échouée
-        LoginAttempt.objects.create(  # type: ignore[attr-defined]
-            email=email,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            success=False,
-            failure_reason='Invalid credentials'
+        # Incrément et blocage du compte au seuil en un seul UPDATE atomique
+        # (les expressions lisent les valeurs d'avant la mise à jour)
+        User.objects.filter(email=email).update(
+            failed_login_attempts=F('failed_login_attempts') + 1,
+            last_failed_login=timezone.now(),
+            is_active=Case(
+                When(failed_login_attempts__gte=user_limit - 1, then=Value(False)),
+                default=F('is_active')
+            )
         )
         
-        # Bloquer l'IP après 10 tentatives échouées
-        failed_attempts_key = f"failed_attempts_{ip_address}"
-        failed_attempts = cache.get(failed_attempts_key, 0) + 1
-        cache.set(failed_attempts_key, failed_attempts, 3600)  # 1 heure
+        # Compte bloqué par cet UPDATE (ou déjà bloqué) : retirer l'utilisateur du
+        # cache d'authentification JWT, quel que soit l'état des compteurs du cache
+        for user_id, attempts in User.objects.filter(
+            email=email, is_active=False, failed_login_attempts__gte=user_limit,
+        ).values_list('id', 'failed_login_attempts'):
+            invalidate_auth_user(user_id)
+            if attempts == user_limit:
+                logger.warning(f"Compte bloqué pour {email} après {user_limit} tentatives échouées")
+        
+        # Enregistrer la tentative échouée
+        record_login_attempt(email, ip_address, user_agent, False, failure_reason='Invalid credentials')
         
-        if failed_attempts >= 10:
-            cache.set(f"blocked_ip_{ip_address}", True, 3600)  # Bloquer pour 1 heure
-            logger.warning(f"IP bloquée pour tentatives multiples: {ip_address}")
+        # Bloquer l'IP après 10 tentatives échouées (rejetée ensuite par SecurityPipelineMiddleware).
+        # Sans adresse valide (voir get_client_ip), rien n'est bloqué ; une panne
+        # Redis ne doit pas transformer un échec de connexion en erreur 500.
+        if not ip_address:
+            return
+        try:
+            if _increment_counter(f"failed_attempts_{ip_address}", block_seconds) >= ip_limit:
+                block_ip(ip_address, block_seconds, reason='login_failures')
+        except ValueError as e:
+            logger.warning(f"Blocage de l'IP {ip_address!r} ignoré (adresse invalide): {str(e)}")
+        except RedisError as e:
+            logger.error(f"Blocage de l'IP {ip_address} impossible (Redis indisponible): {str(e)}")
+
+def _increment_counter(key, timeout):
+    """Incrément atomique d'un compteur du cache (créé à 0 s'il n'existe pas)"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Clé expirée entre add et incr
+        cache.set(key, 1, timeout)
+        return 1
 
 @method_decorator(ratelimit(key='ip', rate='3/m', method='POST'), name='post')
 class UserRegistrationView(generics.CreateAPIView):
@@ -166,14 +183,7 @@ class UserRegistrationView(generics.CreateAPIView):
             subject = _('Vérifiez votre adresse email')
             message = render_to_string('emails/email_verification.html', context)
             
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                html_message=message,
-                fail_silently=False
-            )
+            send_email.delay(str(subject), message, [user.email], message=message)
             
         except Exception as e:
             logger.error(f"Erreur lors de l'envoi de l'email de vérification: {str(e)}")
@@ -224,22 +234,16 @@ def change_password(request):
         user = request.user
         new_password = serializer.validated_data['new_password']  # type: ignore[index]
         
-        # Vérifier l'historique des mots de passe
-        from .models import PasswordHistory
-        from django.contrib.auth.hashers import check_password
-        
-        recent_passwords = PasswordHistory.objects.filter(user=user).order_by('-created_at')[:5]  # type: ignore[attr-defined]
-        for pwd_history in recent_passwords:
-            if check_password(new_password, pwd_history.password_hash):
-                return Response({
-                    'error': _('Vous ne pouvez pas réutiliser un de vos 5 derniers mots de passe.')
-                }, status=status.HTTP_400_BAD_REQUEST)
+        # Vérifier l'historique des mots de passe (vérifications en parallèle)
+        if is_password_in_history(user, new_password):
+            return Response({
+                'error': _('Vous ne pouvez pas réutiliser un de vos %(depth)d derniers mots de passe.') % {
+                    'depth': get_history_depth()
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Sauvegarder l'ancien mot de passe dans l'historique
-        PasswordHistory.objects.create(  # type: ignore[attr-defined]
-            user=user,
-            password_hash=user.password
-        )
+        record_password_history(user, serializer.validated_data['old_password'])  # type: ignore[index]
         
         # Changer le mot de passe
         user.set_password(new_password)
@@ -284,14 +288,7 @@ def password_reset_request(request):
             subject = _('Réinitialisation de votre mot de passe')
             message = render_to_string('emails/password_reset.html', context)
             
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                html_message=message,
-                fail_silently=False
-            )
+            send_email.delay(str(subject), message, [user.email], message=message)
             
             logger.info(f"Email de réinitialisation envoyé à: {email}")
             
@@ -349,12 +346,17 @@ def logout_view(request):
     try:
         refresh_token = request.data.get('refresh_token')
         if refresh_token:
-            token = RefreshToken(refresh_token)
+            token = RevocableRefreshToken(refresh_token)
             token.blacklist()
         
+        # Révoquer aussi le token d'accès utilisé pour cette requête
+        if isinstance(request.auth, RevocableAccessToken):
+            request.auth.blacklist()
+        
+        email = request.user.email
         logout(request)
         
-        logger.info(f"Déconnexion de l'utilisateur: {request.user.email}")
+        logger.info(f"Déconnexion de l'utilisateur: {email}")
         
         return Response({
             'message': _('Déconnexion réussie.')
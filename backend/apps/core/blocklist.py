@@ -0,0 +1,220 @@
+"""
+Liste de blocage d'adresses IP (IPv4/IPv6, plages CIDR)
+
+La source de vérité est un hash Redis (``security:blocklist``, plage CIDR ->
+expiration et motif). Chaque processus en garde une copie sous forme
+d'intervalles triés et fusionnés par version d'IP : la vérification d'une
+adresse est une recherche dichotomique en mémoire, sans aller-retour réseau.
+
+Les ajouts et retraits sont diffusés sur le canal pub/sub
+``security:blocklist:updates`` et appliqués par un thread d'écoute propre à
+chaque processus, qui recharge aussi la liste complète toutes les
+``RELOAD_SECONDS`` secondes (messages perdus pendant une coupure Redis).
+
+La liste est alimentée par les échecs de connexion répétés
+(``CustomTokenObtainPairView``) et par les incidents de sécurité agrégés
+(``apps.core.incidents``), et vérifiée par ``SecurityPipelineMiddleware``,
+placé juste après ``CorsMiddleware``.
+"""
+from django.conf import settings
+from bisect import bisect_right
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+
+from apps.core.redis_client import get_redis_connection
+
+logger = logging.getLogger('django.security')
+
+BLOCKLIST_KEY = 'security:blocklist'
+BLOCKLIST_CHANNEL = 'security:blocklist:updates'
+
+def _config():
+    return getattr(settings, 'IP_BLOCKLIST', {})
+
+def normalize_network(value):
+    """Convertit une adresse ou une plage en réseau CIDR normalisé"""
+    network = ipaddress.ip_network(str(value).strip(), strict=False)
+    if network.version == 6 and network.network_address.ipv4_mapped:
+        prefix = max(network.prefixlen - 96, 0)
+        network = ipaddress.ip_network(f"{network.network_address.ipv4_mapped}/{prefix}", strict=False)
+    return network
+
+class CIDRSet:
+    """Ensemble de plages CIDR sous forme d'intervalles disjoints triés"""
+
+    def __init__(self, networks=()):
+        self._starts = {4: [], 6: []}
+        self._ends = {4: [], 6: []}
+
+        ranges = {4: [], 6: []}
+        for network in networks:
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+        for version, intervals in ranges.items():
+            for start, end in sorted(intervals):
+                ends = self._ends[version]
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    self._starts[version].append(start)
+                    ends.append(end)
+
+    def __contains__(self, address):
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+
+        value = int(ip)
+        index = bisect_right(self._starts[ip.version], value) - 1
+        return index >= 0 and value <= self._ends[ip.version][index]
+
+    def __len__(self):
+        return len(self._starts[4]) + len(self._starts[6])
+
+class IPBlocklist:
+    """Copie locale de la liste de blocage, tenue à jour par pub/sub"""
+
+    def __init__(self):
+        self._entries = {}
+        self._index = CIDRSet()
+        self._next_expiry = float('inf')
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def is_blocked(self, address) -> bool:
+        self._ensure_started()
+        if time.time() >= self._next_expiry:
+            with self._lock:
+                self._rebuild()
+        return address in self._index
+
+    def add(self, network, expires_at):
+        with self._lock:
+            self._entries[str(network)] = expires_at
+            self._rebuild()
+
+    def remove(self, network):
+        with self._lock:
+            self._entries.pop(str(network), None)
+            self._rebuild()
+
+    def load(self):
+        """Recharge la liste complète depuis Redis"""
+        try:
+            stored = get_redis_connection().hgetall(BLOCKLIST_KEY)
+        except Exception as e:
+            # Redis indisponible : la copie locale reste en place
+            logger.error(f"Chargement de la liste de blocage impossible: {str(e)}")
+            return
+
+        entries = {}
+        for network, value in stored.items():
+            entries[network] = json.loads(value)['expires_at']
+        for network in _config().get('STATIC_CIDRS', []):
+            entries[str(normalize_network(network))] = None
+        with self._lock:
+            self._entries = entries
+            self._rebuild()
+
+    def _rebuild(self):
+        now = time.time()
+        self._entries = {
+            network: expires_at for network, expires_at in self._entries.items()
+            if expires_at is None or expires_at > now
+        }
+        self._index = CIDRSet(ipaddress.ip_network(network) for network in self._entries)
+        self._next_expiry = min(
+            (expires_at for expires_at in self._entries.values() if expires_at is not None),
+            default=float('inf'),
+        )
+
+    def _ensure_started(self):
+        # Un thread d'écoute par processus (après le fork des workers)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        self.load()
+        threading.Thread(target=self._listen, name='ip-blocklist', daemon=True).start()
+
+    def _apply(self, message):
+        update = json.loads(message['data'])
+        if update['action'] == 'add':
+            self.add(update['network'], update['expires_at'])
+        elif update['action'] == 'remove':
+            self.remove(update['network'])
+
+    def _listen(self):
+        reload_seconds = _config().get('RELOAD_SECONDS', 300)
+        while True:
+            try:
+                pubsub = get_redis_connection().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(BLOCKLIST_CHANNEL)
+                # Rattraper les mises à jour publiées avant l'abonnement
+                self.load()
+                loaded_at = time.monotonic()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._apply(message)
+                    if time.monotonic() - loaded_at >= reload_seconds:
+                        self.load()
+                        loaded_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Écoute de la liste de blocage interrompue: {str(e)}")
+                time.sleep(5)
+
+_blocklist = IPBlocklist()
+
+def is_ip_blocked(address) -> bool:
+    """Vérifie si une adresse appartient à une plage bloquée (recherche en mémoire)"""
+    if not address:
+        return False
+    return _blocklist.is_blocked(address)
+
+def block_ip(value, seconds=None, reason=''):
+    """Bloque une adresse ou une plage CIDR (définitivement si ``seconds`` est None)"""
+    network = str(normalize_network(value))
+    expires_at = time.time() + seconds if seconds else None
+
+    client = get_redis_connection()
+    current = client.hget(BLOCKLIST_KEY, network)
+    if current is not None:
+        # Ne jamais raccourcir un blocage existant
+        current_expiry = json.loads(current)['expires_at']
+        if current_expiry is None or (expires_at is not None and current_expiry >= expires_at):
+            return
+    client.hset(BLOCKLIST_KEY, network, json.dumps({'expires_at': expires_at, 'reason': reason}))
+    client.publish(BLOCKLIST_CHANNEL, json.dumps({'action': 'add', 'network': network, 'expires_at': expires_at}))
+    _blocklist.add(network, expires_at)
+    logger.warning(f"Plage bloquée: {network} ({reason or 'manuel'})")
+
+def unblock_ip(value):
+    """Retire une adresse ou une plage CIDR de la liste de blocage"""
+    network = str(normalize_network(value))
+    client = get_redis_connection()
+    client.hdel(BLOCKLIST_KEY, network)
+    client.publish(BLOCKLIST_CHANNEL, json.dumps({'action': 'remove', 'network': network}))
+    _blocklist.remove(network)
+
+def purge_expired_blocks() -> int:
+    """Supprime de Redis les blocages expirés et retourne leur nombre"""
+    client = get_redis_connection()
+    now = time.time()
+    expired = [
+        network for network, value in client.hscan_iter(BLOCKLIST_KEY)
+        if (json.loads(value)['expires_at'] or float('inf')) <= now
+    ]
+    if expired:
+        client.hdel(BLOCKLIST_KEY, *expired)
+    return len(expired)
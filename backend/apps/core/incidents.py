@@ -0,0 +1,251 @@
+"""
+Agrégation des incidents de sécurité
+
+``ThreatDetectionMiddleware`` n'écrit plus un ``SecurityIncident`` par requête
+bloquée : chaque détection incrémente, en un seul aller-retour Redis, un
+compteur par (IP, pattern, chemin) et par fenêtre de ``WINDOW_SECONDS``
+secondes. La tâche ``flush_security_incidents`` transforme ensuite les
+fenêtres terminées en incidents avec ``hit_count``, ``first_seen`` et
+``last_seen`` : une attaque soutenue prolonge l'incident ouvert de même
+empreinte au lieu d'en créer de nouveaux, et sa gravité monte selon
+``SEVERITY_THRESHOLDS``.
+
+Le nombre d'écritures en base dépend donc du nombre de sources distinctes
+par fenêtre, et non du nombre de requêtes reçues.
+"""
+from django.conf import settings
+from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
+import hashlib
+import logging
+import time
+
+from apps.core.blocklist import block_ip
+from apps.core.redis_client import get_redis_connection
+
+logger = logging.getLogger('django.security')
+
+PENDING_INCIDENTS_KEY = 'security:incidents:pending'
+INCIDENT_KEY_PREFIX = 'security:incidents:window'
+
+SEVERITY_ORDER = ['low', 'medium', 'high', 'critical']
+
+def _config():
+    return getattr(settings, 'SECURITY_INCIDENTS', {})
+
+def incident_fingerprint(ip_address, pattern, path) -> str:
+    """Empreinte stable d'une source d'attaque (IP, pattern, chemin)"""
+    return hashlib.sha256(f"{ip_address}|{pattern}|{path}".encode()).hexdigest()[:32]
+
+def severity_for_hits(hit_count) -> str:
+    """Gravité correspondant au nombre de requêtes bloquées"""
+    thresholds = _config().get('SEVERITY_THRESHOLDS', {'high': 1, 'critical': 100})
+    severity = 'low'
+    for level, minimum in thresholds.items():
+        if hit_count >= minimum and SEVERITY_ORDER.index(level) > SEVERITY_ORDER.index(severity):
+            severity = level
+    return severity
+
+def _max_severity(*levels) -> str:
+    return max(levels, key=SEVERITY_ORDER.index)
+
+def record_threat(ip_address, pattern, path, method='', user_agent='', user_id=None, sample=''):
+    """Comptabilise une requête bloquée dans la fenêtre courante"""
+    window_seconds = _config().get('WINDOW_SECONDS', 60)
+    now = time.time()
+    window_start = int(now // window_seconds) * window_seconds
+    fingerprint = incident_fingerprint(ip_address, pattern, path)
+    key = f"{INCIDENT_KEY_PREFIX}:{window_start}:{fingerprint}"
+
+    try:
+        pipe = get_redis_connection().pipeline(transaction=False)
+        pipe.hincrby(key, 'hit_count', 1)
+        pipe.hsetnx(key, 'first_seen', now)
+        pipe.hset(key, 'last_seen', now)
+        pipe.hsetnx(key, 'fingerprint', fingerprint)
+        pipe.hsetnx(key, 'ip_address', ip_address or '')
+        pipe.hsetnx(key, 'pattern', pattern)
+        pipe.hsetnx(key, 'path', path)
+        pipe.hsetnx(key, 'method', method)
+        pipe.hsetnx(key, 'user_agent', user_agent[:500])
+        pipe.hsetnx(key, 'user_id', str(user_id) if user_id else '')
+        pipe.hsetnx(key, 'sample', sample[:500])
+        # Filet de sécurité si aucun vidage n'a lieu (les fenêtres sont vidées bien avant)
+        pipe.expire(key, window_seconds * 10 + 3600)
+        pipe.zadd(PENDING_INCIDENTS_KEY, {key: window_start})
+        pipe.execute()
+    except Exception as e:
+        # Redis indisponible : l'incident est écrit directement pour ne pas être perdu
+        logger.error(f"Agrégation des incidents indisponible: {str(e)}")
+        _apply_aggregates([{
+            'hit_count': '1', 'first_seen': now, 'last_seen': now, 'fingerprint': fingerprint,
+            'ip_address': ip_address or '', 'pattern': pattern, 'path': path, 'method': method,
+            'user_agent': user_agent[:500], 'user_id': str(user_id) if user_id else '',
+            'sample': sample[:500],
+        }])
+
+def _merge(aggregates):
+    """Regroupe les fenêtres d'une même empreinte"""
+    merged = {}
+    for aggregate in aggregates:
+        current = merged.get(aggregate['fingerprint'])
+        if current is None:
+            merged[aggregate['fingerprint']] = dict(aggregate, hit_count=int(aggregate['hit_count']))
+            continue
+        current['hit_count'] += int(aggregate['hit_count'])
+        current['first_seen'] = min(float(current['first_seen']), float(aggregate['first_seen']))
+        current['last_seen'] = max(float(current['last_seen']), float(aggregate['last_seen']))
+    return merged
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+
+def upsert_incidents(candidates, severity_for=None):
+    """Prolonge les incidents ouverts de même empreinte et crée les autres.
+
+    ``candidates`` sont des ``SecurityIncident`` non enregistrés portant
+    ``fingerprint``, ``hit_count``, ``first_seen`` et ``last_seen``. La gravité
+    n'est jamais abaissée ; ``severity_for(hit_count)`` permet de l'escalader
+    selon le cumul. Trois requêtes au plus. Retourne les incidents touchés,
+    le ``hit_count`` précédent des incidents prolongés et les incidents escaladés.
+    """
+    from apps.core.models import SecurityIncident
+
+    if not candidates:
+        return [], {}, []
+
+    merge_since = timezone.now() - timedelta(seconds=_config().get('MERGE_SECONDS', 3600))
+    open_incidents = {}
+    for incident in SecurityIncident.objects.filter(  # type: ignore[attr-defined]
+        fingerprint__in=[candidate.fingerprint for candidate in candidates],
+        status__in=['open', 'investigating'],
+        last_seen__gte=merge_since,
+    ).order_by('last_seen'):
+        open_incidents[incident.fingerprint] = incident
+
+    to_update = []
+    to_create = []
+    escalated = []
+    previous_hits = {}
+    for candidate in candidates:
+        incident = open_incidents.get(candidate.fingerprint)
+
+        if incident is None:
+            if severity_for is not None:
+                candidate.severity = _max_severity(candidate.severity, severity_for(candidate.hit_count))
+            to_create.append(candidate)
+            continue
+
+        previous_hits[incident.fingerprint] = incident.hit_count
+        incident.hit_count += candidate.hit_count
+        incident.first_seen = min(incident.first_seen, candidate.first_seen)
+        incident.last_seen = max(incident.last_seen, candidate.last_seen)
+        severity = _max_severity(incident.severity, candidate.severity)
+        if severity_for is not None:
+            severity = _max_severity(severity, severity_for(incident.hit_count))
+        if severity != incident.severity:
+            escalated.append(incident)
+        incident.severity = severity
+        to_update.append(incident)
+
+    if to_update:
+        SecurityIncident.objects.bulk_update(  # type: ignore[attr-defined]
+            to_update, ['hit_count', 'first_seen', 'last_seen', 'severity']
+        )
+    if to_create:
+        SecurityIncident.objects.bulk_create(to_create)  # type: ignore[attr-defined]
+
+    return to_update + to_create, previous_hits, escalated + to_create
+
+def _apply_aggregates(aggregates) -> int:
+    """Transforme les compteurs agrégés en incidents"""
+    from apps.core.models import SecurityIncident
+
+    merged = _merge(aggregates)
+    candidates = [
+        SecurityIncident(
+            title="Tentative d'attaque détectée",
+            description=f"Pattern suspect détecté: {aggregate['sample']}",
+            severity='low',
+            ip_address=aggregate['ip_address'] or None,
+            user_agent=aggregate['user_agent'],
+            request_data={
+                'path': aggregate['path'],
+                'method': aggregate['method'],
+                'pattern': aggregate['pattern'],
+                'data': aggregate['sample'],
+            },
+            affected_user_id=aggregate['user_id'] or None,
+            fingerprint=fingerprint,
+            hit_count=aggregate['hit_count'],
+            first_seen=_to_datetime(aggregate['first_seen']),
+            last_seen=_to_datetime(aggregate['last_seen']),
+        )
+        for fingerprint, aggregate in merged.items()
+    ]
+    incidents, previous_hits, escalated = upsert_incidents(candidates, severity_for=severity_for_hits)
+
+    _block_sources(incidents, previous_hits)
+
+    for incident in escalated:
+        if incident.severity == 'critical':
+            logger.critical(
+                f"Incident critique: {incident.hit_count} requêtes bloquées depuis {incident.ip_address}"
+            )
+    return len(incidents)
+
+def _block_sources(incidents, previous_hits):
+    """Bloque les IP dont l'incident vient de franchir le seuil de blocage"""
+    config = getattr(settings, 'IP_BLOCKLIST', {})
+    block_hits = config.get('INCIDENT_BLOCK_HITS', 20)
+    for incident in incidents:
+        if not incident.ip_address:
+            continue
+        if previous_hits.get(incident.fingerprint, 0) < block_hits <= incident.hit_count:
+            block_ip(
+                incident.ip_address,
+                config.get('INCIDENT_BLOCK_SECONDS', 86400),
+                reason=f'security_incident:{incident.fingerprint}',
+            )
+
+def flush_incident_aggregates(include_current=False) -> int:
+    """Écrit en base les fenêtres terminées et retourne le nombre d'incidents touchés"""
+    config = _config()
+    window_seconds = config.get('WINDOW_SECONDS', 60)
+    batch_size = config.get('FLUSH_BATCH_SIZE', 500)
+    client = get_redis_connection()
+    now = time.time()
+    # Une fenêtre est close quand sa fin est passée (la fenêtre courante est exclue)
+    max_window = '+inf' if include_current else now - window_seconds
+    flushed = 0
+
+    while True:
+        keys = client.zrangebyscore(PENDING_INCIDENTS_KEY, '-inf', max_window, start=0, num=batch_size)
+        if not keys:
+            break
+
+        # Lecture et suppression atomiques : un autre worker ne relira pas ces fenêtres
+        pipe = client.pipeline(transaction=True)
+        for key in keys:
+            pipe.hgetall(key)
+        pipe.delete(*keys)
+        pipe.zrem(PENDING_INCIDENTS_KEY, *keys)
+        results = pipe.execute()
+        aggregates = [aggregate for aggregate in results[:len(keys)] if aggregate]
+
+        try:
+            flushed += _apply_aggregates(aggregates)
+        except Exception:
+            # Remettre les compteurs pour le prochain passage
+            pipe = client.pipeline(transaction=True)
+            for key, aggregate in zip(keys, results[:len(keys)]):
+                if aggregate:
+                    pipe.hset(key, mapping=aggregate)
+                    pipe.zadd(PENDING_INCIDENTS_KEY, {key: float(key.split(':')[3])})
+            pipe.execute()
+            raise
+
+        if len(keys) < batch_size:
+            break
+
+    return flushed
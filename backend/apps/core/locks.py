@@ -0,0 +1,187 @@
+"""
+Verrous distribués Redis et exécution unique des tâches périodiques
+
+``RedisLock`` repose sur ``SET key token NX PX ttl`` : seul le détenteur du
+jeton peut prolonger (``PEXPIRE``) ou libérer (``DEL``) le verrou, via des
+scripts Lua atomiques. Tant que le traitement dure, un thread renouvelle le
+verrou ; si le worker meurt, le verrou expire au bout du TTL.
+
+``single_flight`` applique ce verrou à une tâche Celery : une exécution qui
+démarre alors qu'une autre est en cours (autre worker, autre nœud, beat en
+double) est ignorée. La durée de chaque exécution et l'horodatage du dernier
+succès sont enregistrés dans les métriques.
+"""
+from django.conf import settings
+from django.utils import timezone
+from datetime import datetime
+from functools import wraps
+import logging
+import threading
+import time
+import uuid
+
+from . import metrics
+from .redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+LAST_SUCCESS_KEY = 'tasks:last_success'
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+class LockLost(Exception):
+    """Le verrou a expiré ou a été repris par un autre détenteur"""
+
+class RedisLock:
+    """Verrou distribué à jeton avec renouvellement automatique"""
+
+    def __init__(self, name, ttl=None, renew_interval=None, client=None):
+        config = settings.TASK_LOCKS
+        self.key = f"locks:{name}"
+        self.ttl_ms = int((ttl or config.get('TTL_SECONDS', 300)) * 1000)
+        self.renew_interval = renew_interval or (self.ttl_ms / 1000) * config.get('RENEW_RATIO', 1 / 3)
+        self.client = client or get_redis_connection()
+        self.token = uuid.uuid4().hex
+        self.lost = False
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def acquire(self) -> bool:
+        """Tente de prendre le verrou sans attendre"""
+        if not self.client.set(self.key, self.token, nx=True, px=self.ttl_ms):
+            return False
+        self._stop.clear()
+        self._renewer = threading.Thread(target=self._renew_loop, name=f"lock-renew:{self.key}", daemon=True)
+        self._renewer.start()
+        return True
+
+    def renew(self) -> bool:
+        """Prolonge le verrou si on le détient toujours"""
+        return bool(self.client.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.ttl_ms))
+
+    def release(self) -> bool:
+        """Libère le verrou s'il nous appartient encore"""
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join(timeout=self.renew_interval)
+            self._renewer = None
+        try:
+            return bool(self.client.eval(_RELEASE_SCRIPT, 1, self.key, self.token))
+        except Exception as e:
+            logger.error(f"Erreur de libération du verrou {self.key}: {str(e)}")
+            return False
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.renew_interval):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    logger.warning(f"Verrou {self.key} perdu pendant l'exécution")
+                    return
+            except Exception as e:
+                # Redis momentanément indisponible : on réessaie au prochain tour,
+                # le TTL laisse encore le temps de renouveler.
+                logger.error(f"Erreur de renouvellement du verrou {self.key}: {str(e)}")
+
+    def __enter__(self):
+        if not self.acquire():
+            raise LockLost(f"Verrou {self.key} déjà détenu")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+def get_last_success(name):
+    """Horodatage ISO du dernier succès d'une tâche (None si jamais)"""
+    return get_redis_connection().hget(LAST_SUCCESS_KEY, name)
+
+def get_last_successes():
+    """Derniers succès de toutes les tâches à exécution unique"""
+    return get_redis_connection().hgetall(LAST_SUCCESS_KEY)
+
+def _default_lock_name(func, args):
+    name = f"{func.__module__}.{func.__name__}"
+    if args:
+        name = f"{name}:{':'.join(str(arg) for arg in args)}"
+    return name
+
+def _ran_recently(name, min_interval, metric) -> bool:
+    """Le dernier succès date de moins de ``min_interval`` secondes"""
+    if not min_interval:
+        return False
+    last_success = get_last_success(name)
+    if not last_success:
+        return False
+    elapsed = (timezone.now() - datetime.fromisoformat(last_success)).total_seconds()
+    if elapsed >= min_interval:
+        return False
+    metrics.increment(f"{metric}.skipped")
+    logger.info(f"Tâche {name} ignorée: dernier succès il y a {int(elapsed)}s")
+    return True
+
+def single_flight(ttl=None, min_interval=None, key=None):
+    """Décorateur d'exécution unique pour les tâches Celery périodiques.
+
+    À placer sous ``@shared_task`` :
+
+        @shared_task
+        @single_flight(ttl=600)
+        def check_low_stock(): ...
+
+    - ``ttl`` : durée du verrou en secondes (renouvelé tant que la tâche tourne) ;
+    - ``min_interval`` : ignore l'exécution si le dernier succès date de moins
+      de ``min_interval`` secondes (déclenchements en double de beat) ;
+    - ``key`` : fonction ``(args, kwargs) -> str`` donnant le nom du verrou ;
+      par défaut le nom de la tâche suivi des arguments positionnels, pour que
+      des exécutions sur des paramètres différents restent indépendantes.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            name = key(args, kwargs) if key else _default_lock_name(func, args)
+            metric = f"tasks.{func.__module__}.{func.__name__}"
+
+            if _ran_recently(name, min_interval, metric):
+                return None
+
+            lock = RedisLock(name, ttl=ttl)
+            if not lock.acquire():
+                metrics.increment(f"{metric}.skipped")
+                logger.info(f"Tâche {name} ignorée: une exécution est déjà en cours")
+                return None
+            # Une exécution en double a pu terminer entre la vérification et l'acquisition
+            if _ran_recently(name, min_interval, metric):
+                lock.release()
+                return None
+
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                metrics.increment(f"{metric}.failed")
+                raise
+            else:
+                get_redis_connection().hset(LAST_SUCCESS_KEY, name, timezone.now().isoformat())
+                metrics.increment(f"{metric}.succeeded")
+                return result
+            finally:
+                metrics.record_timing(f"{metric}.duration", (time.perf_counter() - started) * 1000)
+                lock.release()
+                if lock.lost:
+                    metrics.increment(f"{metric}.lock_lost")
+
+        return wrapper
+    return decorator
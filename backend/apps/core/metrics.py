@@ -0,0 +1,146 @@
+"""
+Métriques applicatives (compteurs et durées) partagées entre processus
+
+Les métriques sont stockées dans Redis pour agréger les mesures de tous les
+workers (web et Celery) :
+
+- ``metrics:counter:<nom>`` : compteur incrémenté atomiquement ;
+- ``metrics:timing:<nom>`` : hash (count, total_ms, max_ms, last_ms, last_at) ;
+- ``metrics:samples:<nom>`` : dernières durées, pour les percentiles.
+
+L'enregistrement d'une métrique ne doit jamais faire échouer le code mesuré :
+les erreurs Redis sont journalisées puis ignorées.
+"""
+from django.utils import timezone
+from contextlib import contextmanager
+import logging
+import math
+import time
+
+from .redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+METRICS_INDEX_KEY = 'metrics:index'
+MAX_SAMPLES = 500
+
+# Maximum atomique : HSET uniquement si la nouvelle valeur est plus grande
+_HMAX_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if tonumber(ARGV[2]) > current then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return 1
+"""
+
+def _counter_key(name):
+    return f"metrics:counter:{name}"
+
+def _timing_key(name):
+    return f"metrics:timing:{name}"
+
+def _samples_key(name):
+    return f"metrics:samples:{name}"
+
+def increment(name, amount=1):
+    """Incrémente un compteur"""
+    try:
+        client = get_redis_connection()
+        pipe = client.pipeline(transaction=False)
+        pipe.incrby(_counter_key(name), amount)
+        pipe.sadd(METRICS_INDEX_KEY, f"counter:{name}")
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Métrique {name} non enregistrée: {str(e)}")
+
+def record_timing(name, duration_ms):
+    """Enregistre une durée (en millisecondes)"""
+    duration_ms = round(float(duration_ms), 3)
+    try:
+        client = get_redis_connection()
+        key = _timing_key(name)
+        pipe = client.pipeline(transaction=False)
+        pipe.hincrby(key, 'count', 1)
+        pipe.hincrbyfloat(key, 'total_ms', duration_ms)
+        pipe.hset(key, mapping={'last_ms': duration_ms, 'last_at': timezone.now().isoformat()})
+        pipe.eval(_HMAX_SCRIPT, 1, key, 'max_ms', duration_ms)
+        pipe.lpush(_samples_key(name), duration_ms)
+        pipe.ltrim(_samples_key(name), 0, MAX_SAMPLES - 1)
+        pipe.sadd(METRICS_INDEX_KEY, f"timing:{name}")
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Métrique {name} non enregistrée: {str(e)}")
+
+@contextmanager
+def timed(name):
+    """Mesure la durée du bloc et l'enregistre sous ``name``"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, (time.perf_counter() - started) * 1000)
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche d'une liste de valeurs"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def get_timing(name):
+    """Statistiques d'une durée (moyenne, max, p50, p95, p99 sur les derniers échantillons)"""
+    client = get_redis_connection()
+    pipe = client.pipeline(transaction=False)
+    pipe.hgetall(_timing_key(name))
+    pipe.lrange(_samples_key(name), 0, -1)
+    data, samples = pipe.execute()
+    if not data:
+        return None
+
+    count = int(data.get('count', 0))
+    total = float(data.get('total_ms', 0))
+    samples = [float(value) for value in samples]
+    return {
+        'count': count,
+        'avg_ms': round(total / count, 3) if count else None,
+        'max_ms': float(data.get('max_ms', 0)),
+        'last_ms': float(data.get('last_ms', 0)),
+        'last_at': data.get('last_at'),
+        'p50_ms': percentile(samples, 0.50),
+        'p95_ms': percentile(samples, 0.95),
+        'p99_ms': percentile(samples, 0.99),
+    }
+
+def get_counter(name):
+    value = get_redis_connection().get(_counter_key(name))
+    return int(value) if value is not None else 0
+
+def snapshot(prefix=''):
+    """Toutes les métriques enregistrées (filtrées par préfixe de nom)"""
+    counters = {}
+    timings = {}
+    for entry in sorted(get_redis_connection().smembers(METRICS_INDEX_KEY)):
+        kind, name = entry.split(':', 1)
+        if not name.startswith(prefix):
+            continue
+        if kind == 'counter':
+            counters[name] = get_counter(name)
+        else:
+            timing = get_timing(name)
+            if timing is not None:
+                timings[name] = timing
+    return {'counters': counters, 'timings': timings}
+
+def reset(prefix=''):
+    """Supprime les métriques (benchmarks, tests)"""
+    client = get_redis_connection()
+    for entry in client.smembers(METRICS_INDEX_KEY):
+        kind, name = entry.split(':', 1)
+        if not name.startswith(prefix):
+            continue
+        if kind == 'counter':
+            client.delete(_counter_key(name))
+        else:
+            client.delete(_timing_key(name), _samples_key(name))
+        client.srem(METRICS_INDEX_KEY, entry)
@@ -7,10 +7,169 @@ import logging
 import time
 import json
 
+from apps.core.blocklist import is_ip_blocked
+from apps.core.redis_client import get_redis_connection
+from apps.core.utils import get_client_ip
+
 logger = logging.getLogger(__name__)
 
+# Directives CSP lues dans les paramètres CSP_* (mêmes noms que django-csp)
+CSP_DIRECTIVES = [
+    ('default-src', 'CSP_DEFAULT_SRC'),
+    ('script-src', 'CSP_SCRIPT_SRC'),
+    ('style-src', 'CSP_STYLE_SRC'),
+    ('img-src', 'CSP_IMG_SRC'),
+    ('font-src', 'CSP_FONT_SRC'),
+    ('connect-src', 'CSP_CONNECT_SRC'),
+    ('media-src', 'CSP_MEDIA_SRC'),
+    ('object-src', 'CSP_OBJECT_SRC'),
+    ('frame-src', 'CSP_FRAME_SRC'),
+    ('worker-src', 'CSP_WORKER_SRC'),
+    ('frame-ancestors', 'CSP_FRAME_ANCESTORS'),
+    ('base-uri', 'CSP_BASE_URI'),
+    ('form-action', 'CSP_FORM_ACTION'),
+    ('report-uri', 'CSP_REPORT_URI'),
+]
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def build_content_security_policy() -> str:
+    """Construit l'en-tête CSP à partir des paramètres CSP_*"""
+    parts = []
+    for directive, setting_name in CSP_DIRECTIVES:
+        sources = getattr(settings, setting_name, None)
+        if sources:
+            if isinstance(sources, str):
+                sources = [sources]
+            parts.append(f"{directive} {' '.join(sources)}")
+    return '; '.join(parts)
+
+def build_security_headers():
+    """En-têtes de sécurité communs à toutes les réponses"""
+    headers = {
+        'X-Content-Type-Options': 'nosniff',
+        'X-Frame-Options': getattr(settings, 'X_FRAME_OPTIONS', 'DENY'),
+        'X-XSS-Protection': '1; mode=block',
+        'Referrer-Policy': getattr(settings, 'SECURE_REFERRER_POLICY', None) or 'strict-origin-when-cross-origin',
+        'Permissions-Policy': settings.SECURITY_PIPELINE.get(
+            'PERMISSIONS_POLICY', 'geolocation=(), microphone=(), camera=()'
+        ),
+    }
+    csp = build_content_security_policy()
+    if csp:
+        headers['Content-Security-Policy'] = csp
+    
+    # HSTS en production
+    if not settings.DEBUG:
+        headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains; preload'
+    
+    return headers
+
+def parse_rate(rate):
+    """Convertit '5/m' en (5, 60)"""
+    count, period = rate.split('/')
+    return int(count), RATE_PERIODS[period[0]]
+
+class SecurityPipelineMiddleware(MiddlewareMixin):
+    """Contrôles de sécurité en un seul passage, juste après ``CorsMiddleware``.
+    
+    Placé après CORS, ses réponses 403 et 429 reçoivent les en-têtes CORS :
+    le client web peut lire l'erreur et ``Retry-After``. L'adresse cliente
+    est celle de ``get_client_ip`` (proxys de confiance uniquement).
+    
+    - IP bloquée : recherche en mémoire (``apps.core.blocklist``, alimentée
+      notamment par les verrouillages après échecs de connexion) ;
+    - limitation de débit par IP : tous les compteurs de la requête sont
+      incrémentés en un seul aller-retour Redis (pipeline) ;
+    - en-têtes de sécurité et CSP : calculés une fois au démarrage du
+      processus, copiés sur chaque réponse.
+    
+    Remplace ``SecurityHeadersMiddleware``, ``XFrameOptionsMiddleware`` et
+    ``CSPMiddleware``.
+    """
+    
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = settings.SECURITY_PIPELINE
+        self.headers = list(build_security_headers().items())
+        self.global_limit = parse_rate(config['IP_RATE']) if config.get('IP_RATE') else None
+        self.rate_rules = [
+            (index, prefix, method, *parse_rate(rate))
+            for index, (prefix, method, rate) in enumerate(config.get('RATE_LIMITS', []))
+        ]
+        self.excluded_paths = tuple(config.get('EXCLUDED_PATHS', ()))
+    
+    def process_request(self, request):
+        ip_address = get_client_ip(request)
+        if is_ip_blocked(ip_address):
+            logger.warning(f"Requête rejetée depuis une IP bloquée: {ip_address}")
+            return JsonResponse({
+                'error': _('Accès refusé.'),
+                'code': 'IP_BLOCKED'
+            }, status=403)
+        
+        if not getattr(settings, 'RATELIMIT_ENABLE', True) or request.path.startswith(self.excluded_paths):
+            return None
+        
+        retry_after = self._check_rate_limits(ip_address, request)
+        if retry_after:
+            logger.warning(f"Rate limit exceeded for IP {ip_address} on {request.path}")
+            response = JsonResponse({
+                'error': _('Trop de requêtes. Veuillez réessayer plus tard.'),
+                'retry_after': retry_after,
+                'code': 'RATE_LIMITED'
+            }, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+        
+        return None
+    
+    def _matching_limits(self, request):
+        """Limites applicables : globale par IP et première règle correspondante"""
+        limits = []
+        if self.global_limit:
+            limits.append(('all', *self.global_limit))
+        for index, prefix, method, limit, window in self.rate_rules:
+            if request.path.startswith(prefix) and (method is None or request.method == method):
+                limits.append((index, limit, window))
+                break
+        return limits
+    
+    def _check_rate_limits(self, ip_address, request):
+        """Incrémente les compteurs (fenêtres fixes) ; retourne le délai d'attente si dépassé"""
+        limits = self._matching_limits(request)
+        if not limits:
+            return None
+        
+        now = int(time.time())
+        try:
+            pipe = get_redis_connection().pipeline(transaction=False)
+            for rule, limit, window in limits:
+                key = f"ratelimit:{ip_address}:{rule}:{now // window}"
+                pipe.incr(key)
+                pipe.expire(key, window)
+            counts = pipe.execute()[::2]
+        except Exception as e:
+            # Redis indisponible : ne pas bloquer le trafic légitime
+            logger.error(f"Limitation de débit indisponible: {str(e)}")
+            return None
+        
+        for (rule, limit, window), count in zip(limits, counts):
+            if count > limit:
+                return window - now % window
+        return None
+    
+    def process_response(self, request, response):
+        for name, value in self.headers:
+            if name in response:
+                continue
+            if name == 'X-Frame-Options' and getattr(response, 'xframe_options_exempt', False):
+                continue
+            response[name] = value
+        return response
+
 class SecurityHeadersMiddleware(MiddlewareMixin):
-    """Middleware pour ajouter des en-têtes de sécurité"""
+    """Middleware pour ajouter des en-têtes de sécurité (remplacé par SecurityPipelineMiddleware)"""
     
     def process_response(self, request, response):
         # En-têtes de sécurité
@@ -71,12 +230,7 @@ class AuditLogMiddleware(MiddlewareMixin):
     
     def get_client_ip(self, request):
         """Obtient l'adresse IP réelle du client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return get_client_ip(request)
 
 class RateLimitMiddleware(MiddlewareMixin):
     """Middleware pour la limitation de débit"""
@@ -120,12 +274,7 @@ class RateLimitMiddleware(MiddlewareMixin):
     
     def get_client_ip(self, request):
         """Obtient l'adresse IP réelle du client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return get_client_ip(request)
 
 class APIVersionMiddleware(MiddlewareMixin):
     """Middleware pour la gestion des versions d'API"""
@@ -164,12 +313,7 @@ class RequestLoggingMiddleware(MiddlewareMixin):
     
     def get_client_ip(self, request):
         """Obtient l'adresse IP réelle du client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return get_client_ip(request)
 
 class DatabaseConnectionMiddleware(MiddlewareMixin):
     """Middleware pour optimiser les connexions à la base de données"""
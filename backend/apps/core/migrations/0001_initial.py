@@ -0,0 +1,115 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('children', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecurityIncident',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200, verbose_name='Titre')),
+                ('description', models.TextField(verbose_name='Description')),
+                ('severity', models.CharField(choices=[('low', 'Faible'), ('medium', 'Moyen'), ('high', 'Élevé'), ('critical', 'Critique')], max_length=20, verbose_name='Gravité')),
+                ('status', models.CharField(choices=[('open', 'Ouvert'), ('investigating', "En cours d'investigation"), ('resolved', 'Résolu'), ('closed', 'Fermé')], default='open', max_length=20, verbose_name='Statut')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='Adresse IP')),
+                ('user_agent', models.TextField(blank=True, verbose_name='User Agent')),
+                ('request_data', models.JSONField(blank=True, default=dict, verbose_name='Données de requête')),
+                ('actions_taken', models.TextField(blank=True, verbose_name='Actions prises')),
+                ('resolution_notes', models.TextField(blank=True, verbose_name='Notes de résolution')),
+                ('detected_at', models.DateTimeField(auto_now_add=True, verbose_name='Détecté le')),
+                ('resolved_at', models.DateTimeField(blank=True, null=True, verbose_name='Résolu le')),
+                ('affected_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='core_affected', to=settings.AUTH_USER_MODEL)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='core_assigned', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Incident de sécurité',
+                'verbose_name_plural': 'Incidents de sécurité',
+                'ordering': ['-detected_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DataRetention',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model_name', models.CharField(max_length=100, verbose_name='Modèle')),
+                ('object_id', models.CharField(max_length=100, verbose_name='ID Objet')),
+                ('retention_period_days', models.PositiveIntegerField(verbose_name='Période de rétention (jours)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('expires_at', models.DateTimeField(verbose_name='Expire le')),
+                ('is_anonymized', models.BooleanField(default=False, verbose_name='Anonymisé')),
+                ('anonymized_at', models.DateTimeField(blank=True, null=True, verbose_name='Anonymisé le')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='Supprimé')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Supprimé le')),
+                ('retention_reason', models.TextField(blank=True, verbose_name='Raison de conservation')),
+                ('legal_hold', models.BooleanField(default=False, verbose_name='Conservation légale')),
+            ],
+            options={
+                'verbose_name': 'Rétention de données',
+                'verbose_name_plural': 'Rétentions de données',
+                'unique_together': {('model_name', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GDPRConsent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('consent_type', models.CharField(choices=[('data_processing', 'Traitement des données'), ('medical_data', 'Données médicales'), ('photo_usage', 'Utilisation des photos'), ('communication', 'Communications'), ('research', 'Recherche')], max_length=30, verbose_name='Type de consentement')),
+                ('purpose', models.TextField(verbose_name='Finalité')),
+                ('legal_basis', models.CharField(max_length=200, verbose_name='Base légale')),
+                ('granted', models.BooleanField(default=False, verbose_name='Accordé')),
+                ('granted_at', models.DateTimeField(blank=True, null=True, verbose_name='Accordé le')),
+                ('withdrawn_at', models.DateTimeField(blank=True, null=True, verbose_name='Retiré le')),
+                ('version', models.CharField(default='1.0', max_length=10, verbose_name='Version')),
+                ('ip_address', models.GenericIPAddressField(verbose_name='Adresse IP')),
+                ('user_agent', models.TextField(verbose_name='User Agent')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('child', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='core_child', to='children.child')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='core_gdpr_consents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Consentement RGPD',
+                'verbose_name_plural': 'Consentements RGPD',
+                'unique_together': {('child', 'user', 'consent_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditTrail',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('session_key', models.CharField(blank=True, max_length=40, verbose_name='Clé de session')),
+                ('action', models.CharField(choices=[('create', 'Création'), ('read', 'Lecture'), ('update', 'Modification'), ('delete', 'Suppression'), ('login', 'Connexion'), ('logout', 'Déconnexion'), ('export', 'Export'), ('import', 'Import')], max_length=20, verbose_name='Action')),
+                ('model_name', models.CharField(max_length=100, verbose_name='Modèle')),
+                ('object_id', models.CharField(blank=True, max_length=100, verbose_name='ID Objet')),
+                ('object_repr', models.CharField(blank=True, max_length=200, verbose_name='Représentation')),
+                ('changes', models.JSONField(blank=True, default=dict, verbose_name='Modifications')),
+                ('additional_data', models.JSONField(blank=True, default=dict, verbose_name='Données supplémentaires')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='Adresse IP')),
+                ('user_agent', models.TextField(blank=True, verbose_name='User Agent')),
+                ('request_path', models.CharField(blank=True, max_length=500, verbose_name='Chemin de requête')),
+                ('request_method', models.CharField(blank=True, max_length=10, verbose_name='Méthode HTTP')),
+                ('timestamp', models.DateTimeField(auto_now_add=True, verbose_name='Horodatage')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='Somme de contrôle')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='core_audit_trails', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "Piste d'audit",
+                'verbose_name_plural': "Pistes d'audit",
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['user', 'timestamp'], name='core_auditt_user_id_934dea_idx'), models.Index(fields=['model_name', 'object_id'], name='core_auditt_model_n_da1e68_idx'), models.Index(fields=['action', 'timestamp'], name='core_auditt_action_7b8887_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='securityincident',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Empreinte'),
+        ),
+        migrations.AddField(
+            model_name='securityincident',
+            name='first_seen',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Première occurrence'),
+        ),
+        migrations.AddField(
+            model_name='securityincident',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=1, verbose_name='Nombre de requêtes'),
+        ),
+        migrations.AddField(
+            model_name='securityincident',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Dernière occurrence'),
+        ),
+    ]
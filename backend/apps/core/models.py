@@ -73,7 +73,7 @@ class AuditTrail(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name='core_user',
+        related_name='core_audit_trails',
         null=True,
         blank=True
     )
@@ -143,7 +143,7 @@ class GDPRConsent(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name='core_user',
+        related_name='core_gdpr_consents',
         null=True,
         blank=True
     )
@@ -249,6 +249,12 @@ class SecurityIncident(models.Model):
         blank=True
     )
     
+    # Agrégation des requêtes bloquées (apps.core.incidents)
+    fingerprint = models.CharField(_('Empreinte'), max_length=32, blank=True, db_index=True)
+    hit_count = models.PositiveIntegerField(_('Nombre de requêtes'), default=1)
+    first_seen = models.DateTimeField(_('Première occurrence'), null=True, blank=True)
+    last_seen = models.DateTimeField(_('Dernière occurrence'), null=True, blank=True)
+    
     # Actions prises
     actions_taken = models.TextField(_('Actions prises'), blank=True)
     resolution_notes = models.TextField(_('Notes de résolution'), blank=True)
@@ -13,6 +13,15 @@ class HasRolePermission(permissions.BasePermission):
         
         return request.user.role in self.allowed_roles or request.user.role == 'admin'
 
+class IsAdminRole(permissions.BasePermission):
+    """Permission réservée aux administrateurs"""
+    
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+        
+        return request.user.role == 'admin'
+
 class IsOwnerOrAdmin(permissions.BasePermission):
     """Permission pour le propriétaire ou l'admin"""
     
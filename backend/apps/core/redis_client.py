@@ -0,0 +1,57 @@
+"""
+Connexions Redis partagées (pub/sub, compteurs atomiques, verrous)
+
+L'URL est lue dans ``settings.REDIS_URL``. Le schéma ``fakeredis://`` permet
+d'utiliser un serveur Redis en mémoire (paquet ``fakeredis``) pour les tests
+et le développement sans Redis.
+"""
+from django.conf import settings
+import threading
+
+import redis
+import redis.asyncio
+
+_lock = threading.Lock()
+_clients = {}
+_fake_server = None
+
+def _is_fake(url: str) -> bool:
+    return url.startswith('fakeredis://')
+
+def _get_fake_server():
+    """Serveur fakeredis partagé par toutes les connexions du processus"""
+    global _fake_server
+    import fakeredis
+
+    with _lock:
+        if _fake_server is None:
+            _fake_server = fakeredis.FakeServer()
+        return _fake_server
+
+def get_redis_connection() -> redis.Redis:
+    """Retourne le client Redis synchrone du processus (thread-safe)"""
+    url = settings.REDIS_URL
+    client = _clients.get(url)
+    if client is not None:
+        return client
+
+    if _is_fake(url):
+        import fakeredis
+        client = fakeredis.FakeRedis(server=_get_fake_server(), decode_responses=True)
+    else:
+        client = redis.Redis.from_url(url, decode_responses=True)
+
+    with _lock:
+        return _clients.setdefault(url, client)
+
+def get_async_redis_connection() -> redis.asyncio.Redis:
+    """Retourne un nouveau client Redis asynchrone.
+
+    Les clients asyncio sont liés à la boucle d'événements courante : ils ne
+    sont donc pas mis en cache et doivent être fermés par l'appelant.
+    """
+    url = settings.REDIS_URL
+    if _is_fake(url):
+        import fakeredis.aioredis
+        return fakeredis.aioredis.FakeRedis(server=_get_fake_server(), decode_responses=True)
+    return redis.asyncio.from_url(url, decode_responses=True)
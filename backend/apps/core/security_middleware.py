@@ -3,7 +3,9 @@ from django.http import JsonResponse, HttpResponseForbidden
 from django.core.cache import cache
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from apps.core.models import SecurityIncident, AuditTrail
+from apps.core.models import AuditTrail
+from apps.core.incidents import record_threat
+from apps.core.utils import get_client_ip
 import logging
 import json
 import hashlib
@@ -56,7 +58,7 @@ class ThreatDetectionMiddleware(MiddlewareMixin):
     """Middleware pour détecter les menaces de sécurité"""
     
     def __init__(self, get_response):
-        self.get_response = get_response
+        super().__init__(get_response)
         self.suspicious_patterns = [
             r'<script[^>]*>.*?</script>',  # XSS
             r'union\s+select',  # SQL Injection
@@ -69,25 +71,22 @@ class ThreatDetectionMiddleware(MiddlewareMixin):
     
     def process_request(self, request):
         # Vérifier les patterns suspects dans les données
-        suspicious_data = self._check_for_threats(request)
+        threat = self._check_for_threats(request)
         
-        if suspicious_data:
-            # Logger l'incident
-            logger.warning(f"Threat detected from {self._get_client_ip(request)}: {suspicious_data}")
+        if threat:
+            pattern, suspicious_data = threat
+            ip_address = self._get_client_ip(request)
+            logger.warning(f"Threat detected from {ip_address}: {suspicious_data}")
             
-            # Créer un incident de sécurité
-            SecurityIncident.objects.create(
-                title="Tentative d'attaque détectée",
-                description=f"Pattern suspect détecté: {suspicious_data}",
-                severity='high',
-                ip_address=self._get_client_ip(request),
+            # Comptabiliser l'incident (agrégé par IP, pattern et chemin, écrit par lots)
+            record_threat(
+                ip_address,
+                pattern,
+                request.path,
+                method=request.method,
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                request_data={
-                    'path': request.path,
-                    'method': request.method,
-                    'data': str(suspicious_data)[:500]  # Limiter la taille
-                },
-                affected_user=request.user if request.user.is_authenticated else None
+                user_id=request.user.pk if request.user.is_authenticated else None,
+                sample=str(suspicious_data),
             )
             
             # Bloquer la requête
@@ -99,7 +98,7 @@ class ThreatDetectionMiddleware(MiddlewareMixin):
         return None
     
     def _check_for_threats(self, request):
-        """Vérifie la présence de patterns suspects"""
+        """Vérifie la présence de patterns suspects (retourne le pattern et la donnée)"""
         import re
         
         # Données à vérifier
@@ -109,33 +108,41 @@ class ThreatDetectionMiddleware(MiddlewareMixin):
         for key, value in request.GET.items():
             data_to_check.append(f"{key}={value}")
         
-        # Données POST
-        if hasattr(request, 'body') and request.body:
+        # Données POST : seuls les petits corps JSON ou urlencoded sont lus. Les
+        # envois multipart (photos, documents) ne sont ni mis en mémoire ni
+        # soumis à DATA_UPLOAD_MAX_MEMORY_SIZE avant d'atteindre la vue.
+        if self._should_scan_body(request):
             try:
                 if request.content_type == 'application/json':
                     data_to_check.append(request.body.decode('utf-8'))
-                elif request.content_type == 'application/x-www-form-urlencoded':
+                else:
                     for key, value in request.POST.items():
                         data_to_check.append(f"{key}={value}")
-            except:
+            except Exception:
                 pass
         
         # Vérifier chaque pattern
         for data in data_to_check:
             for pattern in self.suspicious_patterns:
                 if re.search(pattern, data, re.IGNORECASE):
-                    return data[:100]  # Retourner les premiers 100 caractères
+                    return pattern, data[:100]  # Pattern et premiers 100 caractères
         
         return None
     
+    def _should_scan_body(self, request):
+        """Corps de type analysé et de taille annoncée raisonnable"""
+        config = getattr(settings, 'SECURITY_INCIDENTS', {})
+        if request.content_type not in config.get('SCANNED_CONTENT_TYPES', ['application/json', 'application/x-www-form-urlencoded']):
+            return False
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return False
+        return 0 < content_length <= config.get('MAX_SCANNED_BODY_BYTES', 1048576)
+    
     def _get_client_ip(self, request):
         """Obtient l'adresse IP du client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return get_client_ip(request)
 
 class RateLimitMiddleware(MiddlewareMixin):
     """Middleware avancé pour la limitation de débit"""
@@ -208,12 +215,7 @@ class RateLimitMiddleware(MiddlewareMixin):
     
     def _get_client_ip(self, request):
         """Obtient l'adresse IP du client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return get_client_ip(request)
 
 class AuditMiddleware(MiddlewareMixin):
     """Middleware pour l'audit automatique des actions"""
@@ -312,9 +314,4 @@ class AuditMiddleware(MiddlewareMixin):
     
     def _get_client_ip(self, request):
         """Obtient l'adresse IP du client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return get_client_ip(request)
@@ -0,0 +1,36 @@
+"""
+Moteur de sessions en cache (Redis) avec écritures regroupées
+
+Avec ``SESSION_SAVE_EVERY_REQUEST``, Django réenregistre la session à chaque
+réponse pour faire glisser son expiration. Ce moteur stocke les sessions
+dans le cache et ignore ces réenregistrements tant que la session n'a pas
+été modifiée et que moins de ``SESSION_REFRESH_FRACTION`` de sa durée de vie
+s'est écoulée depuis la dernière écriture.
+
+Une session active reste donc prolongée (au plus une écriture par fraction
+de TTL) et une session inactive expire entre ``(1 - fraction) * TTL`` et
+``TTL`` après la dernière requête. Le cookie reste un cookie de session
+(``SESSION_EXPIRE_AT_BROWSER_CLOSE``).
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.cache import SessionStore as CacheSessionStore
+import time
+
+REFRESHED_AT_KEY = '_refreshed_at'
+
+class SessionStore(CacheSessionStore):
+    """Sessions en cache dont l'expiration n'est prolongée qu'au-delà d'une fraction du TTL"""
+
+    def refresh_due(self) -> bool:
+        """Vrai si l'expiration doit être prolongée"""
+        refreshed_at = self._session.get(REFRESHED_AT_KEY)
+        if refreshed_at is None:
+            return True
+        fraction = getattr(settings, 'SESSION_REFRESH_FRACTION', 0.25)
+        return time.time() - refreshed_at >= self.get_expiry_age() * fraction
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key is not None and not self.modified and not self.refresh_due():
+            return
+        self._session[REFRESHED_AT_KEY] = int(time.time())
+        super().save(must_create=must_create)
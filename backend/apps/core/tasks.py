@@ -0,0 +1,24 @@
+from celery import shared_task
+import logging
+
+from .blocklist import purge_expired_blocks
+from .incidents import flush_incident_aggregates
+from .locks import single_flight
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def flush_security_incidents():
+    """Écrit en base les incidents de sécurité agrégés des fenêtres terminées"""
+    incident_count = flush_incident_aggregates()
+    if incident_count:
+        logger.info(f"Incidents de sécurité agrégés enregistrés: {incident_count}")
+    return incident_count
+
+@shared_task
+@single_flight(ttl=600)
+def purge_ip_blocklist():
+    """Supprime les blocages d'IP expirés"""
+    purged_count = purge_expired_blocks()
+    logger.info(f"Blocages d'IP expirés supprimés: {purged_count}")
+    return f"Blocages supprimés: {purged_count}"
@@ -0,0 +1,213 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.core.incidents import INCIDENT_KEY_PREFIX, PENDING_INCIDENTS_KEY
+from apps.core.models import DataRetention, SecurityIncident
+from apps.core.redis_client import get_redis_connection
+from apps.core.tasks import flush_security_incidents
+from apps.core.transactions import TransactionRetryMixin
+from apps.core.utils import get_client_ip
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class SecurityIncidentFlushTests(TestCase):
+    """Requête bloquée par ThreatDetectionMiddleware jusqu'à l'incident en base"""
+
+    def setUp(self):
+        self.redis = get_redis_connection()
+        self._clear_pending()
+        self.addCleanup(self._clear_pending)
+
+    def _clear_pending(self):
+        keys = list(self.redis.scan_iter(f"{INCIDENT_KEY_PREFIX}:*"))
+        if keys:
+            self.redis.delete(*keys)
+        self.redis.delete(PENDING_INCIDENTS_KEY)
+
+    def _attack(self, count, at):
+        # Requêtes comptées dans une fenêtre déjà close au moment du vidage
+        with mock.patch('apps.core.incidents.time.time', return_value=at):
+            for _ in range(count):
+                response = self.client.get('/api/v1/children/', {'q': '<script>alert(1)</script>'}, REMOTE_ADDR='203.0.113.7')
+                self.assertEqual(response.status_code, 403)
+
+    def test_flush_writes_one_incident_per_source(self):
+        self._attack(3, time.time() - 3600)
+
+        self.assertEqual(flush_security_incidents(), 1)
+
+        incident = SecurityIncident.objects.get()  # type: ignore[attr-defined]
+        self.assertEqual(incident.hit_count, 3)
+        self.assertEqual(incident.ip_address, '203.0.113.7')
+        self.assertEqual(incident.request_data['path'], '/api/v1/children/')
+        self.assertEqual(incident.severity, 'high')
+        self.assertEqual(self.redis.zcard(PENDING_INCIDENTS_KEY), 0)
+
+    def test_flush_extends_open_incident(self):
+        self._attack(2, time.time() - 1800)
+        flush_security_incidents()
+        self._attack(4, time.time() - 600)
+
+        self.assertEqual(flush_security_incidents(), 1)
+
+        incident = SecurityIncident.objects.get()  # type: ignore[attr-defined]
+        self.assertEqual(incident.hit_count, 6)
+        self.assertLess(incident.first_seen, incident.last_seen)
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class ThreatDetectionBodyTests(TestCase):
+    """Corps analysés par ThreatDetectionMiddleware"""
+
+    def test_large_multipart_upload_reaches_the_view(self):
+        upload = SimpleUploadedFile('photo.jpg', b'\xff' * (6 * 1024 * 1024), content_type='image/jpeg')
+
+        response = self.client.post('/api/v1/children/', {'photo': upload})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_multipart_body_is_not_scanned(self):
+        response = self.client.post('/api/v1/children/', {'notes': '<script>alert(1)</script>'})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_json_body_is_scanned(self):
+        response = self.client.post(
+            '/api/v1/children/', '{"notes": "<script>alert(1)</script>"}', content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['code'], 'THREAT_DETECTED')
+
+    @override_settings(SECURITY_INCIDENTS={'MAX_SCANNED_BODY_BYTES': 16})
+    def test_oversized_json_body_is_not_read(self):
+        response = self.client.post(
+            '/api/v1/children/', '{"notes": "<script>alert(1)</script>"}', content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+
+class ClientIPTests(SimpleTestCase):
+    """Adresse cliente : X-Forwarded-For lu seulement derrière un proxy de confiance"""
+
+    def _client_ip(self, remote_addr='10.0.0.5', forwarded_for=None):
+        meta = {'REMOTE_ADDR': remote_addr}
+        if forwarded_for is not None:
+            meta['HTTP_X_FORWARDED_FOR'] = forwarded_for
+        return get_client_ip(RequestFactory().get('/', **meta))
+
+    @override_settings(TRUSTED_PROXIES=[])
+    def test_forwarded_for_is_ignored_without_trusted_proxy(self):
+        self.assertEqual(self._client_ip(forwarded_for='198.51.100.1'), '10.0.0.5')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_rightmost_untrusted_hop_is_the_client(self):
+        self.assertEqual(self._client_ip(forwarded_for='198.51.100.1, 203.0.113.9, 10.0.0.7'), '203.0.113.9')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_invalid_forwarded_entry_stops_at_last_trusted_hop(self):
+        self.assertEqual(self._client_ip(forwarded_for='not-an-ip'), '10.0.0.5')
+
+    def test_invalid_remote_addr_gives_no_address(self):
+        self.assertEqual(self._client_ip(remote_addr='unknown'), '')
+
+
+@override_settings(
+    CORS_ALLOWED_ORIGINS=['https://app.example.org'],
+    SECURITY_PIPELINE={'IP_RATE': '1/m', 'RATE_LIMITS': [], 'EXCLUDED_PATHS': []},
+)
+class SecurityPipelineCorsTests(TestCase):
+    """Réponses courtes de SecurityPipelineMiddleware lisibles par le client web"""
+
+    def test_rate_limited_response_carries_cors_headers(self):
+        for _ in range(2):
+            response = self.client.get('/api/v1/children/', HTTP_ORIGIN='https://app.example.org', REMOTE_ADDR='198.51.100.40')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Access-Control-Allow-Origin'], 'https://app.example.org')
+        self.assertIn('Retry-After', response['Access-Control-Expose-Headers'])
+
+
+class SerializationFailure(OperationalError):
+    pgcode = '40001'
+
+
+class DataRetentionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DataRetention
+        fields = ['model_name', 'object_id', 'retention_period_days', 'expires_at']
+
+
+class FailingCommitView:
+    """Écriture qui échoue une fois après ``save()``, comme un 40001 au commit"""
+
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.saves = []
+
+    def perform_create(self, serializer):
+        self._save(serializer)
+
+    def perform_update(self, serializer):
+        self._save(serializer)
+
+    def _save(self, serializer):
+        self.saves.append('update' if serializer.instance is not None else 'create')
+        serializer.save()
+        if self.failures:
+            self.failures -= 1
+            raise SerializationFailure('could not serialize access')
+
+
+class RetryingView(TransactionRetryMixin, FailingCommitView):
+    pass
+
+
+@override_settings(TRANSACTION_RETRY={'MAX_ATTEMPTS': 3, 'BASE_DELAY': 0, 'MAX_DELAY': 0})
+class TransactionRetryMixinTests(TransactionTestCase):
+    """Rejeu des écritures DRF après un conflit de sérialisation"""
+
+    def _data(self, **overrides):
+        data = {
+            'model_name': 'children.Child',
+            'object_id': '42',
+            'retention_period_days': 365,
+            'expires_at': (timezone.now() + timedelta(days=365)).isoformat(),
+        }
+        data.update(overrides)
+        return data
+
+    def test_create_is_replayed_as_a_create(self):
+        serializer = DataRetentionSerializer(data=self._data())
+        self.assertTrue(serializer.is_valid())
+        view = RetryingView()
+
+        view.perform_create(serializer)
+
+        self.assertEqual(view.saves, ['create', 'create'])
+        retention = DataRetention.objects.get()  # type: ignore[attr-defined]
+        self.assertEqual(serializer.instance.pk, retention.pk)
+
+    def test_update_is_replayed_from_the_stored_row(self):
+        retention = DataRetention.objects.create(  # type: ignore[attr-defined]
+            model_name='children.Child', object_id='42', retention_period_days=365,
+            expires_at=timezone.now() + timedelta(days=365),
+        )
+        serializer = DataRetentionSerializer(retention, data=self._data(retention_period_days=30))
+        self.assertTrue(serializer.is_valid())
+        view = RetryingView()
+
+        view.perform_update(serializer)
+
+        self.assertEqual(view.saves, ['update', 'update'])
+        retention.refresh_from_db()
+        self.assertEqual(retention.retention_period_days, 30)
+        self.assertEqual(DataRetention.objects.count(), 1)  # type: ignore[attr-defined]
@@ -0,0 +1,126 @@
+"""
+Transactions rejouées sur conflit de sérialisation
+
+En production, PostgreSQL tourne en isolation ``serializable``
+(``settings/security.py``) : deux écritures concurrentes sur les mêmes lignes
+(stock d'un article, placements d'un enfant...) font échouer l'une des
+transactions (SQLSTATE ``40001``), de même qu'un interblocage (``40P01``).
+Ces erreurs sont transitoires : la transaction doit simplement être rejouée.
+
+``atomic_with_retry`` exécute une fonction dans ``transaction.atomic`` et la
+rejoue avec un délai exponentiel aléatoire (« full jitter ») tant que le
+budget ``TRANSACTION_RETRY`` n'est pas épuisé. ``TransactionRetryMixin``
+applique ce comportement aux écritures des vues génériques DRF.
+
+Une transaction ne peut être rejouée que si elle est la plus externe : dans
+un bloc ``atomic`` englobant, l'erreur est propagée à l'appelant.
+
+Métriques : ``db.transaction_retries`` (rejeux), ``db.transaction_conflicts``
+(échecs après épuisement du budget), suffixés par le nom de l'opération.
+"""
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from functools import wraps
+import logging
+import random
+import time
+
+from .metrics import increment
+
+logger = logging.getLogger(__name__)
+
+# Échec de sérialisation et interblocage (PostgreSQL)
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+def _config():
+    return getattr(settings, 'TRANSACTION_RETRY', {})
+
+def is_retryable_error(exc) -> bool:
+    """Vrai si l'erreur est un conflit transitoire (sérialisation, interblocage)"""
+    while exc is not None:
+        if getattr(exc, 'pgcode', None) in RETRYABLE_SQLSTATES:
+            return True
+        exc = exc.__cause__
+    return False
+
+def retry_delay(attempt) -> float:
+    """Délai avant le rejeu ``attempt`` (1, 2...) : exponentiel avec gigue totale"""
+    config = _config()
+    ceiling = min(config.get('MAX_DELAY', 0.5), config.get('BASE_DELAY', 0.01) * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+def atomic_with_retry(func=None, *, using=None, name=None, max_attempts=None):
+    """Décorateur : exécute ``func`` dans une transaction rejouée sur conflit"""
+    def decorator(func):
+        operation = name or f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            attempts = max_attempts or _config().get('MAX_ATTEMPTS', 5)
+            outermost = not connections[using or 'default'].in_atomic_block
+
+            for attempt in range(1, attempts + 1):
+                try:
+                    with transaction.atomic(using=using):
+                        return func(*args, **kwargs)
+                except DatabaseError as e:
+                    if not outermost or not is_retryable_error(e):
+                        raise
+                    if attempt == attempts:
+                        increment('db.transaction_conflicts')
+                        increment(f"db.transaction_conflicts.{operation}")
+                        logger.error(f"Conflit de transaction persistant ({operation}) après {attempts} tentatives")
+                        raise
+
+                    increment('db.transaction_retries')
+                    increment(f"db.transaction_retries.{operation}")
+                    time.sleep(retry_delay(attempt))
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+class TransactionRetryMixin:
+    """Rejoue les écritures des vues génériques DRF sur conflit de sérialisation.
+
+    ``perform_create``, ``perform_update`` et ``perform_destroy`` sont
+    exécutés dans une transaction rejouée ; les modèles concernés doivent
+    relire les lignes qu'ils modifient dans la transaction.
+    """
+
+    def _retry(self, method, *args):
+        operation = f"{type(self).__name__}.{method.__name__}"
+        return atomic_with_retry(method, name=operation)(*args)
+
+    def _retry_save(self, method, serializer):
+        """Rejoue ``serializer.save()`` depuis l'état d'avant la première tentative.
+
+        Après un échec (y compris au commit), ``serializer.instance`` pointe sur
+        l'objet écrit puis annulé : sans remise à zéro, le rejeu d'une création
+        appellerait ``update()`` et sauterait la logique propre à la création.
+        """
+        instance = serializer.instance
+        attempts = []
+
+        def attempt(serializer):
+            if attempts and instance is not None:
+                # Valeurs modifiées en mémoire par la tentative annulée
+                instance.refresh_from_db()
+            attempts.append(1)
+            serializer.instance = instance
+            serializer.__dict__.pop('_data', None)
+            return method(serializer)
+
+        attempt.__name__ = method.__name__
+        return self._retry(attempt, serializer)
+
+    def perform_create(self, serializer):
+        return self._retry_save(super().perform_create, serializer)  # type: ignore[misc]
+
+    def perform_update(self, serializer):
+        return self._retry_save(super().perform_update, serializer)  # type: ignore[misc]
+
+    def perform_destroy(self, instance):
+        return self._retry(super().perform_destroy, instance)  # type: ignore[misc]
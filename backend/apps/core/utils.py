@@ -6,21 +6,48 @@ from django.core.cache import cache
 from django.db import transaction
 import logging
 import hashlib
+import ipaddress
 import secrets
 import string
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=8)
+def _trusted_networks(proxies):
+    return tuple(ipaddress.ip_network(proxy.strip(), strict=False) for proxy in proxies)
+
+def _parse_ip(value):
+    try:
+        return ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+
 def get_client_ip(request) -> str:
-    """Obtient l'adresse IP réelle du client"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0].strip()
-    else:
-        ip = request.META.get('REMOTE_ADDR', '')
-    return ip
+    """Obtient l'adresse IP réelle du client.
+
+    ``X-Forwarded-For`` n'est lu que si la requête arrive d'un proxy de
+    confiance (``TRUSTED_PROXIES``) : l'en-tête est parcouru de droite à
+    gauche et la première adresse qui n'est pas un proxy de confiance est
+    celle du client. Une entrée invalide arrête le parcours (le dernier proxy
+    sûr est retenu). Chaîne vide si aucune adresse valide n'est connue.
+    """
+    remote = _parse_ip(request.META.get('REMOTE_ADDR', ''))
+    if remote is None:
+        return ''
+    trusted = _trusted_networks(tuple(getattr(settings, 'TRUSTED_PROXIES', ())))
+    client = remote
+    if any(client in network for network in trusted):
+        for entry in reversed(request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')):
+            hop = _parse_ip(entry)
+            if hop is None:
+                break
+            client = hop
+            if not any(hop in network for network in trusted):
+                break
+    return str(client)
 
 def get_user_agent(request) -> str:
     """Obtient le User-Agent du client"""
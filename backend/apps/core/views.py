@@ -3,8 +3,15 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.db import connection
 from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
 import logging
 
+from . import metrics
+from .locks import get_last_successes
+from .permissions import IsAdminRole
+
 logger = logging.getLogger(__name__)
 
 @require_http_methods(["GET"])
@@ -47,6 +54,18 @@ def system_status(request):
     
     return JsonResponse(status)
 
+@api_view(['GET'])
+@permission_classes([IsAdminRole])
+def metrics_view(request):
+    """Métriques applicatives (durées des tâches, compteurs) et derniers succès"""
+    try:
+        data = metrics.snapshot(prefix=request.query_params.get('prefix', ''))
+        data['last_success'] = get_last_successes()
+    except Exception as e:
+        logger.error(f"Erreur de lecture des métriques: {str(e)}")
+        return Response({'error': 'Métriques indisponibles'}, status=503)
+    return Response(data)
+
 # Error handlers
 def bad_request(request, exception):
     return JsonResponse({
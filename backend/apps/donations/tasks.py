@@ -4,10 +4,12 @@ from datetime import timedelta
 import logging
 
 from .models import RecurringDonation, Donation
+from apps.core.locks import single_flight
 
 logger = logging.getLogger(__name__)
 
 @shared_task
+@single_flight(ttl=600)
 def process_recurring_donations():
     """Traite les dons récurrents dus"""
     today = timezone.now().date()
@@ -14,6 +14,7 @@ from .serializers import (
 )
 from apps.core.permissions import HasRolePermission, IsOwnerOrAdmin
 from apps.core.pagination import StandardResultsSetPagination
+from apps.core.transactions import TransactionRetryMixin
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +46,7 @@ class DonorDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = DonorSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
 
-class DonationListCreateView(generics.ListCreateAPIView):
+class DonationListCreateView(TransactionRetryMixin, generics.ListCreateAPIView):
     """Vue pour lister et créer des dons"""
     queryset = Donation.objects.all()
     serializer_class = DonationSerializer
@@ -67,7 +68,7 @@ class DonationListCreateView(generics.ListCreateAPIView):
         else:
             return Donation.objects.filter(status='confirmed')
 
-class DonationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DonationDetailView(TransactionRetryMixin, generics.RetrieveUpdateDestroyAPIView):
     """Vue pour consulter, modifier et supprimer un don"""
     queryset = Donation.objects.all()
     serializer_class = DonationSerializer
@@ -14,6 +14,7 @@ from .serializers import (
 )
 from apps.core.permissions import HasRolePermission
 from apps.core.pagination import StandardResultsSetPagination
+from apps.core.transactions import TransactionRetryMixin
 
 logger = logging.getLogger(__name__)
 
@@ -55,7 +56,7 @@ class FamilyDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.IsAuthenticated(), HasRolePermission(['admin', 'assistant_social'])]
         return [permissions.IsAuthenticated()]
 
-class PlacementListCreateView(generics.ListCreateAPIView):
+class PlacementListCreateView(TransactionRetryMixin, generics.ListCreateAPIView):
     """Vue pour lister et créer des placements"""
     queryset = Placement.objects.all()
     serializer_class = PlacementSerializer
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
@@ -297,10 +297,19 @@ class StockMovement(models.Model):
         return f"{self.item.name} - {self.get_movement_type_display()} - {self.quantity}"  # type: ignore[attr-defined]
     
     def save(self, *args, **kwargs):
-        """Met à jour le stock de l'article"""
-        is_new = self.pk is None
+        """Met à jour le stock de l'article (dans la même transaction que le mouvement)"""
+        with transaction.atomic():
+            self._save_with_stock(*args, **kwargs)
+    
+    def _save_with_stock(self, *args, **kwargs):
+        # La clé primaire UUID est renseignée dès l'instanciation
+        is_new = self._state.adding
         
         if is_new:
+            # Relire le stock dans la transaction : une transaction rejouée après
+            # un conflit de sérialisation ne doit pas repartir d'une valeur périmée
+            self.item.refresh_from_db()  # type: ignore[attr-defined]
+            
             # Nouveau mouvement
             if self.movement_type == 'in':
                 self.item.current_stock += self.quantity  # type: ignore[attr-defined]
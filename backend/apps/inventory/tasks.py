@@ -2,14 +2,17 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
+from django.db import models
 import logging
 
 from .models import InventoryItem
 from apps.accounts.models import User
+from apps.core.locks import single_flight
 
 logger = logging.getLogger(__name__)
 
 @shared_task
+@single_flight(ttl=600, min_interval=3600)
 def check_low_stock():
     """Vérifie les articles en stock faible et envoie des alertes"""
     
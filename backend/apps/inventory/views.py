@@ -14,6 +14,7 @@ from .serializers import (
 )
 from apps.core.permissions import CanManageInventory
 from apps.core.pagination import StandardResultsSetPagination
+from apps.core.transactions import TransactionRetryMixin
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +53,7 @@ class InventoryItemListCreateView(generics.ListCreateAPIView):
         else:
             return InventoryItem.objects.none()
 
-class InventoryItemDetailView(generics.RetrieveUpdateDestroyAPIView):
+class InventoryItemDetailView(TransactionRetryMixin, generics.RetrieveUpdateDestroyAPIView):
     """Vue pour consulter, modifier et supprimer un article"""
     queryset = InventoryItem.objects.all()
     serializer_class = InventoryItemSerializer
@@ -64,7 +65,7 @@ class InventoryItemDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.IsAuthenticated(), CanManageInventory()]
         return [permissions.IsAuthenticated()]
 
-class StockMovementListCreateView(generics.ListCreateAPIView):
+class StockMovementListCreateView(TransactionRetryMixin, generics.ListCreateAPIView):
     """Vue pour lister et créer des mouvements de stock"""
     queryset = StockMovement.objects.all()
     serializer_class = StockMovementSerializer
@@ -0,0 +1,64 @@
+"""
+Compteurs de notifications non lues
+
+Les compteurs sont stockés dans le cache (Redis en production) sans
+expiration et ajustés par incréments atomiques. En cas d'absence de la clé
+(cache vidé, premier accès), la valeur est recalculée depuis la base via
+l'index (recipient, status).
+"""
+from django.core.cache import cache
+
+from apps.core.utils import cache_key_for_user
+
+UNREAD_STATUSES = ('pending', 'sent', 'delivered')
+
+def unread_count_key(user_id) -> str:
+    """Clé de cache du compteur de non lues"""
+    return cache_key_for_user(str(user_id), 'unread_notifications')
+
+def reconcile_unread_count(user_id) -> int:
+    """Recalcule le compteur depuis la base et le remet en cache"""
+    from .models import Notification
+
+    count = Notification.objects.filter(  # type: ignore[attr-defined]
+        recipient_id=user_id,
+        status__in=UNREAD_STATUSES
+    ).count()
+    cache.set(unread_count_key(user_id), count, None)
+    return count
+
+def reconcile_unread_counters(user_ids) -> int:
+    """Recalcule les compteurs d'un ensemble d'utilisateurs en une requête groupée"""
+    from django.db.models import Count
+    from .models import Notification
+
+    user_ids = list(user_ids)
+    counts = dict.fromkeys(user_ids, 0)
+    rows = Notification.objects.filter(  # type: ignore[attr-defined]
+        recipient_id__in=user_ids,
+        status__in=UNREAD_STATUSES
+    ).order_by().values('recipient_id').annotate(count=Count('id'))
+    for row in rows:
+        counts[row['recipient_id']] = row['count']
+
+    cache.set_many({unread_count_key(user_id): count for user_id, count in counts.items()}, None)
+    return len(counts)
+
+def get_unread_count(user_id) -> int:
+    """Nombre de notifications non lues d'un utilisateur"""
+    count = cache.get(unread_count_key(user_id))
+    if count is None:
+        return reconcile_unread_count(user_id)
+    return max(count, 0)
+
+def adjust_unread_count(user_id, delta: int) -> int:
+    """Ajuste atomiquement le compteur et retourne la nouvelle valeur.
+
+    Doit être appelé après le commit de la modification : si la clé est
+    absente, le recalcul depuis la base inclut déjà le changement.
+    """
+    try:
+        count = cache.incr(unread_count_key(user_id), delta)
+    except ValueError:
+        return reconcile_unread_count(user_id)
+    return max(count, 0)
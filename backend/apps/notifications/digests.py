@@ -0,0 +1,221 @@
+"""
+Résumés périodiques (quotidien, hebdomadaire, mensuel)
+
+Les destinataires sont regroupés en cohortes (rôle, période). Le contenu
+d'une cohorte ne dépend que de ses sections : chaque section est calculée
+une seule fois par exécution avec quelques requêtes d'agrégation, puis le
+corps HTML est rendu une fois par cohorte. Seuls l'en-tête personnalisé et
+le nombre de notifications non lues (lu dans le cache) varient par
+utilisateur.
+
+Les utilisateurs sont parcourus par lots (``iterator``) et les emails
+envoyés par lots sur une même connexion SMTP : la mémoire consommée dépend
+de la taille de lot, pas du nombre de destinataires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Count, Q, Sum
+from django.template.loader import get_template
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from apps.accounts.models import User
+from .counters import reconcile_unread_counters, unread_count_key
+from .models import NotificationPreference
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PERIODS = {
+    'daily': {'flag': 'daily_summary', 'days': 1, 'label': 'quotidien'},
+    'weekly': {'flag': 'weekly_summary', 'days': 7, 'label': 'hebdomadaire'},
+    'monthly': {'flag': 'monthly_summary', 'days': 30, 'label': 'mensuel'},
+}
+
+# Sections du résumé visibles par rôle (aucun résumé pour les rôles sans section)
+ROLE_SECTIONS = {
+    'admin': ['children', 'donations', 'inventory', 'planning'],
+    'medecin': ['children', 'planning'],
+    'soignant': ['children', 'planning'],
+    'assistant_social': ['children', 'planning'],
+    'logisticien': ['inventory', 'planning'],
+    'donateur': [],
+    'parrain': [],
+    'visiteur': [],
+}
+
+def _children_section(start, end):
+    from apps.children.models import Child
+
+    return Child.objects.aggregate(  # type: ignore[attr-defined]
+        new_arrivals=Count('id', filter=Q(arrival_date__gte=start.date(), arrival_date__lt=end.date())),
+        active_children=Count('id', filter=~Q(status='sorti')),
+        awaiting_sponsor=Count('id', filter=Q(status='a_parrainer')),
+    )
+
+def _donations_section(start, end):
+    from apps.donations.models import Donation
+
+    return Donation.objects.filter(  # type: ignore[attr-defined]
+        donation_date__gte=start,
+        donation_date__lt=end
+    ).aggregate(
+        donation_count=Count('id'),
+        money_total=Sum('amount', filter=Q(donation_type='money')),
+        pending_count=Count('id', filter=Q(status='pending')),
+    )
+
+def _inventory_section(start, end):
+    from apps.inventory.models import InventoryItem
+
+    return InventoryItem.objects.filter(is_active=True).aggregate(  # type: ignore[attr-defined]
+        low_stock=Count('id', filter=Q(status='low_stock')),
+        out_of_stock=Count('id', filter=Q(status='out_of_stock')),
+    )
+
+def _planning_section(start, end):
+    from apps.planning.models import Event, Task
+
+    period = end - start
+    section = Event.objects.filter(  # type: ignore[attr-defined]
+        start_datetime__gte=end,
+        start_datetime__lt=end + period
+    ).exclude(status='cancelled').aggregate(upcoming_events=Count('id'))
+    section.update(Task.objects.aggregate(  # type: ignore[attr-defined]
+        overdue_tasks=Count('id', filter=Q(due_date__lt=end, status__in=['pending', 'in_progress'])),
+        completed_tasks=Count('id', filter=Q(completed_date__gte=start, completed_date__lt=end, status='completed')),
+    ))
+    return section
+
+SECTION_BUILDERS = {
+    'children': _children_section,
+    'donations': _donations_section,
+    'inventory': _inventory_section,
+    'planning': _planning_section,
+}
+
+class DigestBuilder:
+    """Construit et envoie les résumés d'une période"""
+
+    def __init__(self, period, now=None, batch_size=None):
+        if period not in DIGEST_PERIODS:
+            raise ValueError(f"Période de résumé inconnue: {period}")
+
+        self.period = period
+        self.config = DIGEST_PERIODS[period]
+        self.end = now or timezone.now()
+        self.start = self.end - timedelta(days=self.config['days'])
+        self.batch_size = batch_size or settings.NOTIFICATION_DIGEST.get('BATCH_SIZE', 200)
+        self.sections_template = get_template('emails/digest_sections.html')
+        self.email_template = get_template('emails/digest.html')
+        self._sections = {}
+
+    def get_section(self, name):
+        """Section calculée une seule fois par exécution, partagée entre cohortes"""
+        if name not in self._sections:
+            self._sections[name] = SECTION_BUILDERS[name](self.start, self.end)
+        return self._sections[name]
+
+    def get_recipients(self, role):
+        """Destinataires abonnés à la période pour un rôle (itérés par lots)"""
+        flag = self.config['flag']
+        subscribed = Q(**{
+            f'notification_preferences__{flag}': True,
+            'notification_preferences__email_enabled': True,
+        })
+        # Sans préférences enregistrées, la valeur par défaut du modèle s'applique
+        if NotificationPreference._meta.get_field(flag).default:
+            subscribed |= Q(notification_preferences__isnull=True)
+
+        return User.objects.filter(
+            subscribed,
+            role=role,
+            is_active=True,
+            status='approved'
+        ).exclude(email='').order_by('id').values_list(
+            'id', 'email', 'first_name', 'last_name'
+        ).iterator(chunk_size=self.batch_size)
+
+    def render_cohort(self, role):
+        """Rend le corps HTML commun à une cohorte"""
+        sections = {name: self.get_section(name) for name in ROLE_SECTIONS.get(role, [])}
+        return self.sections_template.render({
+            'sections': sections,
+            'period_label': self.config['label'],
+            'start': self.start,
+            'end': self.end,
+        })
+
+    def get_unread_counts(self, user_ids):
+        """Compteurs de non lues d'un lot, lus dans le cache en un aller-retour"""
+        keys = {unread_count_key(user_id): user_id for user_id in user_ids}
+        cached = cache.get_many(list(keys))
+        missing = [user_id for key, user_id in keys.items() if key not in cached]
+        if missing:
+            reconcile_unread_counters(missing)
+            cached.update(cache.get_many([unread_count_key(user_id) for user_id in missing]))
+        return {keys[key]: max(value, 0) for key, value in cached.items()}
+
+    def build_messages(self, batch, body, connection):
+        """Messages d'un lot de destinataires"""
+        unread_counts = self.get_unread_counts([row[0] for row in batch])
+        subject = f"Votre résumé {self.config['label']} - Orphanage Management"
+        messages = []
+
+        for user_id, email, first_name, last_name in batch:
+            html_message = self.email_template.render({
+                'first_name': first_name,
+                'last_name': last_name,
+                'period_label': self.config['label'],
+                'sections_html': body,
+                'unread_count': unread_counts.get(user_id, 0),
+                'current_year': self.end.year,
+            })
+            message = EmailMultiAlternatives(
+                subject=subject,
+                body='',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[email],
+                connection=connection
+            )
+            message.attach_alternative(html_message, 'text/html')
+            messages.append(message)
+        return messages
+
+    def send_batch(self, batch, body):
+        """Envoie un lot sur une seule connexion SMTP"""
+        connection = get_connection(fail_silently=False)
+        try:
+            return connection.send_messages(self.build_messages(batch, body, connection)) or 0
+        except Exception as e:
+            logger.error(f"Erreur d'envoi d'un lot de résumés {self.period}: {str(e)}")
+            return 0
+
+    def run(self):
+        """Envoie les résumés de toutes les cohortes de la période"""
+        stats = {'cohorts': 0, 'recipients': 0, 'sent': 0}
+
+        for role, section_names in ROLE_SECTIONS.items():
+            if not section_names:
+                continue
+            body = None
+            batch = []
+            for row in self.get_recipients(role):
+                if body is None:
+                    body = self.render_cohort(role)
+                    stats['cohorts'] += 1
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    stats['sent'] += self.send_batch(batch, body)
+                    stats['recipients'] += len(batch)
+                    batch = []
+            if batch:
+                stats['sent'] += self.send_batch(batch, body)
+                stats['recipients'] += len(batch)
+
+        logger.info(
+            f"Résumés {self.period} envoyés: {stats['sent']}/{stats['recipients']} "
+            f"destinataires, {stats['cohorts']} cohortes"
+        )
+        return stats
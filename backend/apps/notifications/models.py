@@ -1,8 +1,12 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 import uuid
 
+from .counters import UNREAD_STATUSES
+
 class NotificationTemplate(models.Model):
     """Modèles de notifications"""
     
@@ -64,6 +68,55 @@ class NotificationTemplate(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_notification_type_display()})"  # type: ignore[attr-defined]
 
+class NotificationQuerySet(models.QuerySet):
+    """Opérations ensemblistes sur les notifications.
+
+    Les compteurs de non lues sont ajustés après le commit, par destinataire,
+    avec le nombre exact de lignes touchées.
+    """
+    
+    def unread(self):
+        """Notifications non lues (utilise l'index (recipient, status))"""
+        return self.filter(status__in=UNREAD_STATUSES)
+    
+    def mark_as_read(self, recipient_id, read_at=None):
+        """Marque comme lues les notifications d'un destinataire en un seul UPDATE"""
+        updated = self.filter(recipient_id=recipient_id).unread().update(
+            status='read',
+            read_at=read_at or timezone.now()
+        )
+        if updated:
+            from .realtime import unread_count_changed
+            transaction.on_commit(lambda: unread_count_changed(recipient_id, -updated))
+        return updated
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        """Création en lot avec mise à jour des compteurs et diffusion"""
+        created = super().bulk_create(objs, *args, **kwargs)
+        unread = [notification for notification in created if notification.status in UNREAD_STATUSES]
+        if unread:
+            from .realtime import notifications_created
+            transaction.on_commit(lambda: notifications_created(unread))
+        return created
+    
+    def delete(self):
+        """Suppression avec décrément des compteurs des non lues supprimées"""
+        with transaction.atomic(using=self.db):
+            unread_counts = list(
+                self.unread().order_by().values('recipient_id').annotate(count=models.Count('id'))
+            )
+            result = super().delete()
+        
+        if unread_counts:
+            from .realtime import unread_count_changed
+            
+            def adjust_counters():
+                for row in unread_counts:
+                    unread_count_changed(row['recipient_id'], -row['count'])
+            
+            transaction.on_commit(adjust_counters)
+        return result
+
 class Notification(models.Model):
     """Notifications envoyées"""
     
@@ -134,6 +187,8 @@ class Notification(models.Model):
     created_at = models.DateTimeField(_('Créé le'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Modifié le'), auto_now=True)
     
+    objects = NotificationQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Notification')
         verbose_name_plural = _('Notifications')
@@ -147,12 +202,40 @@ class Notification(models.Model):
     def __str__(self):
         return f"{self.subject} -> {self.recipient.get_full_name()}"  # type: ignore[attr-defined]
     
+    def save(self, *args, **kwargs):
+        """Sauvegarde et diffusion temps réel des nouvelles notifications"""
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        
+        if is_new and self.status in UNREAD_STATUSES:
+            from .realtime import notification_created
+            transaction.on_commit(lambda: notification_created(self))
+    
+    def delete(self, *args, **kwargs):
+        """Suppression avec décrément du compteur si la notification était non lue"""
+        was_unread = self.status in UNREAD_STATUSES
+        recipient_id = self.recipient_id
+        result = super().delete(*args, **kwargs)
+        
+        if was_unread:
+            from .realtime import unread_count_changed
+            transaction.on_commit(lambda: unread_count_changed(recipient_id, -1))
+        return result
+    
     def mark_as_read(self):
         """Marque la notification comme lue"""
-        if self.status != 'read':
+        if self.status == 'read':
+            return
+        
+        # Mise à jour conditionnelle : deux lectures concurrentes ne
+        # décrémentent le compteur qu'une seule fois. L'instance ne suit que
+        # ce que l'UPDATE a réellement écrit (une notification échouée reste
+        # inchangée).
+        read_at = timezone.now()
+        updated = Notification.objects.filter(pk=self.pk).mark_as_read(self.recipient_id, read_at=read_at)  # type: ignore[attr-defined]
+        if updated:
             self.status = 'read'
-            self.read_at = timezone.now()  # type: ignore[attr-defined]
-            self.save(update_fields=['status', 'read_at'])
+            self.read_at = read_at
 
 class NotificationPreference(models.Model):
     """Préférences de notification des utilisateurs"""
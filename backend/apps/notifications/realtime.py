@@ -0,0 +1,185 @@
+"""
+Diffusion temps réel des notifications (Server-Sent Events + pub/sub)
+
+Chaque utilisateur connecté au flux SSE est abonné au canal
+``notifications:user:<id>``. Les créations et lectures de notifications y
+publient un message JSON, ce qui remplace le polling des clients par une
+seule connexion longue durée.
+
+Deux brokers sont disponibles (``settings.NOTIFICATION_STREAM['BROKER']``) :
+
+- ``redis`` : pub/sub Redis, partagé entre tous les workers ASGI ;
+- ``memory`` : broker local au processus, pour les tests et le développement.
+"""
+from django.conf import settings
+from collections import defaultdict
+import asyncio
+import json
+import logging
+import threading
+
+from apps.core.redis_client import get_redis_connection, get_async_redis_connection
+
+logger = logging.getLogger(__name__)
+
+def user_channel(user_id) -> str:
+    """Nom du canal pub/sub d'un utilisateur"""
+    return f"notifications:user:{user_id}"
+
+class InMemorySubscription:
+    """Abonnement à un canal du broker en mémoire"""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout):
+        """Attend le prochain message (None si le délai expire)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+class InMemoryBroker:
+    """Broker pub/sub local au processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel, message):
+        # Les publications viennent des threads synchrones (vues, tâches) :
+        # on repasse par la boucle d'événements de chaque abonné.
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, message)
+        return len(subscriptions)
+
+    async def subscribe(self, channel):
+        subscription = InMemorySubscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+class RedisSubscription:
+    """Abonnement à un canal Redis"""
+
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        """Attend le prochain message (None si le délai expire)"""
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return message['data']
+
+    async def close(self):
+        try:
+            await self.pubsub.unsubscribe()
+            await self.pubsub.aclose()
+        finally:
+            await self.client.aclose()
+
+class RedisBroker:
+    """Broker pub/sub Redis partagé entre les workers"""
+
+    def publish(self, channel, message):
+        return get_redis_connection().publish(channel, message)
+
+    async def subscribe(self, channel):
+        client = get_async_redis_connection()
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        return RedisSubscription(client, pubsub)
+
+_brokers = {
+    'memory': InMemoryBroker,
+    'redis': RedisBroker,
+}
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """Retourne le broker configuré (instance unique par processus)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                name = settings.NOTIFICATION_STREAM.get('BROKER', 'redis')
+                _broker = _brokers[name]()
+    return _broker
+
+def publish_event(user_id, event_type, payload):
+    """Publie un événement sur le canal d'un utilisateur.
+
+    Une indisponibilité du broker ne doit jamais faire échouer l'écriture
+    de la notification : l'erreur est journalisée et le client se
+    resynchronisera à la reconnexion.
+    """
+    message = json.dumps({'type': event_type, **payload}, default=str)
+    try:
+        get_broker().publish(user_channel(user_id), message)
+    except Exception as e:
+        logger.error(f"Erreur de publication temps réel pour {user_id}: {str(e)}")
+
+def serialize_notification(notification) -> dict:
+    """Représentation compacte d'une notification pour le flux"""
+    return {
+        'id': str(notification.id),
+        'notification_type': notification.notification_type,
+        'subject': notification.subject,
+        'message': notification.message,
+        'priority': notification.priority,
+        'status': notification.status,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'context_data': notification.context_data,
+    }
+
+def notification_created(notification):
+    """Met à jour le compteur et pousse une nouvelle notification"""
+    from .counters import adjust_unread_count
+
+    unread_count = adjust_unread_count(notification.recipient_id, 1)
+    publish_event(notification.recipient_id, 'notification', {
+        'notification': serialize_notification(notification),
+        'unread_count': unread_count,
+    })
+
+def notifications_created(notifications):
+    """Version en lot : un seul ajustement de compteur par destinataire"""
+    from .counters import adjust_unread_count
+
+    by_recipient = defaultdict(list)
+    for notification in notifications:
+        by_recipient[notification.recipient_id].append(notification)
+
+    for recipient_id, items in by_recipient.items():
+        unread_count = adjust_unread_count(recipient_id, len(items))
+        for notification in items:
+            publish_event(recipient_id, 'notification', {
+                'notification': serialize_notification(notification),
+                'unread_count': unread_count,
+            })
+
+def unread_count_changed(user_id, delta):
+    """Ajuste le compteur et pousse la nouvelle valeur"""
+    from .counters import adjust_unread_count
+
+    unread_count = adjust_unread_count(user_id, delta)
+    publish_event(user_id, 'unread_count', {'unread_count': unread_count})
@@ -0,0 +1,54 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import send_mail
+import logging
+
+from apps.accounts.models import User
+from apps.core.locks import single_flight
+from .counters import reconcile_unread_counters
+from .digests import DigestBuilder
+
+logger = logging.getLogger(__name__)
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def send_email(self, subject, html_message, recipient_list, message=''):
+    """Envoie un email transactionnel (file temps réel, réessayé en cas d'erreur SMTP)"""
+    try:
+        send_mail(
+            subject,
+            message,
+            settings.DEFAULT_FROM_EMAIL,
+            recipient_list,
+            html_message=html_message,
+            fail_silently=False
+        )
+    except Exception as e:
+        logger.error(f"Erreur envoi email à {', '.join(recipient_list)}: {str(e)}")
+        raise self.retry(exc=e)
+    return len(recipient_list)
+
+@shared_task
+@single_flight(ttl=600)
+def reconcile_notification_counters(batch_size=1000):
+    """Resynchronise les compteurs de non lues avec la base (filet de sécurité)"""
+    user_ids = User.objects.filter(is_active=True).values_list('id', flat=True).order_by('id')
+    
+    batch = []
+    reconciled_count = 0
+    for user_id in user_ids.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            reconciled_count += reconcile_unread_counters(batch)
+            batch = []
+    if batch:
+        reconciled_count += reconcile_unread_counters(batch)
+    
+    logger.info(f"Compteurs de notifications resynchronisés: {reconciled_count} utilisateurs")
+    return f"Compteurs resynchronisés: {reconciled_count}"
+
+@shared_task
+@single_flight(ttl=1800, min_interval=3600)
+def send_notification_digests(period):
+    """Envoie les résumés périodiques (daily, weekly, monthly)"""
+    stats = DigestBuilder(period).run()
+    return f"Résumés {period} envoyés: {stats['sent']}/{stats['recipients']}"
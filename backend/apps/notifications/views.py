@@ -1,11 +1,22 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
 from django.core.mail import send_mail
 from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.utils.translation import gettext_lazy as _
+from asgiref.sync import sync_to_async
+import asyncio
+import json
 import logging
 
+from apps.accounts.authentication import CachedJWTAuthentication
+from .counters import get_unread_count
+from .models import Notification
+from .realtime import get_broker, user_channel
+
 logger = logging.getLogger(__name__)
 
 @api_view(['POST'])
@@ -49,3 +60,94 @@ def send_notification(request):
             {'error': _('Erreur lors de l\'envoi de la notification.')},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def notification_count(request):
+    """Nombre de notifications non lues (badge d'en-tête, servi depuis le cache)"""
+    return Response({'unread_count': get_unread_count(request.user.pk)})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def mark_as_read(request, pk):
+    """Marque une notification comme lue"""
+    notifications = Notification.objects.filter(pk=pk, recipient=request.user)  # type: ignore[attr-defined]
+    updated = notifications.mark_as_read(request.user.pk)
+    
+    if not updated and not notifications.exists():
+        return Response(
+            {'error': _('Notification introuvable.')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response({'marked_as_read': updated})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def mark_all_as_read(request):
+    """Marque toutes les notifications de l'utilisateur comme lues (un seul UPDATE)"""
+    updated = Notification.objects.mark_as_read(request.user.pk)  # type: ignore[attr-defined]
+    
+    logger.info(f"{updated} notifications marquées comme lues pour {request.user.email}")
+    
+    return Response({'marked_as_read': updated})
+
+def _authenticate_stream_request(request):
+    """Authentifie la requête du flux (JWT, sinon session)"""
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    if result is not None:
+        return result[0]
+    
+    user = request.user
+    return user if user.is_authenticated else None
+
+def _format_sse(event, data):
+    """Formate un message Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def notification_stream(request):
+    """Flux SSE des notifications et du compteur de non lues (servi en ASGI)"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    
+    user = await sync_to_async(_authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse(
+            {'error': _('Authentification requise.')},
+            status=401
+        )
+    
+    options = settings.NOTIFICATION_STREAM
+    heartbeat = options.get('HEARTBEAT_SECONDS', 15)
+    max_duration = options.get('MAX_CONNECTION_SECONDS', 300)
+    retry = options.get('RETRY_MILLISECONDS', 5000)
+    user_id = user.pk
+    
+    async def event_stream():
+        # Abonnement avant la lecture du compteur : aucun événement publié
+        # entre les deux ne peut être perdu.
+        subscription = await get_broker().subscribe(user_channel(user_id))
+        try:
+            unread_count = await sync_to_async(get_unread_count)(user_id)
+            yield f"retry: {retry}\n\n"
+            yield _format_sse('unread_count', {'type': 'unread_count', 'unread_count': unread_count})
+            
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + max_duration
+            while loop.time() < deadline:
+                message = await subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = json.loads(message)
+                yield _format_sse(payload.get('type', 'message'), payload)
+        finally:
+            await subscription.close()
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
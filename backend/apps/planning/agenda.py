@@ -0,0 +1,302 @@
+"""
+Agenda « ma journée » précalculé
+
+Assemble en une réponse ce dont un membre du personnel a besoin en début de
+journée : ses événements du jour (récurrences développées), ses tâches dues
+ou en retard, ses équipes et les suivis médicaux à venir des enfants qu'il
+accompagne (enfants dont il est référent et participants de ses
+événements du jour).
+
+L'assemblage coûte un nombre fixe de requêtes (événements, enfants des
+événements, tâches, équipes, suivis médicaux) puis le résultat est mis en
+cache par utilisateur et par jour. La clé de cache inclut la version de
+chaque source :
+
+- événements : version du flux de l'utilisateur (``apps.planning.feeds``) ;
+- tâches, équipes et participants (enfants) de ses événements : versions
+  par utilisateur, renouvelées par les récepteurs de ``models.py`` et par
+  les écritures en lot (``rostering``, ``escalation``) ;
+- suivis médicaux : version globale, renouvelée à chaque modification d'un
+  ``MedicalRecord`` ;
+- enfants : version globale, renouvelée à chaque modification d'un
+  ``Child`` (noms affichés, référent qui détermine les suivis visibles).
+
+Toute modification d'une ligne source change donc la clé : l'agenda est
+recalculé à la requête suivante, sans invalidation explicite.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import datetime, timedelta
+import calendar
+import logging
+import time
+
+from .feeds import feed_version, user_scope
+
+logger = logging.getLogger(__name__)
+
+OPEN_TASK_STATUSES = ['pending', 'in_progress', 'on_hold']
+
+def _config():
+    return getattr(settings, 'AGENDA', {})
+
+def _version_key(kind, user_id=None) -> str:
+    return f"planning:agenda:{kind}:{user_id}" if user_id else f"planning:agenda:{kind}"
+
+def touch_agenda(kind, user_ids=None):
+    """Renouvelle après le commit la version d'une source (par utilisateur ou globale)"""
+    version = str(time.time_ns())
+    if user_ids is None:
+        keys = [_version_key(kind)]
+    else:
+        keys = [_version_key(kind, user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, version), None))
+
+def _source_versions(user_id):
+    keys = [
+        _version_key('tasks', user_id), _version_key('shifts', user_id), _version_key('participants', user_id),
+        _version_key('medical'), _version_key('children'),
+    ]
+    versions = cache.get_many(keys)
+    missing = {key: str(time.time_ns()) for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [feed_version(user_scope(user_id))] + [versions[key] for key in keys]
+
+def agenda_cache_key(user_id, day) -> str:
+    versions = '.'.join(_source_versions(user_id))
+    return f"planning:agenda:{user_id}:{day.isoformat()}:{versions}"
+
+# Récurrences
+
+def occurs_on(start, recurrence_type, recurrence_end_date, day) -> bool:
+    """Vrai si une occurrence de l'événement commence le jour ``day`` (dates locales)"""
+    if day < start or (recurrence_end_date and day > recurrence_end_date):
+        return False
+    if recurrence_type == 'daily':
+        return True
+    if recurrence_type == 'weekly':
+        return (day - start).days % 7 == 0
+    if recurrence_type == 'monthly':
+        # Le 31 d'un mois plus court : dernier jour du mois
+        return day.day == min(start.day, calendar.monthrange(day.year, day.month)[1])
+    if recurrence_type == 'yearly':
+        return (day.month, day.day) == (start.month, start.day)
+    return day == start
+
+def _occurrence(event, day, day_start, day_end):
+    """Intervalle de l'événement (ou de son occurrence) le jour ``day``, None s'il n'y en a pas"""
+    start = event['start_datetime']
+    end = event['end_datetime']
+    if start < day_end and end > day_start:
+        return start, end
+    if event['recurrence_type'] == 'none':
+        return None
+    local_start = timezone.localtime(start)
+    if not occurs_on(local_start.date(), event['recurrence_type'], event['recurrence_end_date'], day):
+        return None
+    occurrence_start = timezone.make_aware(datetime.combine(day, local_start.time().replace(tzinfo=None)))
+    return occurrence_start, occurrence_start + (end - start)
+
+# Assemblage
+
+def build_agenda(user, day=None) -> dict:
+    """Agenda du jour d'un utilisateur (cinq requêtes)"""
+    from apps.children.models import MedicalRecord
+    from .models import Event, ShiftAssignment, Task
+
+    now = timezone.now()
+    day = day or timezone.localdate()
+    day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    day_end = day_start + timedelta(days=1)
+
+    # 1. Événements du jour et événements récurrents qui peuvent y tomber
+    rows = Event.objects.filter(  # type: ignore[attr-defined]
+        Q(organizer=user) | Q(staff_members=user),
+        start_datetime__lt=day_end,
+    ).filter(
+        Q(end_datetime__gt=day_start)
+        | (~Q(recurrence_type='none') & (Q(recurrence_end_date__isnull=True) | Q(recurrence_end_date__gte=day)))
+    ).exclude(status='cancelled').distinct().order_by().values(
+        'id', 'title', 'event_type', 'start_datetime', 'end_datetime', 'all_day', 'room', 'location',
+        'status', 'priority', 'recurrence_type', 'recurrence_end_date',
+    )
+    events = []
+    for row in rows:
+        occurrence = _occurrence(row, day, day_start, day_end)
+        if occurrence is None:
+            continue
+        events.append(dict(row, start_datetime=occurrence[0], end_datetime=occurrence[1]))
+    events.sort(key=lambda event: event['start_datetime'])
+
+    # 2. Enfants participants de ces événements
+    event_children = {}
+    if events:
+        for event_id, child_id, first_name, last_name in Event.children.through.objects.filter(  # type: ignore[attr-defined]
+            event_id__in=[event['id'] for event in events],
+        ).values_list('event_id', 'child_id', 'child__first_name', 'child__last_name'):
+            event_children.setdefault(event_id, []).append({'id': str(child_id), 'name': f"{first_name} {last_name}"})
+
+    # 3. Tâches ouvertes dues aujourd'hui, en retard ou sans échéance
+    tasks = list(Task.objects.filter(  # type: ignore[attr-defined]
+        Q(due_date__lt=day_end) | Q(due_date__isnull=True),
+        assigned_to=user,
+        status__in=OPEN_TASK_STATUSES,
+    ).select_related('related_child').order_by('due_date')[:_config().get('MAX_TASKS', 50)])
+
+    # 4. Équipes du jour (y compris une nuit commencée la veille)
+    shifts = []
+    for assignment in ShiftAssignment.objects.filter(  # type: ignore[attr-defined]
+        staff_member=user,
+        shift__date__gte=day - timedelta(days=1),
+        shift__date__lte=day,
+    ).exclude(status__in=['cancelled', 'absent']).select_related('shift', 'shift__supervisor'):
+        shift = assignment.shift
+        start = timezone.make_aware(datetime.combine(shift.date, shift.start_time))
+        end = timezone.make_aware(datetime.combine(
+            shift.date + timedelta(days=1) if shift.end_time <= shift.start_time else shift.date, shift.end_time,
+        ))
+        if start < day_end and end > day_start:
+            shifts.append((assignment, start, end))
+
+    # 5. Suivis médicaux à venir des enfants accompagnés
+    horizon = day + timedelta(days=_config().get('FOLLOW_UP_DAYS', 7))
+    follow_ups = MedicalRecord.objects.filter(  # type: ignore[attr-defined]
+        follow_up_required=True,
+        follow_up_date__gte=day,
+        follow_up_date__lte=horizon,
+    )
+    if user.role not in ['admin', 'medecin']:
+        child_ids = {child['id'] for children in event_children.values() for child in children}
+        follow_ups = follow_ups.filter(Q(child__case_worker=user) | Q(child_id__in=child_ids))
+    follow_ups = list(follow_ups.select_related('child').order_by('follow_up_date')[:_config().get('MAX_FOLLOW_UPS', 50)])
+
+    overdue = [task for task in tasks if task.due_date and task.due_date < now]
+    return {
+        'date': day.isoformat(),
+        'generated_at': now.isoformat(),
+        'summary': {
+            'events': len(events),
+            'tasks': len(tasks),
+            'overdue_tasks': len(overdue),
+            'shifts': len(shifts),
+            'follow_ups': len(follow_ups),
+        },
+        'events': [
+            {
+                'id': str(event['id']),
+                'title': event['title'],
+                'event_type': event['event_type'],
+                'start': timezone.localtime(event['start_datetime']).isoformat(),
+                'end': timezone.localtime(event['end_datetime']).isoformat(),
+                'all_day': event['all_day'],
+                'room': event['room'],
+                'location': event['location'],
+                'status': event['status'],
+                'priority': event['priority'],
+                'is_recurring': event['recurrence_type'] != 'none',
+                'children': event_children.get(event['id'], []),
+            }
+            for event in events
+        ],
+        'tasks': [
+            {
+                'id': str(task.id),
+                'title': task.title,
+                'priority': task.priority,
+                'status': task.status,
+                'due_date': task.due_date.isoformat() if task.due_date else None,
+                'is_overdue': task in overdue,
+                'progress_percentage': task.progress_percentage,
+                'related_child': task.related_child.full_name if task.related_child else None,
+            }
+            for task in tasks
+        ],
+        'shifts': [
+            {
+                'id': str(assignment.shift.id),
+                'name': assignment.shift.name,
+                'shift_type': assignment.shift.shift_type,
+                'start': timezone.localtime(start).isoformat(),
+                'end': timezone.localtime(end).isoformat(),
+                'status': assignment.status,
+                'supervisor': assignment.shift.supervisor.get_full_name() if assignment.shift.supervisor else None,
+            }
+            for assignment, start, end in shifts
+        ],
+        'follow_ups': [
+            {
+                'id': str(record.id),
+                'child_id': str(record.child_id),
+                'child_name': record.child.full_name,
+                'follow_up_date': record.follow_up_date.isoformat(),
+                'visit_type': record.visit_type,
+                'doctor_name': record.doctor_name,
+                'diagnosis': record.diagnosis if user.role in ['admin', 'medecin', 'soignant'] else '',
+            }
+            for record in follow_ups
+        ],
+    }
+
+def get_agenda(user, day=None) -> dict:
+    """Agenda du jour, depuis le cache tant qu'aucune source n'a changé"""
+    day = day or timezone.localdate()
+    key = agenda_cache_key(user.pk, day)
+    agenda = cache.get(key)
+    if agenda is None:
+        agenda = build_agenda(user, day)
+        cache.set(key, agenda, _config().get('CACHE_TIMEOUT', 900))
+    return agenda
+
+# Récepteurs de signaux (branchés dans models.py)
+
+def task_changed(sender, instance, **kwargs):
+    touch_agenda('tasks', [instance.assigned_to_id, getattr(instance, '_loaded_assignee_id', None)])
+    instance._loaded_assignee_id = instance.assigned_to_id
+
+def shift_assignment_changed(sender, instance, **kwargs):
+    touch_agenda('shifts', [instance.staff_member_id])
+
+def shift_changed(sender, instance, created=False, **kwargs):
+    from .models import ShiftAssignment
+
+    if not created:
+        touch_agenda('shifts', ShiftAssignment.objects.filter(  # type: ignore[attr-defined]
+            shift=instance,
+        ).values_list('staff_member_id', flat=True))
+
+def medical_record_changed(sender, instance, **kwargs):
+    touch_agenda('medical')
+
+def event_children_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Enfants ajoutés ou retirés d'événements : agendas de leurs participants"""
+    from .models import Event
+
+    if action == 'pre_clear' and reverse:
+        # Les événements quittés ne sont plus connus après le vidage
+        instance._cleared_agenda_event_ids = set(instance.events.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        event_ids = {instance.pk}
+    elif action == 'post_clear':
+        event_ids = instance.__dict__.pop('_cleared_agenda_event_ids', set())
+    else:
+        event_ids = set(pk_set or ())
+    if not event_ids:
+        return
+    user_ids = set(Event.objects.filter(pk__in=event_ids).values_list('organizer_id', flat=True))  # type: ignore[attr-defined]
+    user_ids.update(Event.staff_members.through.objects.filter(  # type: ignore[attr-defined]
+        event_id__in=event_ids,
+    ).values_list('user_id', flat=True))
+    touch_agenda('participants', user_ids)
+
+def child_changed(sender, instance, **kwargs):
+    touch_agenda('children')
@@ -0,0 +1,140 @@
+"""
+Création d'événements et ajout de participants par lot
+
+Une série de sorties (plusieurs événements, des dizaines d'enfants et de
+membres du personnel) s'écrit en un nombre fixe de requêtes, quel que soit
+le nombre de participants :
+
+- ``create_events`` : un ``bulk_create`` des événements puis un par table de
+  liaison (``Event.children.through``, ``Event.staff_members.through``) ;
+- ``add_participants`` : événements, participants et liaisons existantes lus
+  en une requête chacun, conflits vérifiés en une passe
+  (``conflicts.find_conflicts``), liaisons créées par ``bulk_create``.
+
+Les écritures en lot n'émettent pas de signaux : les flux de calendrier (et
+donc les agendas) sont renouvelés explicitement (``feeds.events_written``).
+"""
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from . import feeds
+from .conflicts import INACTIVE_STATUSES, find_conflicts, make_candidate
+
+logger = logging.getLogger(__name__)
+
+class ParticipantsError(Exception):
+    """Ajout de participants refusé (identifiants inconnus ou conflits)"""
+
+    def __init__(self, message, conflicts=None, missing=None):
+        super().__init__(message)
+        self.conflicts = conflicts or []
+        self.missing = missing or {}
+
+def _link_rows(through, source, target, pairs):
+    return [through(**{f'{source}_id': left, f'{target}_id': right}) for left, right in pairs]
+
+def create_events(items, user):
+    """Crée des événements validés et leurs participants (trois insertions)"""
+    from .models import PRIORITY_RANKS, Event
+
+    ChildLink = Event.children.through
+    StaffLink = Event.staff_members.through
+
+    events, child_pairs, staff_pairs = [], [], []
+    with transaction.atomic():
+        for item in items:
+            item = dict(item)
+            children = item.pop('children', [])
+            staff = item.pop('staff_members', [])
+            item.pop('ignore_conflicts', None)
+            item.update(organizer=user, created_by=user)
+            event = Event(**item)
+            # bulk_create n'appelle pas save()
+            event.priority_rank = PRIORITY_RANKS.get(event.priority, 0)
+            events.append(event)
+            child_pairs.extend((event.pk, child.pk) for child in children)
+            staff_pairs.extend((event.pk, member.pk) for member in staff)
+
+        Event.objects.bulk_create(events)  # type: ignore[attr-defined]
+        ChildLink.objects.bulk_create(_link_rows(ChildLink, 'event', 'child', child_pairs), batch_size=1000)
+        StaffLink.objects.bulk_create(_link_rows(StaffLink, 'event', 'user', staff_pairs), batch_size=1000)
+
+        staff_by_event = {}
+        for event_id, user_id in staff_pairs:
+            staff_by_event.setdefault(event_id, set()).add(user_id)
+        feeds.events_written(events, staff_by_event)
+    return events
+
+def add_participants(events, child_ids=(), staff_ids=(), ignore_conflicts=False):
+    """Ajoute enfants et personnel à des événements existants (nombre fixe de requêtes)"""
+    from apps.children.models import Child
+    from django.contrib.auth import get_user_model
+    from .models import Event
+
+    ChildLink = Event.children.through
+    StaffLink = Event.staff_members.through
+    events = list(events)
+    event_ids = [event.pk for event in events]
+
+    children = {str(pk) for pk in Child.objects.filter(pk__in=child_ids).values_list('pk', flat=True)} if child_ids else set()  # type: ignore[attr-defined]
+    staff = {str(pk) for pk in get_user_model().objects.filter(pk__in=staff_ids).values_list('pk', flat=True)} if staff_ids else set()
+    missing = {
+        'children': sorted({str(pk) for pk in child_ids} - children),
+        'staff_members': sorted({str(pk) for pk in staff_ids} - staff),
+    }
+    if missing['children'] or missing['staff_members']:
+        raise ParticipantsError('unknown participants', missing={key: value for key, value in missing.items() if value})
+
+    existing_children = {
+        (event_id, str(child_id)) for event_id, child_id in ChildLink.objects.filter(
+            event_id__in=event_ids, child_id__in=children,
+        ).values_list('event_id', 'child_id')
+    } if children else set()
+    # Tout le personnel des événements : leurs flux et agendas changent aussi
+    staff_by_event = {}
+    for event_id, user_id in StaffLink.objects.filter(event_id__in=event_ids).values_list('event_id', 'user_id'):
+        staff_by_event.setdefault(event_id, set()).add(str(user_id))
+
+    child_pairs, staff_pairs = [], []
+    for event in events:
+        child_pairs.extend(
+            (event.pk, child_id) for child_id in sorted(children) if (event.pk, child_id) not in existing_children
+        )
+        staff_pairs.extend(
+            (event.pk, user_id) for user_id in sorted(staff) if user_id not in staff_by_event.get(event.pk, ())
+        )
+
+    if not ignore_conflicts:
+        new_children, new_staff = {}, {}
+        for event_id, child_id in child_pairs:
+            new_children.setdefault(event_id, []).append(child_id)
+        for event_id, user_id in staff_pairs:
+            new_staff.setdefault(event_id, []).append(user_id)
+        # Seuls les nouveaux participants sont vérifiés ; la salle est déjà réservée
+        conflicts = find_conflicts(
+            make_candidate(
+                event.pk, event.start_datetime, event.end_datetime,
+                staff=new_staff.get(event.pk, ()), children=new_children.get(event.pk, ()), event_id=event.pk,
+            )
+            for event in events
+            if event.status not in INACTIVE_STATUSES and (event.pk in new_children or event.pk in new_staff)
+        )
+        if conflicts:
+            raise ParticipantsError('conflicts', conflicts=conflicts)
+
+    with transaction.atomic():
+        ChildLink.objects.bulk_create(
+            _link_rows(ChildLink, 'event', 'child', child_pairs), batch_size=1000, ignore_conflicts=True,
+        )
+        StaffLink.objects.bulk_create(
+            _link_rows(StaffLink, 'event', 'user', staff_pairs), batch_size=1000, ignore_conflicts=True,
+        )
+        if child_pairs or staff_pairs:
+            # Les événements réapparaissent dans les deltas des flux
+            Event.objects.filter(pk__in=event_ids).update(updated_at=timezone.now())  # type: ignore[attr-defined]
+            for event_id, user_id in staff_pairs:
+                staff_by_event.setdefault(event_id, set()).add(user_id)
+            feeds.events_written(events, staff_by_event)
+
+    return {'children_added': len(child_pairs), 'staff_added': len(staff_pairs)}
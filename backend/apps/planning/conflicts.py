@@ -0,0 +1,190 @@
+"""
+Détection des conflits de réservation des événements
+
+Un événement réserve une salle (``room``), du personnel (``staff_members``)
+et des enfants (``children``) sur un intervalle. Deux événements actifs qui
+se chevauchent et partagent l'une de ces ressources sont en conflit.
+
+Pour un lot d'événements candidats (création, modification ou import), les
+intervalles existants de toutes les ressources concernées sont chargés en
+une seule requête (union de la table des événements et des deux tables de
+liaison), puis chaque ressource est balayée par ordre de début : la liste
+des intervalles encore ouverts donne directement les paires qui se
+chevauchent, y compris entre candidats du même lot.
+"""
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+from heapq import heappop, heappush
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Statuts qui ne réservent plus les ressources
+INACTIVE_STATUSES = ['cancelled', 'postponed']
+
+RESOURCE_ROOM = 'room'
+RESOURCE_STAFF = 'staff'
+RESOURCE_CHILD = 'child'
+
+def _ids(values):
+    """Identifiants d'une liste d'instances ou de clés primaires"""
+    return {str(getattr(value, 'pk', value)) for value in values or ()}
+
+def make_candidate(key, start, end, room='', staff=(), children=(), event_id=None):
+    """Décrit un événement à vérifier (``event_id`` : événement modifié, ignoré en base)"""
+    return {
+        'key': key,
+        'start': start,
+        'end': end,
+        'room': (room or '').strip(),
+        'staff': _ids(staff),
+        'children': _ids(children),
+        'event_id': str(event_id) if event_id else None,
+    }
+
+def load_intervals(candidates):
+    """Intervalles existants des ressources des candidats (une requête)"""
+    from .models import Event
+
+    rooms, staff, children = set(), set(), set()
+    for candidate in candidates:
+        if candidate['room']:
+            rooms.add(candidate['room'])
+        staff |= candidate['staff']
+        children |= candidate['children']
+    if not (rooms or staff or children):
+        return []
+
+    window_start = min(candidate['start'] for candidate in candidates)
+    window_end = max(candidate['end'] for candidate in candidates)
+    # Colonnes communes aux trois requêtes de l'union
+    columns = ('resource_type', 'resource_id', 'event_ref', 'event_title', 'starts', 'ends')
+
+    queries = []
+    if rooms:
+        queries.append(Event.objects.filter(  # type: ignore[attr-defined]
+            room__in=rooms,
+            start_datetime__lt=window_end,
+            end_datetime__gt=window_start,
+        ).exclude(status__in=INACTIVE_STATUSES).order_by().annotate(
+            resource_type=Value(RESOURCE_ROOM, output_field=CharField()),
+            resource_id=F('room'),
+            event_ref=Cast('id', CharField()),
+            event_title=F('title'),
+            starts=F('start_datetime'),
+            ends=F('end_datetime'),
+        ).values_list(*columns))
+    for kind, through, field, ids in (
+        (RESOURCE_STAFF, Event.staff_members.through, 'user_id', staff),
+        (RESOURCE_CHILD, Event.children.through, 'child_id', children),
+    ):
+        if ids:
+            queries.append(through.objects.filter(**{
+                f'{field}__in': ids,
+                'event__start_datetime__lt': window_end,
+                'event__end_datetime__gt': window_start,
+            }).exclude(event__status__in=INACTIVE_STATUSES).order_by().annotate(
+                resource_type=Value(kind, output_field=CharField()),
+                resource_id=Cast(field, CharField()),
+                event_ref=Cast('event_id', CharField()),
+                event_title=F('event__title'),
+                starts=F('event__start_datetime'),
+                ends=F('event__end_datetime'),
+            ).values_list(*columns))
+
+    query = queries[0].union(*queries[1:], all=True) if len(queries) > 1 else queries[0]
+    return [
+        {'kind': kind, 'resource': resource, 'event': str(uuid.UUID(event)), 'title': title, 'start': start, 'end': end}
+        for kind, resource, event, title, start, end in query
+    ]
+
+def _normalize(resource_id):
+    # Les UUID convertis en texte n'ont pas de tirets sous SQLite
+    return resource_id.replace('-', '').lower()
+
+def _candidate_resources(candidate):
+    if candidate['room']:
+        yield RESOURCE_ROOM, candidate['room']
+    for staff_id in candidate['staff']:
+        yield RESOURCE_STAFF, staff_id
+    for child_id in candidate['children']:
+        yield RESOURCE_CHILD, child_id
+
+def sweep_conflicts(candidates, existing):
+    """Paires d'intervalles qui se chevauchent sur une même ressource.
+
+    ``existing`` : lignes retournées par ``load_intervals``. Seules les paires
+    impliquant au moins un candidat sont retournées.
+    """
+    modified = {_normalize(candidate['event_id']) for candidate in candidates if candidate['event_id']}
+    resources = {}  # (type, ressource normalisée) -> (ressource, [(début, fin, candidat ?, élément)])
+
+    for candidate in candidates:
+        for kind, resource in _candidate_resources(candidate):
+            resources.setdefault((kind, _normalize(resource)), (resource, []))[1].append(
+                (candidate['start'], candidate['end'], True, candidate)
+            )
+    for row in existing:
+        entry = resources.get((row['kind'], _normalize(row['resource'])))
+        if entry is not None and _normalize(row['event']) not in modified:
+            entry[1].append((row['start'], row['end'], False, row))
+
+    conflicts = []
+    for (kind, _), (resource_id, intervals) in resources.items():
+        intervals.sort(key=lambda interval: interval[0])
+        active = []  # Tas des intervalles ouverts : (fin, rang, intervalle)
+        for rank, interval in enumerate(intervals):
+            start, end, is_candidate, item = interval
+            while active and active[0][0] <= start:
+                heappop(active)
+            for _, _, (_, _, other_is_candidate, other) in active:
+                if is_candidate or other_is_candidate:
+                    first, second = (item, other) if is_candidate else (other, item)
+                    conflicts.append(_conflict(kind, resource_id, first, second, is_candidate and other_is_candidate))
+            heappush(active, (end, rank, interval))
+    return conflicts
+
+def _conflict(kind, resource_id, candidate, other, between_candidates):
+    """Décrit un conflit du point de vue du candidat"""
+    if between_candidates:
+        conflicting_event, title = other['key'], None
+    else:
+        conflicting_event, title = other['event'], other['title']
+    return {
+        'event': candidate['key'],
+        'resource_type': kind,
+        'resource_id': resource_id,
+        'conflicting_event': conflicting_event,
+        'conflicting_title': title,
+        'start': max(candidate['start'], other['start']),
+        'end': min(candidate['end'], other['end']),
+    }
+
+def find_conflicts(candidates):
+    """Conflits d'un lot de candidats avec la base et entre eux"""
+    candidates = list(candidates)
+    if not candidates:
+        return []
+    return sweep_conflicts(candidates, load_intervals(candidates))
+
+def _identifier(value):
+    """Identifiant d'événement sérialisable (indice de lot et None conservés)"""
+    if value is None or isinstance(value, int):
+        return value
+    return str(value)
+
+def format_conflicts(conflicts):
+    """Conflits sérialisables (réponses d'API, erreurs de validation)"""
+    return [
+        dict(conflict, start=timezone.localtime(conflict['start']).isoformat(),
+             end=timezone.localtime(conflict['end']).isoformat(),
+             event=_identifier(conflict['event']),
+             conflicting_event=_identifier(conflict['conflicting_event']))
+        for conflict in conflicts
+    ]
+
+def find_event_conflicts(start, end, room='', staff=(), children=(), event_id=None):
+    """Conflits d'un seul événement"""
+    return find_conflicts([make_candidate(event_id, start, end, room, staff, children, event_id)])
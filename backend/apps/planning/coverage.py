@@ -0,0 +1,137 @@
+"""
+Couverture en personnel par tranches de 15 minutes
+
+Compare, sur une période, l'effectif planifié au besoin :
+
+- effectif : attributions d'équipes (hors annulées et absences) ;
+- besoin : somme des ``Shift.minimum_staff`` des équipes en cours, et
+  encadrement des enfants présents (``CHILDREN_PER_STAFF`` enfants par
+  membre du personnel) ; le plus exigeant des deux l'emporte.
+
+Les équipes (avec leur effectif, agrégé en base) et les présences des
+enfants sont chargées en deux requêtes, puis rastérisées en tableaux NumPy :
+chaque intervalle ajoute son poids au début et le retire à la fin d'un
+tableau de différences, dont la somme cumulée donne le niveau par tranche.
+
+Les tranches suivent l'heure locale « murale » : un jour compte toujours
+24 heures, y compris aux changements d'heure.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+from datetime import timedelta
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+def _config():
+    return getattr(settings, 'COVERAGE', {})
+
+def rasterize(starts, ends, weights, size):
+    """Niveau par tranche d'une somme d'intervalles ``[start, end)`` pondérés"""
+    diff = np.zeros(size + 1, dtype=np.int32)
+    starts = np.clip(starts, 0, size)
+    ends = np.clip(ends, 0, size)
+    valid = ends > starts
+    np.add.at(diff, starts[valid], weights[valid])
+    np.add.at(diff, ends[valid], -weights[valid])
+    return np.cumsum(diff[:-1], dtype=np.int32)
+
+def shift_buckets(day_offsets, start_minutes, end_minutes, bucket_minutes):
+    """Tranches de début (incluse) et de fin (exclue) d'équipes ; une fin avant le début passe au lendemain"""
+    end_minutes = np.where(end_minutes <= start_minutes, end_minutes + MINUTES_PER_DAY, end_minutes)
+    base = day_offsets * (MINUTES_PER_DAY // bucket_minutes)
+    starts = base + start_minutes // bucket_minutes
+    ends = base + -(-end_minutes // bucket_minutes)
+    return starts, ends
+
+def _runs(mask):
+    """Plages ``[début, fin)`` des tranches où ``mask`` est vrai"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+
+def compute_coverage(start_date, end_date):
+    """Heatmap effectif / besoin de ``start_date`` à ``end_date`` inclus"""
+    from apps.children.models import Child
+    from .models import Shift
+
+    config = _config()
+    bucket_minutes = config.get('BUCKET_MINUTES', 15)
+    children_per_staff = config.get('CHILDREN_PER_STAFF', 8)
+    per_day = MINUTES_PER_DAY // bucket_minutes
+    days = (end_date - start_date).days + 1
+    size = days * per_day
+
+    # 1. Équipes de la période (et de la veille, pour les nuits) avec leur effectif
+    rows = list(Shift.objects.filter(  # type: ignore[attr-defined]
+        date__gte=start_date - timedelta(days=1),
+        date__lte=end_date,
+    ).annotate(staffed=Count(
+        'shiftassignment',
+        filter=~Q(shiftassignment__status__in=['cancelled', 'absent']),
+    )).order_by().values_list('date', 'start_time', 'end_time', 'minimum_staff', 'staffed'))
+
+    if rows:
+        shift_dates, start_times, end_times, minimums, staffed_counts = zip(*rows)
+        offsets = np.fromiter(((day - start_date).days for day in shift_dates), dtype=np.int64, count=len(rows))
+        start_minutes = np.fromiter((value.hour * 60 + value.minute for value in start_times), dtype=np.int64, count=len(rows))
+        end_minutes = np.fromiter((value.hour * 60 + value.minute for value in end_times), dtype=np.int64, count=len(rows))
+        starts, ends = shift_buckets(offsets, start_minutes, end_minutes, bucket_minutes)
+        staffed = rasterize(starts, ends, np.asarray(staffed_counts, dtype=np.int32), size)
+        shift_demand = rasterize(starts, ends, np.asarray(minimums, dtype=np.int32), size)
+    else:
+        staffed = np.zeros(size, dtype=np.int32)
+        shift_demand = np.zeros(size, dtype=np.int32)
+
+    # 2. Enfants présents par jour : arrivée, jusqu'à l'adoption le cas échéant
+    children = Child.objects.filter(arrival_date__lte=end_date).exclude(status='sorti').filter(  # type: ignore[attr-defined]
+        Q(adoption_date__isnull=True) | Q(adoption_date__gt=start_date)
+    ).values_list('arrival_date', 'adoption_date')
+    presence = np.zeros(days + 1, dtype=np.int32)
+    for arrival_date, adoption_date in children:
+        presence[max((arrival_date - start_date).days, 0)] += 1
+        if adoption_date is not None and adoption_date <= end_date:
+            presence[(adoption_date - start_date).days] -= 1
+    children_present = np.cumsum(presence[:-1], dtype=np.int32)
+    children_demand = np.repeat(-(-children_present // children_per_staff), per_day)
+
+    required = np.maximum(shift_demand, children_demand)
+    gap = staffed - required
+
+    shortfalls = []
+    for begin, end in _runs(gap < 0):
+        shortfalls.append({
+            'start': _bucket_label(start_date, begin, bucket_minutes),
+            'end': _bucket_label(start_date, end, bucket_minutes),
+            'min_staffed': int(staffed[begin:end].min()),
+            'max_required': int(required[begin:end].max()),
+            'max_missing': int(-gap[begin:end].min()),
+        })
+
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'bucket_minutes': bucket_minutes,
+        'days': [(start_date + timedelta(days=offset)).isoformat() for offset in range(days)],
+        # Matrices jours x tranches
+        'staffed': staffed.reshape(days, per_day).tolist(),
+        'required': required.reshape(days, per_day).tolist(),
+        'children_present': children_present.tolist(),
+        'summary': {
+            'buckets': size,
+            'understaffed_buckets': int((gap < 0).sum()),
+            'understaffed_hours': round(float((gap < 0).sum()) * bucket_minutes / 60, 2),
+            'max_missing': int(max(-gap.min(), 0)) if size else 0,
+            'coverage_ratio': round(float((gap >= 0).mean()), 4) if size else 1.0,
+        },
+        'shortfalls': shortfalls[:config.get('MAX_SHORTFALLS', 200)],
+    }
+
+def _bucket_label(start_date, index, bucket_minutes):
+    per_day = MINUTES_PER_DAY // bucket_minutes
+    day = start_date + timedelta(days=int(index) // per_day)
+    minutes = (int(index) % per_day) * bucket_minutes
+    return f"{day.isoformat()}T{minutes // 60:02d}:{minutes % 60:02d}"
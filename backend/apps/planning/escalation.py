@@ -0,0 +1,127 @@
+"""
+Escalade des tâches en retard
+
+La tâche ``escalate_overdue_tasks`` ne relit que les tâches devenues en
+retard depuis son dernier passage : échéance dans ``(point haut, maintenant]``
+et statut ouvert, ce que sert l'index ``(status, due_date)``. Le point haut
+est conservé dans Redis ; le coût suit donc le nombre de tâches nouvellement
+en retard, pas la taille de la table.
+
+Pour chaque lot :
+
+- une notification in-app à la personne assignée et au créateur, créées en
+  un seul ``bulk_create`` (compteurs de non lues ajustés après le commit) ;
+- la priorité (et son rang) montée d'un cran (faible → moyenne → élevée →
+  urgente) en un seul ``UPDATE``.
+
+Une tâche créée avec une échéance déjà passée avant le point haut n'est pas
+escaladée ; une tâche dont l'échéance est repoussée l'est de nouveau si elle
+la dépasse encore.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from datetime import datetime, timedelta
+import logging
+
+from apps.core.redis_client import get_redis_connection
+from .agenda import OPEN_TASK_STATUSES, touch_agenda
+
+logger = logging.getLogger(__name__)
+
+HIGH_WATER_KEY = 'planning:escalation:high_water'
+
+NEXT_PRIORITY = {'low': 'medium', 'medium': 'high', 'high': 'urgent'}
+
+TASK_FIELDS = ('id', 'title', 'priority', 'due_date', 'assigned_to_id', 'created_by_id')
+
+def _config():
+    return getattr(settings, 'TASK_ESCALATION', {})
+
+def get_high_water(now):
+    """Échéance jusqu'à laquelle les tâches ont déjà été examinées"""
+    value = get_redis_connection().get(HIGH_WATER_KEY)
+    if value is None:
+        # Première exécution : ne pas escalader tout l'historique
+        return now - timedelta(hours=_config().get('INITIAL_WINDOW_HOURS', 24))
+    return datetime.fromisoformat(value.decode() if isinstance(value, bytes) else value)
+
+def _notifications(tasks):
+    from apps.notifications.models import Notification
+
+    notifications = []
+    for task_id, title, priority, due_date, assigned_to_id, created_by_id in tasks:
+        escalated = NEXT_PRIORITY.get(priority, priority)
+        for recipient_id in dict.fromkeys([assigned_to_id, created_by_id]):
+            notifications.append(Notification(
+                recipient_id=recipient_id,
+                notification_type='in_app',
+                subject=f"Tâche en retard: {title}",
+                message=(
+                    f"La tâche '{title}' était due le "
+                    f"{timezone.localtime(due_date).strftime('%d/%m/%Y à %H:%M')}."
+                ),
+                priority='urgent' if escalated == 'urgent' else 'high',
+                context_data={
+                    'task_id': str(task_id),
+                    'due_date': due_date.isoformat(),
+                    'previous_priority': priority,
+                    'priority': escalated,
+                },
+            ))
+    return notifications
+
+def escalate_batch(tasks, now) -> int:
+    """Notifie et monte la priorité d'un lot de tâches (une insertion, une mise à jour)"""
+    from apps.notifications.models import Notification
+    from .models import PRIORITY_RANKS, Task
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(_notifications(tasks), batch_size=500)
+        Task.objects.filter(  # type: ignore[attr-defined]
+            id__in=[task[0] for task in tasks],
+        ).update(
+            priority=Case(
+                *[When(priority=current, then=Value(escalated)) for current, escalated in NEXT_PRIORITY.items()],
+                default=F('priority'),
+            ),
+            priority_rank=Case(
+                *[When(priority=current, then=Value(PRIORITY_RANKS[escalated])) for current, escalated in NEXT_PRIORITY.items()],
+                default=F('priority_rank'),
+            ),
+            updated_at=now,
+        )
+        # L'UPDATE n'émet pas de signaux : agendas des personnes assignées
+        touch_agenda('tasks', [task[4] for task in tasks])
+    return len(tasks)
+
+def escalate_new_overdue(now=None) -> dict:
+    """Escalade les tâches arrivées à échéance depuis le dernier passage"""
+    from .models import Task
+
+    now = now or timezone.now()
+    batch_size = _config().get('BATCH_SIZE', 500)
+    high_water = get_high_water(now)
+    window = Task.objects.filter(  # type: ignore[attr-defined]
+        status__in=OPEN_TASK_STATUSES,
+        due_date__gt=high_water,
+        due_date__lte=now,
+    ).order_by('due_date', 'id')
+
+    escalated = 0
+    last = None
+    while True:
+        batch = window
+        if last is not None:
+            batch = batch.filter(due_date__gte=last[0]).exclude(due_date=last[0], id__lte=last[1])
+        batch = list(batch.values_list(*TASK_FIELDS)[:batch_size])
+        if not batch:
+            break
+        escalated += escalate_batch(batch, now)
+        last = (batch[-1][3], batch[-1][0])
+        if len(batch) < batch_size:
+            break
+
+    get_redis_connection().set(HIGH_WATER_KEY, now.isoformat())
+    return {'escalated': escalated, 'since': high_water.isoformat(), 'until': now.isoformat()}
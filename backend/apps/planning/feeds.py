@@ -0,0 +1,370 @@
+"""
+Flux de calendrier incrémentaux (iCalendar et JSON)
+
+Chaque flux a une portée : ``user:<id>`` (événements organisés ou avec le
+membre du personnel) ou ``room:<salle>``. Deux mécanismes évitent de
+retélécharger un flux complet :
+
+- **Requêtes conditionnelles** : chaque portée a une version dans le cache
+  partagé entre processus (Redis, ``CACHES``), renouvelée après le commit de
+  toute modification qui la touche. L'ETag en dérive : un flux inchangé
+  coûte une lecture de clé et une réponse 304.
+- **Jeton de synchronisation** : horodatage (microsecondes) du dernier
+  ``Event.updated_at`` ou ``EventTombstone.deleted_at`` transmis, reculé
+  jusqu'à ``SYNC_SAFETY_SECONDS`` avant l'instant de la requête. Un appel
+  avec ``sync_token`` ne retourne que les événements modifiés depuis et les
+  retraits (``EventTombstone``) : suppression, changement de salle ou
+  d'organisateur, retrait d'un membre du personnel.
+
+``updated_at`` est fixé à l'écriture, pas au commit : une transaction lente
+peut rendre visible une ligne plus ancienne que le dernier horodatage déjà
+transmis. La marge de sécurité la renvoie au passage suivant ; les
+événements récents peuvent donc être transmis deux fois (mise à jour
+idempotente côté client).
+
+Les versions et retraits sont tenus par des récepteurs de signaux
+(``post_save``, ``pre_delete``, ``m2m_changed``) branchés dans
+``models.py`` : ils couvrent aussi l'administration et les suppressions en
+cascade. Les retraits plus anciens que ``TOMBSTONE_RETENTION_DAYS`` sont
+purgés ; un jeton plus ancien impose une resynchronisation complète.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+FEED_SIGNING_SALT = 'planning.feeds'
+
+RRULE_FREQUENCIES = {
+    'daily': 'DAILY',
+    'weekly': 'WEEKLY',
+    'monthly': 'MONTHLY',
+    'yearly': 'YEARLY',
+}
+
+ICS_STATUSES = {
+    'scheduled': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'in_progress': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+    'postponed': 'CANCELLED',
+}
+
+class SyncTokenExpired(Exception):
+    """Jeton antérieur à la rétention des retraits : resynchronisation complète requise"""
+
+def _config():
+    return getattr(settings, 'CALENDAR_FEEDS', {})
+
+def user_scope(user_id) -> str:
+    return f"user:{user_id}"
+
+def room_scope(room) -> str:
+    return f"room:{room}"
+
+def sign_scope(scope) -> str:
+    """Clé d'abonnement d'un flux iCalendar (URL sans authentification)"""
+    return signing.Signer(salt=FEED_SIGNING_SALT).sign(scope).split(':')[-1]
+
+def check_scope_key(scope, key) -> bool:
+    try:
+        return signing.Signer(salt=FEED_SIGNING_SALT).unsign(f"{scope}:{key}") == scope
+    except signing.BadSignature:
+        return False
+
+# Versions des flux
+
+def _version_key(scope) -> str:
+    # Les noms de salle ne sont pas des clés de cache valides
+    return f"planning:feed:{hashlib.md5(scope.encode()).hexdigest()}"
+
+def feed_version(scope) -> str:
+    """Version courante d'un flux (initialisée au premier accès)"""
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, str(time.time_ns()), None)
+        version = cache.get(key)
+    return version
+
+def touch_feeds(scopes):
+    """Renouvelle la version des flux après le commit"""
+    scopes = [scope for scope in scopes if scope]
+    if not scopes:
+        return
+    version = str(time.time_ns())
+    transaction.on_commit(lambda: cache.set_many({_version_key(scope): version for scope in scopes}, None))
+
+def feed_etag(scope, variant='') -> str:
+    """ETag d'une réponse de flux : version de la portée et paramètres de la requête"""
+    digest = hashlib.md5(f"{feed_version(scope)}|{variant}".encode()).hexdigest()
+    return f'"{digest}"'
+
+# Jetons de synchronisation
+
+def encode_sync_token(moment) -> str:
+    return str(int(moment.timestamp() * 1_000_000))
+
+def decode_sync_token(token):
+    """Horodatage d'un jeton ; ``ValueError`` si invalide, ``SyncTokenExpired`` si trop ancien"""
+    moment = datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+    retention = timedelta(days=_config().get('TOMBSTONE_RETENTION_DAYS', 90))
+    if moment < timezone.now() - retention:
+        raise SyncTokenExpired(token)
+    return moment
+
+# Récepteurs de signaux
+
+def _event_scopes(event, staff_ids):
+    scopes = {user_scope(event.organizer_id)}
+    scopes.update(user_scope(staff_id) for staff_id in staff_ids)
+    if event.room:
+        scopes.add(room_scope(event.room))
+    return scopes
+
+def _bury(events, scopes_by_event):
+    """Enregistre les retraits d'événements de leurs flux"""
+    from .models import EventTombstone
+
+    EventTombstone.objects.bulk_create([  # type: ignore[attr-defined]
+        EventTombstone(
+            event_id=event.pk,
+            scope=scope,
+            title=event.title,
+            start_datetime=event.start_datetime,
+            end_datetime=event.end_datetime,
+        )
+        for event in events
+        for scope in scopes_by_event.get(event.pk, ())
+    ])
+
+def events_written(events, staff_ids_by_event):
+    """Écritures en lot (``bulk_create``, ``update``), sans signaux : version des flux concernés"""
+    scopes = set()
+    for event in events:
+        scopes |= _event_scopes(event, staff_ids_by_event.get(event.pk, ()))
+    touch_feeds(scopes)
+
+def event_saved(sender, instance, created, raw=False, **kwargs):
+    """Version des flux de l'événement ; retrait de l'ancienne salle ou de l'ancien organisateur"""
+    if raw:
+        return
+    staff_ids = set() if created else set(instance.staff_members.values_list('pk', flat=True))
+    scopes = _event_scopes(instance, staff_ids)
+
+    old_organizer_id, old_room = getattr(instance, '_loaded_feed_owners', (None, None))
+    removed = set()
+    if old_organizer_id and old_organizer_id != instance.organizer_id and old_organizer_id not in staff_ids:
+        removed.add(user_scope(old_organizer_id))
+    if old_room and old_room != instance.room:
+        removed.add(room_scope(old_room))
+    if removed:
+        _bury([instance], {instance.pk: removed})
+    instance._loaded_feed_owners = (instance.organizer_id, instance.room)
+
+    touch_feeds(scopes | removed)
+
+def event_deleted(sender, instance, **kwargs):
+    """Retrait de l'événement de tous ses flux"""
+    scopes = _event_scopes(instance, instance.staff_members.values_list('pk', flat=True))
+    _bury([instance], {instance.pk: scopes})
+    touch_feeds(scopes)
+
+def event_staff_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Ajout ou retrait de personnel : mise à jour des flux concernés"""
+    from .models import Event
+
+    if action == 'pre_clear':
+        # Les identifiants retirés ne sont plus connus après le vidage
+        related = instance.assigned_events if reverse else instance.staff_members
+        instance._cleared_feed_pks = set(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    pks = instance.__dict__.pop('_cleared_feed_pks', set()) if action == 'post_clear' else set(pk_set or ())
+    if not pks:
+        return
+    pairs = [(pk, instance.pk) for pk in pks] if reverse else [(instance.pk, pk) for pk in pks]
+    event_ids = {event_id for event_id, _ in pairs}
+
+    # Les événements réapparaissent dans les deltas des flux modifiés
+    Event.objects.filter(pk__in=event_ids).update(updated_at=timezone.now())  # type: ignore[attr-defined]
+
+    if action != 'post_add':
+        events = {event.pk: event for event in Event.objects.filter(pk__in=event_ids).only(  # type: ignore[attr-defined]
+            'id', 'title', 'start_datetime', 'end_datetime', 'organizer_id',
+        )}
+        scopes_by_event = {}
+        for event_id, user_id in pairs:
+            event = events.get(event_id)
+            # L'organisateur voit toujours ses événements
+            if event is not None and event.organizer_id != user_id:
+                scopes_by_event.setdefault(event_id, set()).add(user_scope(user_id))
+        _bury(events.values(), scopes_by_event)
+
+    touch_feeds({user_scope(user_id) for _, user_id in pairs})
+
+# Contenu des flux
+
+def scope_events(scope_type, value):
+    """Événements d'une portée dans la fenêtre des flux"""
+    from .models import Event
+
+    horizon = timezone.now() - timedelta(days=_config().get('PAST_DAYS', 30))
+    events = Event.objects.filter(end_datetime__gte=horizon)  # type: ignore[attr-defined]
+    if scope_type == 'room':
+        return events.filter(room=value)
+    return events.filter(Q(organizer_id=value) | Q(staff_members=value)).distinct()
+
+def feed_changes(scope_type, value, since=None):
+    """Événements et retraits d'un flux depuis ``since`` (tout le flux si None).
+
+    Retourne ``(événements, retraits, jeton suivant)``.
+    """
+    from .models import EventTombstone
+
+    scope = room_scope(value) if scope_type == 'room' else user_scope(value)
+    events = scope_events(scope_type, value)
+    tombstones = []
+    if since is not None:
+        events = events.filter(updated_at__gt=since)
+        tombstones = list(EventTombstone.objects.filter(  # type: ignore[attr-defined]
+            scope=scope, deleted_at__gt=since,
+        ).order_by('deleted_at'))
+    events = list(events.order_by('start_datetime'))
+
+    # Un événement revenu dans le flux après son retrait n'est plus retiré
+    present = {event.pk for event in events}
+    tombstones = [tombstone for tombstone in tombstones if tombstone.event_id not in present]
+
+    # Les écritures des SYNC_SAFETY_SECONDS dernières secondes peuvent encore
+    # être suivies de commits plus anciens : le jeton ne les dépasse pas
+    safe_until = timezone.now() - timedelta(seconds=_config().get('SYNC_SAFETY_SECONDS', 30))
+    moments = [event.updated_at for event in events] + [tombstone.deleted_at for tombstone in tombstones]
+    next_moment = min(max(moments), safe_until) if moments else safe_until
+    if since is not None:
+        next_moment = max(next_moment, since)
+    next_token = encode_sync_token(next_moment)
+    return events, tombstones, next_token
+
+def serialize_feed_event(event) -> dict:
+    """Représentation compacte d'un événement pour le delta JSON"""
+    return {
+        'id': str(event.id),
+        'title': event.title,
+        'event_type': event.event_type,
+        'start': event.start_datetime.isoformat(),
+        'end': event.end_datetime.isoformat(),
+        'all_day': event.all_day,
+        'room': event.room,
+        'location': event.location,
+        'status': event.status,
+        'priority': event.priority,
+        'recurrence_type': event.recurrence_type,
+        'recurrence_end_date': event.recurrence_end_date.isoformat() if event.recurrence_end_date else None,
+        'updated_at': event.updated_at.isoformat(),
+    }
+
+# Format iCalendar (RFC 5545)
+
+def _ics_escape(value) -> str:
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _ics_datetime(moment) -> str:
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+def _ics_fold(line) -> list:
+    """Découpe une ligne en segments de 75 octets au plus, sans couper un caractère"""
+    segments = []
+    current, size = '', 0
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > (75 if not segments else 74):
+            segments.append(current)
+            current, size = '', 0
+        current += char
+        size += width
+    segments.append(current)
+    return [segments[0]] + [f" {segment}" for segment in segments[1:]]
+
+def _ics_uid(event_id) -> str:
+    return f"{event_id}@planning"
+
+def _vevent(event, stamp) -> list:
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{_ics_uid(event.id)}",
+        f"DTSTAMP:{stamp}",
+        f"LAST-MODIFIED:{_ics_datetime(event.updated_at)}",
+    ]
+    if event.all_day:
+        start = timezone.localtime(event.start_datetime).date()
+        end = max(timezone.localtime(event.end_datetime).date(), start + timedelta(days=1))
+        lines += [f"DTSTART;VALUE=DATE:{start:%Y%m%d}", f"DTEND;VALUE=DATE:{end:%Y%m%d}"]
+    else:
+        lines += [f"DTSTART:{_ics_datetime(event.start_datetime)}", f"DTEND:{_ics_datetime(event.end_datetime)}"]
+    lines.append(f"SUMMARY:{_ics_escape(event.title)}")
+    if event.description:
+        lines.append(f"DESCRIPTION:{_ics_escape(event.description)}")
+    location = ', '.join(part for part in (event.room, event.location) if part)
+    if location:
+        lines.append(f"LOCATION:{_ics_escape(location)}")
+    lines.append(f"STATUS:{ICS_STATUSES.get(event.status, 'CONFIRMED')}")
+    lines.append(f"CATEGORIES:{_ics_escape(event.get_event_type_display())}")
+    frequency = RRULE_FREQUENCIES.get(event.recurrence_type)
+    if frequency:
+        rule = f"RRULE:FREQ={frequency}"
+        if event.recurrence_end_date:
+            rule += f";UNTIL={event.recurrence_end_date:%Y%m%d}T235959Z"
+        lines.append(rule)
+    lines.append('END:VEVENT')
+    return lines
+
+def _cancelled_vevent(tombstone, stamp) -> list:
+    return [
+        'BEGIN:VEVENT',
+        f"UID:{_ics_uid(tombstone.event_id)}",
+        f"DTSTAMP:{stamp}",
+        f"LAST-MODIFIED:{_ics_datetime(tombstone.deleted_at)}",
+        f"DTSTART:{_ics_datetime(tombstone.start_datetime)}",
+        f"DTEND:{_ics_datetime(tombstone.end_datetime)}",
+        f"SUMMARY:{_ics_escape(tombstone.title)}",
+        'STATUS:CANCELLED',
+        'END:VEVENT',
+    ]
+
+def render_ics(name, events, tombstones=()) -> str:
+    """Calendrier iCalendar : événements et retraits (annulés)"""
+    stamp = _ics_datetime(timezone.now())
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Orphelinat//Planning//FR',
+        'CALSCALE:GREGORIAN',
+        f"X-WR-CALNAME:{_ics_escape(name)}",
+    ]
+    for event in events:
+        lines += _vevent(event, stamp)
+    for tombstone in tombstones:
+        lines += _cancelled_vevent(tombstone, stamp)
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(folded for line in lines for folded in _ics_fold(line)) + '\r\n'
+
+def purge_tombstones() -> int:
+    """Supprime les retraits plus anciens que la rétention"""
+    from .models import EventTombstone
+
+    cutoff = timezone.now() - timedelta(days=_config().get('TOMBSTONE_RETENTION_DAYS', 90))
+    deleted, _ = EventTombstone.objects.filter(deleted_at__lt=cutoff).delete()  # type: ignore[attr-defined]
+    return deleted
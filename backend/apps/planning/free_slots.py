@@ -0,0 +1,157 @@
+"""
+Recherche de créneaux libres communs
+
+Pour un ensemble de participants (personnel, enfants, salle), une durée et
+une fenêtre, calcule les créneaux où tous sont libres. Les occupations sont
+chargées en quatre requêtes :
+
+- les heures hors ``Schedule`` (jours non travaillés, avant et après les
+  heures de travail) pour le personnel qui a un planning ;
+- les ``Availability`` bloquantes ;
+- les équipes (``ShiftAssignment`` non annulées) ;
+- les événements actifs de tous les participants (``conflicts.load_intervals``).
+
+Chaque participant fournit une liste d'intervalles occupés triés ; les
+listes sont fusionnées (``heapq.merge``) puis les intervalles qui se
+chevauchent sont réunis en un seul passage. Les trous restants dans la
+fenêtre, assez longs pour la durée demandée, sont les créneaux libres.
+"""
+from django.conf import settings
+from django.utils import timezone
+from datetime import datetime, timedelta
+from heapq import merge
+import logging
+
+from .conflicts import make_candidate, load_intervals
+from .rostering import BLOCKING_AVAILABILITY_TYPES
+
+logger = logging.getLogger(__name__)
+
+def _config():
+    return getattr(settings, 'FREE_SLOTS', {})
+
+def _aware(day, moment):
+    return timezone.make_aware(datetime.combine(day, moment))
+
+def _days(start, end):
+    day = timezone.localtime(start).date()
+    last = timezone.localtime(end).date()
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+def off_hours(working_days, work_start, work_end, start, end):
+    """Intervalles triés hors des heures de travail sur la fenêtre"""
+    busy = []
+    cursor = _aware(timezone.localtime(start).date(), datetime.min.time())
+    for day in _days(start, end):
+        if day.weekday() not in working_days:
+            continue
+        shift_start = _aware(day, work_start)
+        shift_end = _aware(day, work_end)
+        if shift_end <= shift_start:
+            shift_end = _aware(day + timedelta(days=1), work_end)
+        if shift_start > cursor:
+            busy.append((cursor, shift_start))
+        cursor = max(cursor, shift_end)
+    window_end = _aware(timezone.localtime(end).date() + timedelta(days=1), datetime.min.time())
+    if cursor < window_end:
+        busy.append((cursor, window_end))
+    return busy
+
+def merge_intervals(*sorted_lists):
+    """Réunion de listes d'intervalles triées (un seul passage sur la fusion)"""
+    merged = []
+    for start, end in merge(*sorted_lists):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def free_gaps(busy, start, end, duration):
+    """Trous d'au moins ``duration`` entre des intervalles occupés fusionnés"""
+    gaps = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_end <= cursor:
+            continue
+        if busy_start >= end:
+            break
+        if busy_start - cursor >= duration:
+            gaps.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if end - cursor >= duration:
+        gaps.append((cursor, end))
+    return gaps
+
+def _align(moment, granularity):
+    """Arrondit au multiple suivant de ``granularity`` minutes (heure locale)"""
+    local = timezone.localtime(moment)
+    minutes = local.hour * 60 + local.minute
+    remainder = minutes % granularity
+    if remainder or local.second or local.microsecond:
+        local = local.replace(second=0, microsecond=0) + timedelta(minutes=granularity - remainder)
+    return local
+
+def load_busy_intervals(start, end, staff_ids=(), child_ids=(), room=''):
+    """Intervalles occupés par participant : ``{(type, id): [(début, fin), ...]}``"""
+    from .models import Availability, Schedule, ShiftAssignment
+
+    staff_ids = [str(staff_id) for staff_id in staff_ids]
+    busy = {}
+
+    if staff_ids:
+        for schedule in Schedule.objects.filter(user_id__in=staff_ids).only(  # type: ignore[attr-defined]
+            'user_id', 'work_start_time', 'work_end_time',
+            'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+        ):
+            busy.setdefault(('staff', str(schedule.user_id)), []).extend(off_hours(
+                set(schedule.working_days), schedule.work_start_time, schedule.work_end_time, start, end,
+            ))
+
+        for user_id, block_start, block_end in Availability.objects.filter(  # type: ignore[attr-defined]
+            user_id__in=staff_ids,
+            availability_type__in=BLOCKING_AVAILABILITY_TYPES,
+            start_datetime__lt=end,
+            end_datetime__gt=start,
+        ).values_list('user_id', 'start_datetime', 'end_datetime'):
+            busy.setdefault(('staff', str(user_id)), []).append((block_start, block_end))
+
+        for user_id, day, shift_start, shift_end in ShiftAssignment.objects.filter(  # type: ignore[attr-defined]
+            staff_member_id__in=staff_ids,
+            shift__date__gte=timezone.localtime(start).date() - timedelta(days=1),
+            shift__date__lte=timezone.localtime(end).date(),
+        ).exclude(status__in=['cancelled', 'absent']).values_list(
+            'staff_member_id', 'shift__date', 'shift__start_time', 'shift__end_time',
+        ):
+            begins = _aware(day, shift_start)
+            ends = _aware(day + timedelta(days=1) if shift_end <= shift_start else day, shift_end)
+            busy.setdefault(('staff', str(user_id)), []).append((begins, ends))
+
+    for row in load_intervals([make_candidate(None, start, end, room, staff_ids, child_ids)]):
+        busy.setdefault((row['kind'], row['resource']), []).append((row['start'], row['end']))
+
+    return {participant: sorted(intervals) for participant, intervals in busy.items()}
+
+def find_free_slots(start, end, duration, staff_ids=(), child_ids=(), room='', limit=None):
+    """Créneaux libres communs d'au moins ``duration`` dans ``[start, end)``"""
+    config = _config()
+    granularity = config.get('GRANULARITY_MINUTES', 15)
+    limit = limit or config.get('MAX_RESULTS', 50)
+
+    busy = merge_intervals(*load_busy_intervals(start, end, staff_ids, child_ids, room).values())
+    slots = []
+    for gap_start, gap_end in free_gaps(busy, start, end, duration):
+        gap_start = _align(gap_start, granularity)
+        if gap_end - gap_start < duration:
+            continue
+        slots.append({
+            'start': gap_start.isoformat(),
+            'end': timezone.localtime(gap_end).isoformat(),
+            'duration_minutes': int((gap_end - gap_start).total_seconds() // 60),
+        })
+        if len(slots) >= limit:
+            break
+    return slots
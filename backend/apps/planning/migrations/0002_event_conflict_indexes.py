@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_datetime', 'end_datetime'], name='planning_ev_start_d_b051b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['room', 'start_datetime'], name='planning_ev_room_51ab18_idx'),
+        ),
+    ]
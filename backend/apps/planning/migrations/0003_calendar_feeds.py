@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0002_event_conflict_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.UUIDField(verbose_name='Événement')),
+                ('scope', models.CharField(max_length=150, verbose_name='Flux')),
+                ('title', models.CharField(blank=True, max_length=200, verbose_name='Titre')),
+                ('start_datetime', models.DateTimeField(verbose_name='Date et heure de début')),
+                ('end_datetime', models.DateTimeField(verbose_name='Date et heure de fin')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Retiré le')),
+            ],
+            options={
+                'verbose_name': "Retrait d'événement",
+                'verbose_name_plural': "Retraits d'événements",
+            },
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updated_at'], name='planning_ev_updated_347ed3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['room', 'updated_at'], name='planning_ev_room_5f965d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventtombstone',
+            index=models.Index(fields=['scope', 'deleted_at'], name='planning_ev_scope_ac7f61_idx'),
+        ),
+    ]
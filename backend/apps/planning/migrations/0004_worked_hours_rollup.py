@@ -0,0 +1,98 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:59
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Max, Min
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    """Reprise de l'historique des heures réelles dans les lignes quotidiennes
+
+    Copie figée du calcul de ``apps.planning.timesheets`` à la date de la
+    migration : le module peut évoluer sans changer cette reprise.
+    """
+    ShiftAssignment = apps.get_model('planning', 'ShiftAssignment')
+    Task = apps.get_model('planning', 'Task')
+    WorkedHoursRollup = apps.get_model('planning', 'WorkedHoursRollup')
+
+    bounds = [
+        value for value in ShiftAssignment.objects.aggregate(first=Min('shift__date'), last=Max('shift__date')).values()
+        if value
+    ] + [
+        timezone.localdate(value) for value in Task.objects.filter(actual_hours__isnull=False).aggregate(
+            first=Min('completed_date'), last=Max('completed_date'),
+        ).values() if value
+    ]
+    if not bounds:
+        return
+
+    totals = {}
+    assignments = ShiftAssignment.objects.filter(
+        actual_start_time__isnull=False,
+        actual_end_time__isnull=False,
+    ).exclude(status__in=['cancelled', 'absent']).values_list(
+        'staff_member_id', 'shift__date', 'actual_start_time', 'actual_end_time',
+    )
+    for staff_id, day, start_time, end_time in assignments.iterator():
+        minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+        row = totals.setdefault((staff_id, day), _empty())
+        row['shift_minutes'] += minutes + 24 * 60 if minutes < 0 else minutes
+        row['shift_count'] += 1
+
+    task_start = timezone.make_aware(datetime.combine(min(bounds), time.min))
+    task_end = timezone.make_aware(datetime.combine(max(bounds) + timedelta(days=1), time.min))
+    tasks = Task.objects.filter(
+        actual_hours__isnull=False,
+        completed_date__isnull=False,
+        completed_date__gte=task_start,
+        completed_date__lt=task_end,
+    ).exclude(status='cancelled').values_list('assigned_to_id', 'completed_date', 'actual_hours')
+    for staff_id, completed_date, actual_hours in tasks.iterator():
+        row = totals.setdefault((staff_id, timezone.localdate(completed_date)), _empty())
+        row['task_hours'] += actual_hours
+        row['task_count'] += 1
+
+    WorkedHoursRollup.objects.bulk_create(
+        [WorkedHoursRollup(staff_id=staff_id, day=day, **values) for (staff_id, day), values in totals.items()],
+        batch_size=500,
+    )
+
+
+def _empty():
+    return {'shift_minutes': 0, 'shift_count': 0, 'task_hours': Decimal('0'), 'task_count': 0}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('planning', '0003_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkedHoursRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('shift_minutes', models.PositiveIntegerField(default=0, verbose_name="Minutes d'équipe")),
+                ('shift_count', models.PositiveIntegerField(default=0, verbose_name="Nombre d'équipes")),
+                ('task_hours', models.DecimalField(decimal_places=2, default=0, max_digits=7, verbose_name='Heures de tâches')),
+                ('task_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de tâches')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='worked_hours', to=settings.AUTH_USER_MODEL, verbose_name='Personnel')),
+            ],
+            options={
+                'verbose_name': 'Heures travaillées',
+                'verbose_name_plural': 'Heures travaillées',
+                'indexes': [models.Index(fields=['day'], name='planning_wo_day_f5f457_idx')],
+                'unique_together': {('staff', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+# Figé à la date de la migration (apps.planning.models.PRIORITY_RANKS)
+PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
+
+def backfill_priority_rank(apps, schema_editor):
+    """Rang des lignes existantes : un UPDATE par modèle"""
+    rank = models.Case(
+        *[models.When(priority=priority, then=models.Value(value)) for priority, value in PRIORITY_RANKS.items()],
+        default=models.Value(0),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+    for model_name in ('Event', 'Task'):
+        apps.get_model('planning', model_name).objects.update(priority_rank=rank)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0005_task_due_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-priority_rank', 'due_date'], 'verbose_name': 'Tâche', 'verbose_name_plural': 'Tâches'},
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False, verbose_name='Rang de priorité'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False, verbose_name='Rang de priorité'),
+        ),
+        migrations.RunPython(backfill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'start_datetime'], name='planning_ev_status_fcf9fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['event_type', 'start_datetime'], name='planning_ev_event_t_09635a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-priority_rank', 'due_date'], name='planning_ta_priorit_1aad4d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', '-priority_rank', 'due_date'], name='planning_ta_status_d5b78c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', '-priority_rank', 'due_date'], name='planning_ta_assigne_8f677d_idx'),
+        ),
+    ]
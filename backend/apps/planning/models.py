@@ -5,7 +5,20 @@ from django.conf import settings
 import uuid
 from datetime import datetime, timedelta
 
-class Event(models.Model):
+# Rang des priorités (tri et index) : les libellés restent ceux de l'API
+PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
+class RankedPriorityMixin:
+    """Maintient ``priority_rank`` à chaque enregistrement"""
+    
+    def save(self, *args, **kwargs):
+        self.priority_rank = PRIORITY_RANKS.get(self.priority, 0)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'priority_rank'}
+        super().save(*args, **kwargs)
+
+class Event(RankedPriorityMixin, models.Model):
     """Événements du planning"""
     
     EVENT_TYPES = [
@@ -83,6 +96,7 @@ class Event(models.Model):
     
     # Priorité et statut
     priority = models.CharField(_('Priorité'), max_length=10, choices=PRIORITY_LEVELS, default='medium')
+    priority_rank = models.PositiveSmallIntegerField(_('Rang de priorité'), default=2, editable=False)  # type: ignore[attr-defined]
     status = models.CharField(_('Statut'), max_length=20, choices=STATUS_CHOICES, default='scheduled')
     
     # Récurrence
@@ -138,10 +152,28 @@ class Event(models.Model):
             ('can_manage_all_events', 'Peut gérer tous les événements'),
             ('can_view_all_events', 'Peut voir tous les événements'),
         ]
+        indexes = [
+            # Chargement des intervalles par ressource (apps.planning.conflicts)
+            models.Index(fields=['start_datetime', 'end_datetime']),
+            models.Index(fields=['room', 'start_datetime']),
+            # Synchronisation incrémentale des flux (apps.planning.feeds)
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['room', 'updated_at']),
+            # Listes filtrées (EventListCreateView)
+            models.Index(fields=['status', 'start_datetime']),
+            models.Index(fields=['event_type', 'start_datetime']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.start_datetime.strftime('%d/%m/%Y %H:%M')}"  # type: ignore[attr-defined]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Mémorise la salle et l'organisateur chargés (retraits des flux)"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_feed_owners = (instance.__dict__.get('organizer_id'), instance.__dict__.get('room'))
+        return instance
+    
     def clean(self):
         """Validation personnalisée"""
         from django.core.exceptions import ValidationError
@@ -174,7 +206,7 @@ class Event(models.Model):
         """Vérifie si un utilisateur peut modifier cet événement"""
         if user.role == 'admin':
             return True
-        if user == self.organizer:
+        if self.organizer_id == user.pk:  # type: ignore[attr-defined]
             return True
         if user.has_perm('planning.can_manage_all_events'):
             return True
@@ -284,7 +316,7 @@ class Availability(models.Model):
         if self.end_datetime <= self.start_datetime:
             raise ValidationError(_('La date de fin doit être postérieure à la date de début.'))
 
-class Task(models.Model):
+class Task(RankedPriorityMixin, models.Model):
     """Tâches à accomplir"""
     
     PRIORITY_LEVELS = [
@@ -328,6 +360,7 @@ class Task(models.Model):
     
     # Priorité et statut
     priority = models.CharField(_('Priorité'), max_length=10, choices=PRIORITY_LEVELS, default='medium')
+    priority_rank = models.PositiveSmallIntegerField(_('Rang de priorité'), default=2, editable=False)  # type: ignore[attr-defined]
     status = models.CharField(_('Statut'), max_length=20, choices=STATUS_CHOICES, default='pending')
     
     # Progression
@@ -382,11 +415,26 @@ class Task(models.Model):
     class Meta:
         verbose_name = _('Tâche')
         verbose_name_plural = _('Tâches')
-        ordering = ['-priority', 'due_date']
+        ordering = ['-priority_rank', 'due_date']
+        indexes = [
+            models.Index(fields=['status', 'due_date']),  # Tâches en retard et escalade
+            # Listes de tâches (TaskListCreateView) : filtres puis tri par priorité et échéance
+            models.Index(fields=['-priority_rank', 'due_date']),
+            models.Index(fields=['status', '-priority_rank', 'due_date']),
+            models.Index(fields=['assigned_to', 'status', '-priority_rank', 'due_date']),
+        ]
     
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Mémorise la personne assignée et la date de completion au chargement (agenda et heures de l'ancien assigné)"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_assignee_id = instance.__dict__.get('assigned_to_id')
+        instance._loaded_rollup_key = (instance._loaded_assignee_id, instance.__dict__.get('completed_date'))
+        return instance
+    
     @property
     def is_overdue(self):
         """Vérifie si la tâche est en retard"""
@@ -469,6 +517,13 @@ class Shift(models.Model):
     def __str__(self):
         return f"{self.name} - {self.date} ({self.start_time}-{self.end_time})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Mémorise la date chargée (heures travaillées de l'ancien jour)"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
+    
     @property
     def current_staff_count(self):
         """Nombre actuel de personnel assigné"""
@@ -515,3 +570,85 @@ class ShiftAssignment(models.Model):
     
     def __str__(self):
         return f"{self.staff_member.get_full_name()} - {self.shift.name}"  # type: ignore[attr-defined]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Mémorise la personne et l'équipe chargées (heures travaillées de l'ancien couple)"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rollup_key = (instance.__dict__.get('staff_member_id'), instance.__dict__.get('shift_id'))
+        return instance
+
+class WorkedHoursRollup(models.Model):
+    """Heures travaillées cumulées par personne et par jour (maintenues par apps.planning.timesheets)"""
+    
+    staff = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='worked_hours',
+        verbose_name=_('Personnel')
+    )
+    day = models.DateField(_('Jour'))
+    
+    # Équipes (heures réelles)
+    shift_minutes = models.PositiveIntegerField(_('Minutes d\'équipe'), default=0)  # type: ignore[attr-defined]
+    shift_count = models.PositiveIntegerField(_('Nombre d\'équipes'), default=0)  # type: ignore[attr-defined]
+    
+    # Tâches terminées ce jour
+    task_hours = models.DecimalField(_('Heures de tâches'), max_digits=7, decimal_places=2, default=0)
+    task_count = models.PositiveIntegerField(_('Nombre de tâches'), default=0)  # type: ignore[attr-defined]
+    
+    updated_at = models.DateTimeField(_('Modifié le'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Heures travaillées')
+        verbose_name_plural = _('Heures travaillées')
+        unique_together = ['staff', 'day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.staff_id} - {self.day}"  # type: ignore[attr-defined]
+
+class EventTombstone(models.Model):
+    """Retrait d'un événement d'un flux de calendrier (suppression ou changement de participants)"""
+    
+    event_id = models.UUIDField(_('Événement'))
+    scope = models.CharField(_('Flux'), max_length=150)
+    title = models.CharField(_('Titre'), max_length=200, blank=True)
+    start_datetime = models.DateTimeField(_('Date et heure de début'))
+    end_datetime = models.DateTimeField(_('Date et heure de fin'))
+    deleted_at = models.DateTimeField(_('Retiré le'), auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Retrait d\'événement')
+        verbose_name_plural = _('Retraits d\'événements')
+        indexes = [
+            models.Index(fields=['scope', 'deleted_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} retiré de {self.scope}"
+
+# Flux de calendrier : versions, jetons de synchronisation et retraits
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from . import agenda, feeds, timesheets
+
+post_save.connect(feeds.event_saved, sender=Event, dispatch_uid='planning_feeds_event_saved')
+pre_delete.connect(feeds.event_deleted, sender=Event, dispatch_uid='planning_feeds_event_deleted')
+m2m_changed.connect(feeds.event_staff_changed, sender=Event.staff_members.through, dispatch_uid='planning_feeds_staff_changed')
+
+# Agenda « ma journée » : versions des sources (les événements suivent les flux)
+for signal in (post_save, post_delete):
+    signal.connect(agenda.task_changed, sender=Task, dispatch_uid=f'planning_agenda_task_{signal is post_save}')
+    signal.connect(agenda.shift_assignment_changed, sender=ShiftAssignment, dispatch_uid=f'planning_agenda_assignment_{signal is post_save}')
+    signal.connect(agenda.medical_record_changed, sender='children.MedicalRecord', dispatch_uid=f'planning_agenda_medical_{signal is post_save}')
+    signal.connect(agenda.child_changed, sender='children.Child', dispatch_uid=f'planning_agenda_child_{signal is post_save}')
+post_save.connect(agenda.shift_changed, sender=Shift, dispatch_uid='planning_agenda_shift')
+m2m_changed.connect(agenda.event_children_changed, sender=Event.children.through, dispatch_uid='planning_agenda_event_children')
+
+# Heures travaillées : lignes quotidiennes recalculées pour les couples (personne, jour) touchés
+for signal in (post_save, post_delete):
+    signal.connect(timesheets.assignment_changed, sender=ShiftAssignment, dispatch_uid=f'planning_timesheets_assignment_{signal is post_save}')
+    signal.connect(timesheets.task_changed, sender=Task, dispatch_uid=f'planning_timesheets_task_{signal is post_save}')
+post_save.connect(timesheets.shift_date_changed, sender=Shift, dispatch_uid='planning_timesheets_shift')
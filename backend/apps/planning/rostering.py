@@ -0,0 +1,378 @@
+"""
+Génération automatique des plannings d'équipes (rostering)
+
+Remplit les ``Shift`` d'une période jusqu'à leur ``minimum_staff`` à partir :
+
+- des jours et heures de travail de chaque ``Schedule`` ;
+- des ``Availability`` bloquantes (congés, arrêt maladie, formation...) ;
+- des attributions existantes, conservées ;
+- de contraintes d'équité : repos minimal entre deux équipes, plafond
+  d'heures hebdomadaire, charge répartie au plus juste.
+
+La résolution se fait en deux temps : une affectation gloutonne (les
+équipes les plus difficiles à pourvoir d'abord, le candidat le moins chargé
+à chaque place), puis une recherche locale qui comble les places restantes
+par échange (un membre du personnel déjà pris ailleurs le même jour est
+remplacé sur l'autre équipe) et rééquilibre les heures entre les plus et
+les moins chargés.
+
+``RosterSolver`` travaille sur des structures simples (sans base de
+données) ; ``generate_roster`` charge les données, résout et écrit les
+nouvelles attributions avec ``bulk_create``.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import datetime, timedelta
+import logging
+
+from .agenda import touch_agenda
+
+logger = logging.getLogger(__name__)
+
+BLOCKING_AVAILABILITY_TYPES = ['busy', 'vacation', 'sick_leave', 'training', 'meeting']
+
+def _config():
+    return getattr(settings, 'ROSTERING', {})
+
+def _interval(day, start_time, end_time):
+    """Intervalle daté d'une plage horaire (une fin avant le début passe au lendemain)"""
+    start = datetime.combine(day, start_time)
+    end = datetime.combine(day, end_time)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+class RosterSolver:
+    """Affectation gloutonne puis recherche locale, sur des données en mémoire.
+
+    ``staff`` : ``{staff_id: (jours travaillés, heure de début, heure de fin)}``
+    ``shifts`` : ``[(shift_id, date, heure de début, heure de fin, minimum, maximum, [staff_id déjà affectés])]``
+    ``blocks`` : ``{staff_id: [(début, fin), ...]}`` (datetimes naïfs, heure locale)
+    ``excluded`` : couples ``(shift_id, staff_id)`` à ne jamais proposer (attributions annulées)
+    """
+
+    def __init__(self, staff, shifts, blocks=None, min_rest_hours=None, max_weekly_hours=None,
+                 local_search_iterations=None, excluded=None):
+        config = _config()
+        self.min_rest = timedelta(hours=min_rest_hours if min_rest_hours is not None else config.get('MIN_REST_HOURS', 11))
+        self.max_weekly_hours = max_weekly_hours or config.get('MAX_WEEKLY_HOURS', 48)
+        self.local_search_iterations = (
+            local_search_iterations if local_search_iterations is not None
+            else config.get('LOCAL_SEARCH_ITERATIONS', 2000)
+        )
+
+        self.staff = staff
+        self.blocks = {staff_id: sorted(intervals) for staff_id, intervals in (blocks or {}).items()}
+        self.shifts = {}
+        self.assigned = {}  # shift_id -> set(staff_id)
+        self.fixed = set()  # (shift_id, staff_id) existants, jamais déplacés
+        self.schedule = {staff_id: {} for staff_id in staff}  # staff_id -> {date: [shift_id]}
+        self.hours = dict.fromkeys(staff, 0.0)
+        self.weekly_hours = {staff_id: {} for staff_id in staff}
+
+        for shift_id, day, start_time, end_time, minimum, maximum, existing in shifts:
+            start, end = _interval(day, start_time, end_time)
+            self.shifts[shift_id] = {
+                'date': day,
+                'start': start,
+                'end': end,
+                'hours': (end - start).total_seconds() / 3600,
+                'minimum': minimum,
+                'maximum': maximum,
+            }
+            self.assigned[shift_id] = set()
+            for staff_id in existing:
+                if staff_id in self.staff:
+                    self._assign(shift_id, staff_id)
+                    self.fixed.add((shift_id, staff_id))
+                else:
+                    self.assigned[shift_id].add(staff_id)
+
+        # Candidats statiques : jour travaillé, plage horaire, aucune indisponibilité,
+        # pas d'attribution annulée sur la même équipe (couple unique en base)
+        excluded = excluded or set()
+        self.candidates = {
+            shift_id: [
+                staff_id for staff_id in staff
+                if (shift_id, staff_id) not in excluded and self._is_eligible(staff_id, shift)
+            ]
+            for shift_id, shift in self.shifts.items()
+        }
+        self.candidate_sets = {shift_id: set(candidates) for shift_id, candidates in self.candidates.items()}
+
+    def _is_eligible(self, staff_id, shift):
+        working_days, work_start, work_end = self.staff[staff_id]
+        if shift['date'].weekday() not in working_days:
+            return False
+        window_start, window_end = _interval(shift['date'], work_start, work_end)
+        if shift['start'] < window_start or shift['end'] > window_end:
+            return False
+        for block_start, block_end in self.blocks.get(staff_id, ()):
+            if block_start >= shift['end']:
+                break
+            if block_end > shift['start']:
+                return False
+        return True
+
+    def _week(self, shift):
+        return shift['date'].isocalendar()[:2]
+
+    def _can_take(self, staff_id, shift_id, ignore=None):
+        """Vérifie le repos minimal et le plafond hebdomadaire (``ignore`` : équipe libérée)"""
+        shift = self.shifts[shift_id]
+        if staff_id in self.assigned[shift_id]:
+            return False
+
+        week_hours = self.weekly_hours[staff_id].get(self._week(shift), 0.0)
+        if ignore is not None and self._week(self.shifts[ignore]) == self._week(shift):
+            week_hours -= self.shifts[ignore]['hours']
+        if week_hours + shift['hours'] > self.max_weekly_hours:
+            return False
+
+        days = self.schedule[staff_id]
+        for offset in (-1, 0, 1):
+            for other_id in days.get(shift['date'] + timedelta(days=offset), ()):
+                if other_id == ignore:
+                    continue
+                other = self.shifts[other_id]
+                if shift['start'] < other['end'] + self.min_rest and other['start'] < shift['end'] + self.min_rest:
+                    return False
+        return True
+
+    def _assign(self, shift_id, staff_id):
+        shift = self.shifts[shift_id]
+        self.assigned[shift_id].add(staff_id)
+        self.schedule[staff_id].setdefault(shift['date'], []).append(shift_id)
+        self.hours[staff_id] += shift['hours']
+        week = self._week(shift)
+        self.weekly_hours[staff_id][week] = self.weekly_hours[staff_id].get(week, 0.0) + shift['hours']
+
+    def _unassign(self, shift_id, staff_id):
+        shift = self.shifts[shift_id]
+        self.assigned[shift_id].discard(staff_id)
+        self.schedule[staff_id][shift['date']].remove(shift_id)
+        self.hours[staff_id] -= shift['hours']
+        self.weekly_hours[staff_id][self._week(shift)] -= shift['hours']
+
+    def missing(self, shift_id):
+        return max(self.shifts[shift_id]['minimum'] - len(self.assigned[shift_id]), 0)
+
+    def solve(self):
+        self._greedy()
+        self._repair()
+        self._balance()
+        return self
+
+    def _greedy(self):
+        # Les équipes les plus contraintes (peu de candidats par place) d'abord
+        order = sorted(
+            self.shifts,
+            key=lambda shift_id: (len(self.candidates[shift_id]) / max(self.missing(shift_id), 1), self.shifts[shift_id]['start']),
+        )
+        for shift_id in order:
+            needed = self.missing(shift_id)
+            if not needed:
+                continue
+            available = sorted(
+                (staff_id for staff_id in self.candidates[shift_id] if self._can_take(staff_id, shift_id)),
+                key=self.hours.__getitem__,
+            )
+            for staff_id in available:
+                if not needed:
+                    break
+                # La charge évolue pendant la boucle : revérifier les contraintes
+                if self._can_take(staff_id, shift_id):
+                    self._assign(shift_id, staff_id)
+                    needed -= 1
+
+    def _movable(self, staff_id):
+        """Équipes (non figées) d'un membre du personnel"""
+        for shift_ids in self.schedule[staff_id].values():
+            for shift_id in shift_ids:
+                if (shift_id, staff_id) not in self.fixed:
+                    yield shift_id
+
+    def _repair(self):
+        """Comble les places restantes par échange à un niveau"""
+        for shift_id in sorted(self.shifts, key=lambda shift_id: self.shifts[shift_id]['start']):
+            while self.missing(shift_id):
+                if not self._swap_into(shift_id):
+                    break
+
+    def _swap_into(self, shift_id):
+        shift = self.shifts[shift_id]
+        for staff_id in sorted(self.candidates[shift_id], key=self.hours.__getitem__):
+            if staff_id in self.assigned[shift_id]:
+                continue
+            # Équipes du même jour (ou voisines) qui empêchent l'affectation
+            for other_id in list(self._movable(staff_id)):
+                if abs((self.shifts[other_id]['date'] - shift['date']).days) > 1:
+                    continue
+                if not self._can_take(staff_id, shift_id, ignore=other_id):
+                    continue
+                replacement = next((
+                    candidate for candidate in sorted(self.candidates[other_id], key=self.hours.__getitem__)
+                    if candidate != staff_id and self._can_take(candidate, other_id)
+                ), None)
+                if replacement is None:
+                    continue
+                self._unassign(other_id, staff_id)
+                self._assign(other_id, replacement)
+                self._assign(shift_id, staff_id)
+                return True
+        return False
+
+    def _balance(self):
+        """Transfère des équipes des plus chargés vers les moins chargés"""
+        if not self.hours:
+            return
+        for _ in range(self.local_search_iterations):
+            ranked = sorted(self.hours, key=self.hours.__getitem__)
+            improved = False
+            for busiest in reversed(ranked[-10:]):
+                for shift_id in list(self._movable(busiest)):
+                    hours = self.shifts[shift_id]['hours']
+                    for idlest in ranked[:20]:
+                        # Un transfert n'est utile que s'il réduit l'écart
+                        if self.hours[idlest] + hours >= self.hours[busiest]:
+                            break
+                        if idlest in self.candidate_sets[shift_id] and self._can_take(idlest, shift_id):
+                            self._unassign(shift_id, busiest)
+                            self._assign(shift_id, idlest)
+                            improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if not improved:
+                break
+
+    def new_assignments(self):
+        """Couples (shift_id, staff_id) créés par la résolution"""
+        return [
+            (shift_id, staff_id)
+            for shift_id, staff_ids in self.assigned.items()
+            for staff_id in staff_ids
+            if (shift_id, staff_id) not in self.fixed and staff_id in self.staff
+        ]
+
+    def unfilled(self):
+        """Places non pourvues par équipe"""
+        return [
+            {
+                'shift_id': shift_id,
+                'date': self.shifts[shift_id]['date'],
+                'start': self.shifts[shift_id]['start'],
+                'end': self.shifts[shift_id]['end'],
+                'missing': self.missing(shift_id),
+                'candidates': len(self.candidates[shift_id]),
+            }
+            for shift_id in sorted(self.shifts, key=lambda shift_id: self.shifts[shift_id]['start'])
+            if self.missing(shift_id)
+        ]
+
+    def statistics(self):
+        loads = [hours for hours in self.hours.values() if hours]
+        mean = sum(loads) / len(loads) if loads else 0.0
+        return {
+            'shifts': len(self.shifts),
+            'assignments': len(self.new_assignments()),
+            'unfilled_slots': sum(self.missing(shift_id) for shift_id in self.shifts),
+            'staff_assigned': len(loads),
+            'min_hours': min(loads, default=0.0),
+            'max_hours': max(loads, default=0.0),
+            'mean_hours': round(mean, 2),
+            'stdev_hours': round((sum((hours - mean) ** 2 for hours in loads) / len(loads)) ** 0.5, 2) if loads else 0.0,
+        }
+
+def load_problem(start_date, end_date, staff_ids=None):
+    """Charge équipes, plannings, indisponibilités et attributions de la période (4 requêtes)
+
+    Les attributions annulées ne comptent pas dans l'effectif mais occupent
+    le couple (équipe, personne) : elles sont retournées à part (``excluded``).
+    """
+    from .models import Availability, Schedule, Shift, ShiftAssignment
+
+    schedules = Schedule.objects.filter(user__is_active=True)  # type: ignore[attr-defined]
+    if staff_ids is not None:
+        schedules = schedules.filter(user_id__in=staff_ids)
+    else:
+        schedules = schedules.filter(user__role__in=_config().get('ROLES', ['soignant', 'medecin', 'assistant_social', 'logisticien']))
+
+    staff = {}
+    for schedule in schedules.only(
+        'user_id', 'work_start_time', 'work_end_time',
+        'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+    ):
+        staff[schedule.user_id] = (set(schedule.working_days), schedule.work_start_time, schedule.work_end_time)
+
+    shifts = list(Shift.objects.filter(date__gte=start_date, date__lte=end_date).values_list(  # type: ignore[attr-defined]
+        'id', 'date', 'start_time', 'end_time', 'minimum_staff', 'maximum_staff'
+    ))
+    existing = {}
+    excluded = set()
+    for shift_id, staff_id, status in ShiftAssignment.objects.filter(  # type: ignore[attr-defined]
+        shift__date__gte=start_date, shift__date__lte=end_date,
+    ).values_list('shift_id', 'staff_member_id', 'status'):
+        if status == 'cancelled':
+            excluded.add((shift_id, staff_id))
+        else:
+            existing.setdefault(shift_id, []).append(staff_id)
+
+    period_start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    period_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=2), datetime.min.time()))
+    blocks = {}
+    for staff_id, start, end in Availability.objects.filter(  # type: ignore[attr-defined]
+        user_id__in=list(staff),
+        availability_type__in=BLOCKING_AVAILABILITY_TYPES,
+        start_datetime__lt=period_end,
+        end_datetime__gt=period_start,
+    ).values_list('user_id', 'start_datetime', 'end_datetime'):
+        blocks.setdefault(staff_id, []).append((
+            timezone.localtime(start).replace(tzinfo=None),
+            timezone.localtime(end).replace(tzinfo=None),
+        ))
+
+    return staff, [shift + (existing.get(shift[0], []),) for shift in shifts], blocks, excluded
+
+def generate_roster(start_date, end_date, staff_ids=None, commit=True):
+    """Complète les équipes de la période et retourne le rapport de résolution"""
+    from .models import ShiftAssignment
+
+    staff, shifts, blocks, excluded = load_problem(start_date, end_date, staff_ids)
+    solver = RosterSolver(staff, shifts, blocks, excluded=excluded).solve()
+    assignments = solver.new_assignments()
+
+    if commit and assignments:
+        with transaction.atomic():
+            rows = ShiftAssignment.objects.bulk_create([  # type: ignore[attr-defined]
+                ShiftAssignment(shift_id=shift_id, staff_member_id=staff_id, status='assigned')
+                for shift_id, staff_id in assignments
+            ], batch_size=1000, ignore_conflicts=True)
+            # ignore_conflicts écarte sans erreur les couples créés entre-temps :
+            # le rapport ne reprend que les lignes réellement écrites (UUID générés ici)
+            written = set(ShiftAssignment.objects.filter(  # type: ignore[attr-defined]
+                id__in=[row.id for row in rows],
+            ).values_list('shift_id', 'staff_member_id'))
+            if len(written) < len(assignments):
+                logger.warning(
+                    f"Planning du {start_date} au {end_date}: {len(assignments) - len(written)} "
+                    f"attributions déjà présentes en base, ignorées"
+                )
+            assignments = [pair for pair in assignments if pair in written]
+            # bulk_create n'émet pas de signaux : agendas des personnes affectées
+            touch_agenda('shifts', [staff_id for _, staff_id in assignments])
+
+    statistics = solver.statistics()
+    statistics['assignments'] = len(assignments)
+    logger.info(
+        f"Planning généré du {start_date} au {end_date}: {statistics['assignments']} attributions, "
+        f"{statistics['unfilled_slots']} places non pourvues"
+    )
+    return {
+        'assignments': [{'shift_id': shift_id, 'staff_id': staff_id} for shift_id, staff_id in assignments],
+        'unfilled': solver.unfilled(),
+        'statistics': statistics,
+    }
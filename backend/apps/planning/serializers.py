@@ -1,6 +1,119 @@
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from rest_framework.relations import MANY_RELATION_KWARGS
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils.translation import gettext_lazy as _
 from .models import Event, Schedule, Availability, Task, Shift, ShiftAssignment
+from .bulk import create_events
+from .conflicts import INACTIVE_STATUSES, find_conflicts, format_conflicts, make_candidate
+
+# Champs d'un événement qui modifient ses réservations
+BOOKING_FIELDS = ('start_datetime', 'end_datetime', 'room', 'staff_members', 'children', 'status')
+
+# Relations multiples résolues en bloc (participants)
+PARTICIPANT_FIELDS = ('children', 'staff_members')
+
+class BookingConflict(APIException):
+    """Conflits de réservation (400), même corps que ``add_event_participants``
+
+    ``ValidationError`` convertirait chaque valeur en chaîne (``None``,
+    indices de lot) : le détail est transmis tel quel.
+    """
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _('Conflits de réservation.')
+    default_code = 'booking_conflict'
+
+    def __init__(self, conflicts):
+        self.detail = {'error': self.default_detail, 'conflicts': format_conflicts(conflicts)}
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Liste de clés primaires résolue en une requête, partagée par tout un lot"""
+
+    def _cache(self):
+        # La racine est l'EventListSerializer en lot, le serializer lui-même sinon
+        caches = self.root.__dict__.setdefault('_related_cache', {})
+        return caches.setdefault(self.field_name, {})
+
+    def _key(self, value):
+        try:
+            return str(self.child_relation.get_queryset().model._meta.pk.to_python(value))
+        except (TypeError, ValueError, DjangoValidationError):
+            self.child_relation.fail('incorrect_type', data_type=type(value).__name__)
+
+    def prefetch(self, values):
+        """Charge en une requête les objets pas encore connus"""
+        cache = self._cache()
+        keys = set()
+        for value in values:
+            try:
+                keys.add(self._key(value))
+            except serializers.ValidationError:
+                continue
+        missing = keys - cache.keys()
+        if missing:
+            cache.update((str(obj.pk), obj) for obj in self.child_relation.get_queryset().filter(pk__in=missing))
+        return cache
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        keys = [self._key(value) for value in data]
+        cache = self.prefetch(keys)
+        for key in keys:
+            if key not in cache:
+                self.child_relation.fail('does_not_exist', pk_value=key)
+        return [cache[key] for key in keys]
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Clé primaire ; en ``many=True``, résolution en bloc (``BulkManyRelatedField``)"""
+
+    def to_internal_value(self, data):
+        # Même clé d'un élément à l'autre d'un lot (organisateur) : une seule requête
+        cache = self.root.__dict__.setdefault('_related_cache', {}).setdefault(self.field_name, {})
+        key = str(data)
+        if key not in cache:
+            cache[key] = super().to_internal_value(data)
+        return cache[key]
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+class EventListSerializer(serializers.ListSerializer):
+    """Import d'événements par lot : participants résolus et conflits vérifiés en une seule passe"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for name in PARTICIPANT_FIELDS:
+                values = [
+                    value
+                    for item in data if isinstance(item, dict) and isinstance(item.get(name), list)
+                    for value in item[name]
+                ]
+                if values:
+                    self.child.fields[name].prefetch(values)
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        candidates = [
+            self.child.conflict_candidate(item, key=index)
+            for index, item in enumerate(attrs)
+            if not item.pop('ignore_conflicts', False)
+        ]
+        conflicts = find_conflicts(candidate for candidate in candidates if candidate is not None)
+        if conflicts:
+            raise BookingConflict(conflicts)
+        return attrs
+
+    def create(self, validated_data):
+        """Création en lot : trois insertions, quel que soit le nombre de participants"""
+        return create_events(validated_data, self.context['request'].user)
 
 class EventSerializer(serializers.ModelSerializer):
     """Serializer pour les événements"""
@@ -10,28 +123,84 @@ class EventSerializer(serializers.ModelSerializer):
     duration = serializers.ReadOnlyField()
     is_past = serializers.ReadOnlyField()
     is_today = serializers.ReadOnlyField()
+    ignore_conflicts = serializers.BooleanField(write_only=True, required=False, default=False)
+    serializer_related_field = BulkPrimaryKeyRelatedField
     
     class Meta:
         model = Event
         fields = '__all__'
         read_only_fields = ('id', 'created_at', 'updated_at', 'created_by')
+        list_serializer_class = EventListSerializer
+    
+    def _current(self, attrs, field, default=None):
+        """Valeur soumise, sinon celle de l'événement modifié"""
+        if field in attrs:
+            return attrs[field]
+        return getattr(self.instance, field, default) if self.instance is not None else default
     
     def validate(self, attrs):
         """Validation globale"""
-        if attrs['end_datetime'] <= attrs['start_datetime']:
+        if self._current(attrs, 'end_datetime') <= self._current(attrs, 'start_datetime'):
             raise serializers.ValidationError(_("La date de fin doit être postérieure à la date de début."))
         
-        if attrs['recurrence_type'] != 'none' and not attrs.get('recurrence_end_date'):
+        if self._current(attrs, 'recurrence_type', 'none') != 'none' and not self._current(attrs, 'recurrence_end_date'):
             raise serializers.ValidationError(_("Une date de fin de récurrence est requise."))
         
+        # En lot, les conflits sont vérifiés ensemble par EventListSerializer
+        if not isinstance(self.parent, serializers.ListSerializer):
+            candidate = None
+            booking_changed = self.instance is None or any(field in attrs for field in BOOKING_FIELDS)
+            if not attrs.pop('ignore_conflicts', False) and booking_changed:
+                candidate = self.conflict_candidate(attrs)
+            conflicts = find_conflicts([candidate] if candidate is not None else [])
+            if conflicts:
+                raise BookingConflict(conflicts)
+        
         return attrs
     
+    def conflict_candidate(self, attrs, key=None):
+        """Réservation décrite par les données validées (None si l'événement est inactif)"""
+        if self._current(attrs, 'status', 'scheduled') in INACTIVE_STATUSES:
+            return None
+        
+        instance = self.instance if not isinstance(self.parent, serializers.ListSerializer) else None
+        staff = attrs.get('staff_members')
+        children = attrs.get('children')
+        if instance is not None:
+            if staff is None:
+                staff = instance.staff_members.values_list('pk', flat=True)
+            if children is None:
+                children = instance.children.values_list('pk', flat=True)
+        
+        return make_candidate(
+            key if key is not None else (instance.pk if instance is not None else None),
+            self._current(attrs, 'start_datetime'),
+            self._current(attrs, 'end_datetime'),
+            room=self._current(attrs, 'room', ''),
+            staff=staff,
+            children=children,
+            event_id=instance.pk if instance is not None else None,
+        )
+    
     def create(self, validated_data):
         """Création avec l'organisateur"""
         validated_data['organizer'] = self.context['request'].user
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
 
+class EventParticipantsSerializer(serializers.Serializer):
+    """Ajout d'enfants et de personnel à plusieurs événements"""
+    events = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+    children = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+    staff_members = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+    ignore_conflicts = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, attrs):
+        """Validation globale"""
+        if not attrs['children'] and not attrs['staff_members']:
+            raise serializers.ValidationError(_("Au moins un enfant ou un membre du personnel est requis."))
+        return attrs
+
 class ScheduleSerializer(serializers.ModelSerializer):
     """Serializer pour les plannings"""
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
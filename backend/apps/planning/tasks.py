@@ -6,11 +6,15 @@ from django.conf import settings
 import logging
 
 from .models import Event
+from .feeds import purge_tombstones
+from .escalation import escalate_new_overdue
 from apps.notifications.models import Notification
+from apps.core.locks import single_flight
 
 logger = logging.getLogger(__name__)
 
 @shared_task
+@single_flight(ttl=600)
 def send_appointment_reminders():
     """Envoie des rappels pour les événements à venir"""
     
@@ -59,3 +63,20 @@ def send_appointment_reminders():
     
     logger.info(f"Rappels d'événements envoyés: {sent_count} notifications")
     return f"Rappels envoyés: {sent_count} notifications"
+
+@shared_task
+@single_flight(ttl=600)
+def purge_event_tombstones():
+    """Purge les retraits d'événements au-delà de la rétention des flux"""
+    deleted = purge_tombstones()
+    logger.info(f"Retraits d'événements purgés: {deleted}")
+    return deleted
+
+@shared_task
+@single_flight(ttl=600)
+def escalate_overdue_tasks():
+    """Notifie et monte la priorité des tâches nouvellement en retard"""
+    result = escalate_new_overdue()
+    if result['escalated']:
+        logger.info(f"Tâches en retard escaladées: {result['escalated']}")
+    return result
@@ -0,0 +1,272 @@
+"""
+Comptabilité des heures travaillées
+
+Une ligne ``WorkedHoursRollup`` par membre du personnel et par jour cumule :
+
+- les heures réelles des équipes (``ShiftAssignment.actual_start_time`` et
+  ``actual_end_time``, une fin avant le début passant au lendemain), au jour
+  de l'équipe ;
+- les ``Task.actual_hours`` des tâches non annulées, au jour (local) de leur
+  ``completed_date``.
+
+Les lignes sont recalculées pour les seuls couples (personne, jour) touchés
+à chaque enregistrement ou suppression d'une attribution, d'une équipe ou
+d'une tâche (récepteurs branchés dans ``models.py``). Les totaux par semaine
+ou par mois et les exports CSV ne lisent que ces lignes, jamais l'historique
+des attributions.
+
+Les heures supplémentaires comparent les heures d'équipes aux heures prévues
+par le ``Schedule`` de la personne (jours travaillés × amplitude moins la
+pause déjeuner) ; les heures de tâches, souvent effectuées pendant les
+équipes, sont rapportées à part.
+"""
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+def _config():
+    return getattr(settings, 'TIME_ACCOUNTING', {})
+
+def worked_minutes(start_time, end_time) -> int:
+    """Durée en minutes entre deux heures, une fin avant le début passant au lendemain"""
+    minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+    return minutes + MINUTES_PER_DAY if minutes < 0 else minutes
+
+# Calcul des lignes
+
+def collect_rollups(assignments, tasks):
+    """Totaux ``{(staff_id, jour): {...}}`` depuis des lignes d'attributions et de tâches
+
+    ``assignments`` : ``(staff_id, jour, début réel, fin réelle)`` ;
+    ``tasks`` : ``(staff_id, completed_date, actual_hours)``.
+    """
+    totals = {}
+    for staff_id, day, start_time, end_time in assignments:
+        row = totals.setdefault((staff_id, day), _empty())
+        row['shift_minutes'] += worked_minutes(start_time, end_time)
+        row['shift_count'] += 1
+    for staff_id, completed_date, actual_hours in tasks:
+        row = totals.setdefault((staff_id, timezone.localdate(completed_date)), _empty())
+        row['task_hours'] += actual_hours
+        row['task_count'] += 1
+    return totals
+
+def _empty():
+    return {'shift_minutes': 0, 'shift_count': 0, 'task_hours': Decimal('0'), 'task_count': 0}
+
+def _assignment_rows(assignment_model, **filters):
+    return assignment_model.objects.filter(
+        actual_start_time__isnull=False,
+        actual_end_time__isnull=False,
+        **filters,
+    ).exclude(status__in=['cancelled', 'absent']).values_list(
+        'staff_member_id', 'shift__date', 'actual_start_time', 'actual_end_time',
+    )
+
+def _task_rows(task_model, **filters):
+    return task_model.objects.filter(
+        actual_hours__isnull=False,
+        completed_date__isnull=False,
+        **filters,
+    ).exclude(status='cancelled').values_list('assigned_to_id', 'completed_date', 'actual_hours')
+
+def _day_bounds(first_day, last_day):
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    return start, end
+
+def _write(rollup_model, totals):
+    rows = [rollup_model(staff_id=staff_id, day=day, **values) for (staff_id, day), values in totals.items()]
+    rollup_model.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['staff', 'day'],
+        update_fields=['shift_minutes', 'shift_count', 'task_hours', 'task_count', 'updated_at'],
+    )
+
+def refresh_rollups(keys):
+    """Recalcule les lignes des couples ``(staff_id, jour)`` donnés (quatre requêtes au plus)"""
+    from .models import ShiftAssignment, Task, WorkedHoursRollup
+
+    keys = {(staff_id, day) for staff_id, day in keys if staff_id and day}
+    if not keys:
+        return
+    staff_ids = {staff_id for staff_id, _ in keys}
+    days = {day for _, day in keys}
+    task_start, task_end = _day_bounds(min(days), max(days))
+
+    totals = collect_rollups(
+        _assignment_rows(ShiftAssignment, staff_member_id__in=staff_ids, shift__date__in=days),
+        _task_rows(Task, assigned_to_id__in=staff_ids, completed_date__gte=task_start, completed_date__lt=task_end),
+    )
+    totals = {key: values for key, values in totals.items() if key in keys}
+
+    empty = Q()
+    for staff_id, day in keys - totals.keys():
+        empty |= Q(staff_id=staff_id, day=day)
+    if empty:
+        WorkedHoursRollup.objects.filter(empty).delete()  # type: ignore[attr-defined]
+    if totals:
+        _write(WorkedHoursRollup, totals)
+
+def rebuild_rollups(start_date, end_date):
+    """Reconstruit toutes les lignes d'une période (reprise de l'historique)"""
+    from .models import ShiftAssignment, Task, WorkedHoursRollup
+
+    task_start, task_end = _day_bounds(start_date, end_date)
+    totals = collect_rollups(
+        _assignment_rows(ShiftAssignment, shift__date__gte=start_date, shift__date__lte=end_date).iterator(),
+        _task_rows(Task, completed_date__gte=task_start, completed_date__lt=task_end).iterator(),
+    )
+    WorkedHoursRollup.objects.filter(day__gte=start_date, day__lte=end_date).delete()  # type: ignore[attr-defined]
+    _write(WorkedHoursRollup, totals)
+    return len(totals)
+
+# Récepteurs de signaux (branchés dans models.py)
+
+def _staff_deleted(origin) -> bool:
+    """Suppression en cascade depuis un utilisateur : ses lignes disparaissent avec lui"""
+    from django.contrib.auth import get_user_model
+
+    model = getattr(origin, 'model', type(origin))
+    return model is get_user_model()
+
+def assignment_changed(sender, instance, **kwargs):
+    from .models import Shift
+
+    if _staff_deleted(kwargs.get('origin')):
+        return
+    keys = {(instance.staff_member_id, instance.shift.date)}
+    loaded_staff_id, loaded_shift_id = getattr(instance, '_loaded_rollup_key', (None, None))
+    if loaded_shift_id and loaded_shift_id != instance.shift_id:
+        loaded_day = Shift.objects.filter(pk=loaded_shift_id).values_list('date', flat=True).first()  # type: ignore[attr-defined]
+        keys.add((loaded_staff_id, loaded_day))
+    elif loaded_staff_id:
+        keys.add((loaded_staff_id, instance.shift.date))
+    refresh_rollups(keys)
+    instance._loaded_rollup_key = (instance.staff_member_id, instance.shift_id)
+
+def shift_date_changed(sender, instance, created=False, **kwargs):
+    from .models import ShiftAssignment
+
+    loaded_date = getattr(instance, '_loaded_date', None)
+    if not created and loaded_date and loaded_date != instance.date:
+        staff_ids = ShiftAssignment.objects.filter(shift=instance).values_list('staff_member_id', flat=True)  # type: ignore[attr-defined]
+        refresh_rollups({(staff_id, day) for staff_id in staff_ids for day in (loaded_date, instance.date)})
+    instance._loaded_date = instance.date
+
+def task_changed(sender, instance, **kwargs):
+    if _staff_deleted(kwargs.get('origin')):
+        return
+    keys = set()
+    for staff_id, completed_date in (
+        (instance.assigned_to_id, instance.completed_date),
+        getattr(instance, '_loaded_rollup_key', (None, None)),
+    ):
+        if staff_id and completed_date:
+            keys.add((staff_id, timezone.localdate(completed_date)))
+    refresh_rollups(keys)
+    instance._loaded_rollup_key = (instance.assigned_to_id, instance.completed_date)
+
+# Totaux et heures supplémentaires
+
+def contracted_daily_hours(schedule) -> Decimal:
+    """Heures prévues par jour travaillé d'un ``Schedule`` (amplitude moins la pause)"""
+    minutes = worked_minutes(schedule.work_start_time, schedule.work_end_time) - schedule.lunch_break_duration
+    return Decimal(max(minutes, 0)) / 60
+
+def _expected_hours(working_days, daily_hours, first_day, last_day):
+    working = sum(
+        1 for offset in range((last_day - first_day).days + 1)
+        if (first_day + timedelta(days=offset)).weekday() in working_days
+    )
+    return daily_hours * working
+
+def _period_end(period, period_start):
+    if period == 'day':
+        return period_start
+    if period == 'week':
+        return period_start + timedelta(days=6)
+    next_month = (period_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+def worked_hours_totals(start_date, end_date, period='week', staff_ids=None):
+    """Totaux par personne et par période (``day``, ``week`` ou ``month``) avec heures supplémentaires"""
+    from .models import Schedule, WorkedHoursRollup
+
+    rollups = WorkedHoursRollup.objects.filter(day__gte=start_date, day__lte=end_date)  # type: ignore[attr-defined]
+    if staff_ids is not None:
+        rollups = rollups.filter(staff_id__in=staff_ids)
+    if period == 'week':
+        rollups = rollups.annotate(period=TruncWeek('day'))
+    elif period == 'month':
+        rollups = rollups.annotate(period=TruncMonth('day'))
+    else:
+        rollups = rollups.annotate(period=F('day'))
+    rows = rollups.order_by('staff__last_name', 'staff__first_name', 'staff_id', 'period').values(
+        'staff_id', 'staff__first_name', 'staff__last_name', 'period',
+    ).annotate(
+        shift_minutes_total=Sum('shift_minutes'),
+        task_hours_total=Sum('task_hours'),
+        shift_count_total=Sum('shift_count'),
+        task_count_total=Sum('task_count'),
+        days_worked=Count('id', filter=Q(shift_minutes__gt=0)),
+    )
+
+    config = _config()
+    default_days = set(config.get('DEFAULT_WORKING_DAYS', [0, 1, 2, 3, 4]))
+    default_hours = Decimal(str(config.get('DEFAULT_DAILY_HOURS', 8)))
+    schedules = {}
+    if rows:
+        for schedule in Schedule.objects.filter(user_id__in={row['staff_id'] for row in rows}):  # type: ignore[attr-defined]
+            schedules[schedule.user_id] = (set(schedule.working_days), contracted_daily_hours(schedule))
+
+    for row in rows:
+        period_start = row['period']
+        if isinstance(period_start, datetime):
+            period_start = period_start.date()
+        first_day = max(period_start, start_date)
+        last_day = min(_period_end(period, period_start), end_date)
+        working_days, daily_hours = schedules.get(row['staff_id'], (default_days, default_hours))
+        worked = (Decimal(row['shift_minutes_total']) / 60).quantize(Decimal('0.01'))
+        expected = _expected_hours(working_days, daily_hours, first_day, last_day).quantize(Decimal('0.01'))
+        yield {
+            'staff_id': str(row['staff_id']),
+            'staff_name': f"{row['staff__first_name']} {row['staff__last_name']}".strip(),
+            'period_start': first_day.isoformat(),
+            'period_end': last_day.isoformat(),
+            'shift_hours': worked,
+            'shift_count': row['shift_count_total'],
+            'task_hours': row['task_hours_total'].quantize(Decimal('0.01')),
+            'task_count': row['task_count_total'],
+            'days_worked': row['days_worked'],
+            'expected_hours': expected,
+            'overtime_hours': max(worked - expected, Decimal('0.00')),
+        }
+
+CSV_COLUMNS = [
+    'staff_id', 'staff_name', 'period_start', 'period_end', 'shift_hours', 'shift_count',
+    'task_hours', 'task_count', 'days_worked', 'expected_hours', 'overtime_hours',
+]
+
+class _Echo:
+    """Tampon minimal : ``csv.writer`` écrit, la ligne est rendue telle quelle"""
+    def write(self, value):
+        return value
+
+def stream_csv(totals):
+    """Lignes CSV (en-tête compris) produites au fil de l'itération des totaux"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in totals:
+        yield writer.writerow([row[column] for column in CSV_COLUMNS])
@@ -9,6 +9,14 @@ urlpatterns = [
     path('events/', views.EventListCreateView.as_view(), name='event-list-create'),
     path('events/<uuid:pk>/', views.EventDetailView.as_view(), name='event-detail'),
     path('events/calendar/', views.calendar_events, name='calendar-events'),
+    path('events/batch/', views.create_events_batch, name='event-batch-create'),
+    path('events/participants/', views.add_event_participants, name='event-participants'),
+    path('events/free-slots/', views.free_slots, name='event-free-slots'),
+    
+    # Calendar feeds
+    path('feeds/', views.calendar_feed_links, name='calendar-feed-links'),
+    path('feeds/changes/', views.calendar_feed_changes, name='calendar-feed-changes'),
+    path('feeds/<str:scope_type>/<str:value>.ics', views.calendar_feed_ics, name='calendar-feed-ics'),
     
     # Tasks
     path('tasks/', views.TaskListCreateView.as_view(), name='task-list-create'),
@@ -16,6 +24,12 @@ urlpatterns = [
     
     # Shifts
     path('shifts/', views.ShiftListCreateView.as_view(), name='shift-list-create'),
+    path('shifts/roster/', views.generate_shift_roster, name='shift-roster'),
+    path('shifts/coverage/', views.staffing_coverage, name='shift-coverage'),
+    path('shifts/worked-hours/', views.worked_hours, name='shift-worked-hours'),
+    
+    # Agenda
+    path('agenda/', views.my_day, name='my-day'),
     
     # Statistics
     path('statistics/', views.planning_statistics, name='planning-statistics'),
@@ -1,29 +1,58 @@
 from rest_framework import generics, permissions, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import ParseError, PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q, Count
+from django.http import HttpResponse, HttpResponseNotModified, Http404, StreamingHttpResponse
+from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import datetime, timedelta
 import logging
+import uuid
 
 from .models import Event, Schedule, Availability, Task, Shift
 from .serializers import (
-    EventSerializer, ScheduleSerializer, AvailabilitySerializer,
+    EventSerializer, EventParticipantsSerializer, ScheduleSerializer, AvailabilitySerializer,
     TaskSerializer, ShiftSerializer
 )
 from apps.core.permissions import HasRolePermission
 from apps.core.pagination import StandardResultsSetPagination
+from .rostering import generate_roster
+from .bulk import ParticipantsError, add_participants
+from .conflicts import format_conflicts
+from .free_slots import find_free_slots
+from . import feeds
+from .agenda import get_agenda
+from .coverage import compute_coverage
+from .timesheets import stream_csv, worked_hours_totals
 
 logger = logging.getLogger(__name__)
 
+def _parse_uuids(values):
+    """Convertit une liste d'identifiants en UUID (``ValueError`` si invalide)"""
+    if not isinstance(values, (list, tuple)):
+        raise ValueError(values)
+    return [uuid.UUID(str(value)) for value in values]
+
+class PriorityOrderingFilter(filters.OrderingFilter):
+    """Tri ``priority`` de l'API appliqué au rang entier (faible < moyenne < élevée < urgente)"""
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [f"{term[:-len('priority')]}priority_rank" if term.lstrip('-') == 'priority' else term for term in ordering]
+
 class EventListCreateView(generics.ListCreateAPIView):
     """Vue pour lister et créer des événements"""
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, PriorityOrderingFilter]
     filterset_fields = ['event_type', 'status', 'priority']
     search_fields = ['title', 'description']
     ordering_fields = ['start_datetime', 'priority']
@@ -63,11 +92,11 @@ class TaskListCreateView(generics.ListCreateAPIView):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, PriorityOrderingFilter]
     filterset_fields = ['status', 'priority', 'assigned_to']
     search_fields = ['title', 'description']
     ordering_fields = ['due_date', 'priority', 'created_at']
-    ordering = ['-priority', 'due_date']
+    ordering = ['-priority_rank', 'due_date']
     pagination_class = StandardResultsSetPagination
     
     def get_queryset(self):
@@ -101,6 +130,274 @@ class ShiftListCreateView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated(), HasRolePermission(['admin', 'assistant_social'])]
         return [permissions.IsAuthenticated()]
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def generate_shift_roster(request):
+    """Complète automatiquement les équipes d'une période"""
+    if request.user.role not in ['admin', 'assistant_social']:
+        raise PermissionDenied(_("Vous n'avez pas les permissions pour générer le planning."))
+
+    try:
+        start_date = datetime.fromisoformat(str(request.data['start_date'])).date()
+        end_date = datetime.fromisoformat(str(request.data['end_date'])).date()
+    except KeyError:
+        return Response(
+            {'error': _('Dates de début et fin requises.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError:
+        return Response(
+            {'error': _('Format de date invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if end_date < start_date or (end_date - start_date).days >= settings.ROSTERING.get('MAX_DAYS', 62):
+        return Response(
+            {'error': _('Période de planification invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    staff_ids = request.data.get('staff')
+    if staff_ids is not None:
+        try:
+            staff_ids = _parse_uuids(staff_ids)
+        except ValueError:
+            return Response(
+                {'error': _('Liste de personnel invalide.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    dry_run = str(request.data.get('dry_run', False)).lower() in ('1', 'true')
+    report = generate_roster(start_date, end_date, staff_ids=staff_ids, commit=not dry_run)
+    report['dry_run'] = dry_run
+
+    return Response(report, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def staffing_coverage(request):
+    """Couverture en personnel par tranches de 15 minutes (effectif et besoin)"""
+    if request.user.role not in ['admin', 'assistant_social']:
+        raise PermissionDenied(_("Vous n'avez pas accès à la couverture en personnel."))
+    
+    try:
+        start_date = datetime.fromisoformat(request.GET['start_date']).date()
+        end_date = datetime.fromisoformat(request.GET['end_date']).date()
+    except KeyError:
+        return Response(
+            {'error': _('Dates de début et fin requises.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError:
+        return Response(
+            {'error': _('Format de date invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if end_date < start_date or (end_date - start_date).days >= settings.COVERAGE.get('MAX_DAYS', 62):
+        return Response(
+            {'error': _('Période invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(compute_coverage(start_date, end_date))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def worked_hours(request):
+    """Heures travaillées par période (jour, semaine, mois) avec heures supplémentaires, en JSON ou CSV"""
+    try:
+        start_date = datetime.fromisoformat(request.GET['start_date']).date()
+        end_date = datetime.fromisoformat(request.GET['end_date']).date()
+    except KeyError:
+        return Response(
+            {'error': _('Dates de début et fin requises.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError:
+        return Response(
+            {'error': _('Format de date invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    period = request.GET.get('period', 'week')
+    if period not in ['day', 'week', 'month']:
+        return Response(
+            {'error': _('Période de regroupement invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if end_date < start_date or (end_date - start_date).days >= settings.TIME_ACCOUNTING.get('MAX_DAYS', 366):
+        return Response(
+            {'error': _('Période invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Le personnel ne voit que ses propres heures
+    if request.user.role in ['admin', 'assistant_social']:
+        try:
+            staff_ids = _id_list(request, 'staff') or None
+        except ValueError:
+            return Response(
+                {'error': _('Identifiants de personnel invalides.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    else:
+        staff_ids = [request.user.pk]
+    
+    totals = worked_hours_totals(start_date, end_date, period, staff_ids)
+    if request.GET.get('export') == 'csv':
+        response = StreamingHttpResponse(stream_csv(totals), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = (
+            f'attachment; filename="heures_{start_date.isoformat()}_{end_date.isoformat()}.csv"'
+        )
+        return response
+    
+    return Response({
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'period': period,
+        'results': list(totals),
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def my_day(request):
+    """Agenda du jour : événements, tâches, équipes et suivis médicaux"""
+    try:
+        day = datetime.fromisoformat(request.GET['date']).date() if request.GET.get('date') else None
+    except ValueError:
+        return Response(
+            {'error': _('Format de date invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(get_agenda(request.user, day))
+
+def _id_list(request, name):
+    """Identifiants passés en paramètres répétés ou séparés par des virgules (``ValueError`` si invalide)"""
+    return _parse_uuids([value.strip() for values in request.GET.getlist(name) for value in values.split(',') if value.strip()])
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_events_batch(request):
+    """Crée plusieurs événements et leurs participants en une transaction"""
+    if not isinstance(request.data, list) or not request.data:
+        return Response(
+            {'error': _('Une liste d\'événements est requise.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(request.data) > settings.EVENT_BATCH.get('MAX_EVENTS', 100):
+        return Response(
+            {'error': _('Trop d\'événements dans le lot.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = EventSerializer(data=request.data, many=True, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        events = serializer.save()
+    
+    # Relecture groupée pour la réponse (participants préchargés)
+    events = Event.objects.filter(pk__in=[event.pk for event in events]).select_related(  # type: ignore[attr-defined]
+        'organizer'
+    ).prefetch_related('children', 'staff_members').order_by('start_datetime')
+    return Response(EventSerializer(events, many=True).data, status=status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def add_event_participants(request):
+    """Ajoute des enfants et du personnel à plusieurs événements"""
+    serializer = EventParticipantsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    
+    if len(data['children']) + len(data['staff_members']) > settings.EVENT_BATCH.get('MAX_PARTICIPANTS', 500):
+        return Response(
+            {'error': _('Trop de participants dans le lot.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    events = list(Event.objects.filter(pk__in=data['events']).only(  # type: ignore[attr-defined]
+        'id', 'title', 'start_datetime', 'end_datetime', 'room', 'status', 'organizer_id',
+    ))
+    if len(events) != len(set(data['events'])):
+        found = {event.pk for event in events}
+        return Response(
+            {'error': _('Événements introuvables.'), 'events': [str(pk) for pk in set(data['events']) - found]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not all(event.can_be_modified_by(request.user) for event in events):
+        raise PermissionDenied(_("Vous n'avez pas les permissions pour modifier ces événements."))
+    
+    try:
+        result = add_participants(
+            events,
+            child_ids=data['children'],
+            staff_ids=data['staff_members'],
+            ignore_conflicts=data['ignore_conflicts'],
+        )
+    except ParticipantsError as e:
+        if e.conflicts:
+            return Response(
+                {'error': _('Conflits de réservation.'), 'conflicts': format_conflicts(e.conflicts)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'error': _('Participants introuvables.'), **e.missing},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(dict(result, events=len(events)))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def free_slots(request):
+    """Créneaux libres communs au personnel, aux enfants et à une salle"""
+    try:
+        start_datetime = datetime.fromisoformat(request.GET['start'])
+        end_datetime = datetime.fromisoformat(request.GET['end'])
+        duration = timedelta(minutes=int(request.GET.get('duration', 60)))
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+    except KeyError:
+        return Response(
+            {'error': _('Dates de début et fin requises.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError:
+        return Response(
+            {'error': _('Format de date ou de durée invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if timezone.is_naive(start_datetime):
+        start_datetime = timezone.make_aware(start_datetime)
+    if timezone.is_naive(end_datetime):
+        end_datetime = timezone.make_aware(end_datetime)
+    
+    max_days = settings.FREE_SLOTS.get('MAX_WINDOW_DAYS', 31)
+    if end_datetime <= start_datetime or end_datetime - start_datetime > timedelta(days=max_days) or duration <= timedelta(0):
+        return Response(
+            {'error': _('Fenêtre de recherche invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        staff_ids = _id_list(request, 'staff')
+        child_ids = _id_list(request, 'children')
+    except ValueError:
+        return Response(
+            {'error': _('Identifiants de participants invalides.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    slots = find_free_slots(
+        start_datetime, end_datetime, duration,
+        staff_ids=staff_ids,
+        child_ids=child_ids,
+        room=request.GET.get('room', ''),
+        limit=limit,
+    )
+    return Response({'count': len(slots), 'slots': slots})
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def planning_statistics(request):
@@ -202,3 +499,108 @@ def calendar_events(request):
         })
     
     return Response(calendar_events)
+
+def _not_modified(request, etag):
+    """Vrai si le client possède déjà la version ``etag`` (If-None-Match)"""
+    header = request.headers.get('If-None-Match', '')
+    return header.strip() == '*' or etag in [value.strip() for value in header.split(',')]
+
+def _feed_scope(request):
+    """Portée demandée (``room`` ou ``user``) après contrôle des permissions"""
+    room = request.GET.get('room')
+    try:
+        user_id = str(uuid.UUID(request.GET['user'])) if request.GET.get('user') else str(request.user.pk)
+    except ValueError:
+        raise ParseError(_("Identifiant d'utilisateur invalide."))
+    if (room or user_id != str(request.user.pk)) and request.user.role not in ['admin', 'assistant_social']:
+        raise PermissionDenied(_("Vous n'avez pas accès à ce calendrier."))
+    if not room and user_id != str(request.user.pk):
+        from django.contrib.auth import get_user_model
+        if not get_user_model().objects.filter(pk=user_id).exists():
+            raise ParseError(_("Utilisateur inconnu."))
+    return ('room', room) if room else ('user', user_id)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_feed_links(request):
+    """Adresses d'abonnement iCalendar et de synchronisation d'un calendrier"""
+    scope_type, value = _feed_scope(request)
+    scope = feeds.room_scope(value) if scope_type == 'room' else feeds.user_scope(value)
+    ics_url = reverse('calendar-feed-ics', kwargs={'scope_type': scope_type, 'value': value})
+    
+    return Response({
+        'ics_url': request.build_absolute_uri(f"{ics_url}?key={feeds.sign_scope(scope)}"),
+        'changes_url': request.build_absolute_uri(f"{reverse('calendar-feed-changes')}?{request.GET.urlencode()}"),
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def calendar_feed_ics(request, scope_type, value):
+    """Flux iCalendar d'un membre du personnel ou d'une salle (clé d'abonnement signée)"""
+    if scope_type not in ('user', 'room'):
+        raise Http404
+    scope = feeds.room_scope(value) if scope_type == 'room' else feeds.user_scope(value)
+    if not feeds.check_scope_key(scope, request.GET.get('key')):
+        raise Http404
+    
+    sync_token = request.GET.get('sync_token')
+    etag = feeds.feed_etag(scope, sync_token or '')
+    if _not_modified(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    try:
+        since = feeds.decode_sync_token(sync_token) if sync_token else None
+    except (ValueError, OverflowError):
+        return HttpResponse(_('Jeton de synchronisation invalide.'), status=status.HTTP_400_BAD_REQUEST)
+    except feeds.SyncTokenExpired:
+        return HttpResponse(_('Jeton de synchronisation expiré.'), status=status.HTTP_410_GONE)
+    
+    events, tombstones, next_token = feeds.feed_changes(scope_type, value, since)
+    response = HttpResponse(
+        feeds.render_ics(f"Planning {value}" if scope_type == 'room' else 'Planning', events, tombstones),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['ETag'] = etag
+    response['X-Sync-Token'] = next_token
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_feed_changes(request):
+    """Modifications d'un calendrier depuis un jeton de synchronisation (JSON)"""
+    scope_type, value = _feed_scope(request)
+    scope = feeds.room_scope(value) if scope_type == 'room' else feeds.user_scope(value)
+    
+    sync_token = request.GET.get('sync_token')
+    etag = feeds.feed_etag(scope, sync_token or '')
+    if _not_modified(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    try:
+        since = feeds.decode_sync_token(sync_token) if sync_token else None
+    except (ValueError, OverflowError):
+        return Response(
+            {'error': _('Jeton de synchronisation invalide.')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except feeds.SyncTokenExpired:
+        return Response(
+            {'error': _('Jeton de synchronisation expiré, resynchronisation complète requise.')},
+            status=status.HTTP_410_GONE
+        )
+    
+    events, tombstones, next_token = feeds.feed_changes(scope_type, value, since)
+    response = Response({
+        'sync_token': next_token,
+        'full_sync': since is None,
+        'events': [feeds.serialize_feed_event(event) for event in events],
+        'deleted': [str(tombstone.event_id) for tombstone in tombstones],
+    })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -3,14 +3,17 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils import timezone
+from datetime import timedelta
 import logging
 
 from .models import Report
 from apps.accounts.models import User
+from apps.core.locks import single_flight
 
 logger = logging.getLogger(__name__)
 
 @shared_task
+@single_flight(ttl=900, min_interval=3600)
 def send_daily_reports():
     """Envoie les rapports quotidiens programmés"""
     
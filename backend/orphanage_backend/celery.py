@@ -1,5 +1,7 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import celeryd_init
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program.
@@ -17,17 +19,64 @@ app.autodiscover_tasks()
 # Celery Beat Schedule
 app.conf.beat_schedule = {
     'send-daily-reports': {
-        'task': 'apps.reports.tasks.generate_daily_reports',
+        'task': 'apps.reports.tasks.send_daily_reports',
         'schedule': 86400.0,  # 24 hours
     },
     'check-medical-appointments': {
-        'task': 'apps.planning.tasks.check_upcoming_appointments',
+        'task': 'apps.planning.tasks.send_appointment_reminders',
         'schedule': 3600.0,  # 1 hour
     },
     'inventory-alerts': {
         'task': 'apps.inventory.tasks.check_low_stock',
         'schedule': 21600.0,  # 6 hours
     },
+    'reconcile-notification-counters': {
+        'task': 'apps.notifications.tasks.reconcile_notification_counters',
+        'schedule': 86400.0,  # 24 hours
+    },
+    'notification-digest-daily': {
+        'task': 'apps.notifications.tasks.send_notification_digests',
+        'schedule': crontab(hour=7, minute=0),
+        'args': ('daily',),
+    },
+    'notification-digest-weekly': {
+        'task': 'apps.notifications.tasks.send_notification_digests',
+        'schedule': crontab(hour=7, minute=15, day_of_week='monday'),
+        'args': ('weekly',),
+    },
+    'notification-digest-monthly': {
+        'task': 'apps.notifications.tasks.send_notification_digests',
+        'schedule': crontab(hour=7, minute=30, day_of_month=1),
+        'args': ('monthly',),
+    },
+    'flush-login-attempts': {
+        'task': 'apps.accounts.tasks.flush_login_attempts',
+        'schedule': 30.0,  # 30 secondes
+    },
+    'flush-security-incidents': {
+        'task': 'apps.core.tasks.flush_security_incidents',
+        'schedule': 60.0,  # 1 minute (fenêtre d'agrégation)
+    },
+    'purge-ip-blocklist': {
+        'task': 'apps.core.tasks.purge_ip_blocklist',
+        'schedule': 3600.0,  # 1 hour
+    },
+    'analyze-login-attempts': {
+        'task': 'apps.accounts.tasks.analyze_login_attempts',
+        'schedule': 300.0,  # 5 minutes
+    },
+    'rollup-login-attempts': {
+        'task': 'apps.accounts.tasks.rollup_login_attempts',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'escalate-overdue-tasks': {
+        'task': 'apps.planning.tasks.escalate_overdue_tasks',
+        'schedule': 300.0,  # 5 minutes
+    },
+    'purge-event-tombstones': {
+        'task': 'apps.planning.tasks.purge_event_tombstones',
+        'schedule': crontab(hour=4, minute=0),
+    },
     'cleanup-expired-tokens': {
         'task': 'apps.accounts.tasks.cleanup_expired_tokens',
         'schedule': 3600.0,  # 1 hour
@@ -36,6 +85,23 @@ app.conf.beat_schedule = {
 
 app.conf.timezone = 'Europe/Paris'
 
+@celeryd_init.connect
+def apply_worker_profile(sender=None, conf=None, instance=None, **kwargs):
+    """Applique le profil de worker CELERY_WORKER_PROFILE (realtime, bulk, maintenance).
+
+    Le worker ne consomme alors que la file du profil, avec sa concurrence et
+    son préchargement. Les options explicites de la ligne de commande
+    (-c, -Q, --prefetch-multiplier) restent prioritaires.
+    """
+    name = os.environ.get('CELERY_WORKER_PROFILE')
+    if not name:
+        return
+
+    profile = settings.TASK_QUEUES[name]
+    conf.worker_concurrency = profile['concurrency']
+    conf.worker_prefetch_multiplier = profile['prefetch_multiplier']
+    instance.app.amqp.queues.select([name])
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
@@ -44,6 +44,7 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    'apps.core',
     'apps.accounts',
     'apps.children',
     'apps.donations',
@@ -60,16 +61,16 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Après CORS : les réponses 403/429 portent Access-Control-Allow-Origin (Retry-After lisible)
+    'apps.core.middleware.SecurityPipelineMiddleware',  # Blocage, débit et en-têtes
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django_otp.middleware.OTPMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.security_middleware.ThreatDetectionMiddleware',  # Requêtes suspectes bloquées et agrégées en incidents
     'axes.middleware.AxesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'csp.middleware.CSPMiddleware',
-    'apps.core.middleware.SecurityHeadersMiddleware',
     'apps.core.middleware.AuditLogMiddleware',
 ]
 
@@ -163,7 +164,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -217,7 +218,8 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('apps.accounts.tokens.RevocableAccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'apps.accounts.serializers.RevocableTokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
@@ -225,9 +227,22 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Révocation des tokens JWT (Redis + copie locale par processus)
+TOKEN_REVOCATION = {
+    'REFRESH_SECONDS': 5,  # Délai maximal de propagation d'une révocation entre processus
+    'PURGE_CHUNK_SIZE': 1000,  # Entrées expirées supprimées par lot
+}
+
+# Cache des utilisateurs authentifiés par JWT (colonnes utiles aux permissions)
+AUTH_USER_CACHE = {
+    'TIMEOUT': 60,  # Secondes ; invalidé à chaque changement de rôle, statut ou mot de passe
+    'VERSION': 1,  # À incrémenter si AUTH_USER_FIELDS change
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS')
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['Retry-After']  # Délai des réponses 429 lisible par le client web
 
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
@@ -252,19 +267,256 @@ AXES_FAILURE_LIMIT = 5
 AXES_COOLOFF_TIME = 1  # 1 hour
 AXES_LOCK_OUT_BY_COMBINATION_USER_AND_IP = True
 AXES_RESET_ON_SUCCESS = True
+AXES_HANDLER = 'axes.handlers.cache.AxesCacheHandler'  # Compteurs dans le cache Redis partagé (CACHES), sans écriture en base
+
+# Historique des mots de passe (réutilisation interdite)
+PASSWORD_HISTORY = {
+    'DEPTH': 5,  # Derniers mots de passe vérifiés
+    'HASHER': None,  # None : copie du hash courant ; sinon nom d'algorithme (ex. 'pbkdf2_sha256')
+    'MAX_WORKERS': 4,  # Vérifications PBKDF2 en parallèle
+}
+
+# Tentatives de connexion (compteurs atomiques et journal différé)
+LOGIN_ATTEMPTS = {
+    'USER_FAILURE_LIMIT': 5,  # Échecs avant blocage du compte
+    'IP_FAILURE_LIMIT': 10,  # Échecs avant blocage de l'IP
+    'IP_BLOCK_SECONDS': 3600,
+    'BATCH_SIZE': 100,  # Tentatives insérées par lot (bulk_create)
+    'MAX_REJECTED': 1000,  # Entrées refusées par la base conservées pour examen
+}
+
+# Analyse des tentatives de connexion (apps.accounts.login_analytics)
+LOGIN_ANALYTICS = {
+    'BATCH_SIZE': 5000,  # Nouvelles tentatives analysées par lot
+    'WINDOW_SECONDS': 3600,  # Fenêtre glissante des statistiques
+    'MIN_ATTEMPTS': 10,  # Tentatives minimales avant d'évaluer le taux d'échec
+    'FAILURE_RATIO': 0.8,
+    'ACCOUNT_DISTINCT_IPS': 5,  # IP distinctes sur un même compte
+    'IP_DISTINCT_ACCOUNTS': 10,  # Comptes distincts depuis une même IP
+    'NEW_USER_AGENTS': 2,  # Connexions réussies depuis des User-Agents inconnus du compte
+    'USER_AGENT_HISTORY_DAYS': 30,
+    'RETENTION_DAYS': 30,  # Au-delà : résumés horaires (LoginAttemptSummary)
+}
+
+# Agrégation des incidents de sécurité (ThreatDetectionMiddleware)
+SECURITY_INCIDENTS = {
+    'WINDOW_SECONDS': 60,  # Fenêtre d'agrégation par (IP, pattern, chemin)
+    'MERGE_SECONDS': 3600,  # Un incident ouvert est prolongé tant que l'attaque dure
+    'SEVERITY_THRESHOLDS': {'high': 1, 'critical': 100},  # Requêtes bloquées cumulées
+    'FLUSH_BATCH_SIZE': 500,  # Fenêtres lues par lot
+    'SCANNED_CONTENT_TYPES': ['application/json', 'application/x-www-form-urlencoded'],  # Corps analysés (jamais multipart)
+    'MAX_SCANNED_BODY_BYTES': 1048576,  # Corps plus volumineux non lus par ThreatDetectionMiddleware
+}
+
+# Contrôles de sécurité en un passage (apps.core.middleware.SecurityPipelineMiddleware)
+SECURITY_PIPELINE = {
+    'IP_RATE': '600/m',  # Plafond global par IP
+    'RATE_LIMITS': [  # (préfixe du chemin, méthode ou None, débit) : première règle correspondante
+        ('/api/v1/auth/login/', 'POST', '20/m'),
+        ('/api/v1/auth/register/', 'POST', '10/h'),
+        ('/api/v1/auth/password-reset/', 'POST', '10/h'),
+    ],
+    'EXCLUDED_PATHS': ['/health/', '/static/', '/media/'],
+    'PERMISSIONS_POLICY': 'geolocation=(), microphone=(), camera=(), payment=(), usb=()',
+}
+
+# Proxys de confiance (répartiteur de charge) : seuls eux peuvent fixer
+# X-Forwarded-For. Sans proxy déclaré, l'IP cliente est REMOTE_ADDR
+# (apps.core.utils.get_client_ip, utilisée par le blocage et les limites de débit).
+TRUSTED_PROXIES = env.list('TRUSTED_PROXIES', default=[])
+
+# Liste de blocage d'IP (apps.core.blocklist)
+IP_BLOCKLIST = {
+    'STATIC_CIDRS': env.list('IP_BLOCKLIST_CIDRS', default=[]),  # Plages bloquées en permanence
+    'RELOAD_SECONDS': 300,  # Rechargement complet par processus (messages pub/sub perdus)
+    'INCIDENT_BLOCK_HITS': 20,  # Requêtes malveillantes d'un incident avant blocage de l'IP
+    'INCIDENT_BLOCK_SECONDS': 86400,
+}
 
 # Two-Factor Authentication
 OTP_TOTP_ISSUER = 'Orphanage Management'
 OTP_LOGIN_URL = '/auth/login/'
 
+# Redis (pub/sub, compteurs, verrous) - 'fakeredis://' pour un serveur en mémoire
+REDIS_URL = env('REDIS_URL')
+
+# Cache partagé entre processus : utilisateurs JWT en cache, compteurs de
+# connexion, blocages axes. Un cache local au processus laisserait un compte
+# bloqué authentifié sur les autres workers (contrôle accounts.W001).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'orphanage',
+        'TIMEOUT': 300,
+    }
+}
+if REDIS_URL.startswith('fakeredis://'):
+    # Serveur Redis en mémoire : le cache est de toute façon local au processus
+    CACHES['default'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
 # Celery Configuration
-CELERY_BROKER_URL = env('REDIS_URL')
-CELERY_RESULT_BACKEND = env('REDIS_URL')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Files Celery et profils de workers
+# Chaque file est servie par ses propres workers (CELERY_WORKER_PROFILE=<file>) :
+# une génération de rapport ou un résumé ne retarde plus les rappels et emails.
+# Les limites de temps et la conservation des résultats sont portées par les
+# tâches (annotations), quel que soit le worker qui les exécute.
+TASK_QUEUES = {
+    'realtime': {
+        'concurrency': 8,
+        'prefetch_multiplier': 4,  # Tâches courtes : le préchargement réduit la latence
+        'soft_time_limit': 30,
+        'time_limit': 60,
+        'acks_late': False,
+        'ignore_result': True,
+        'tasks': [
+            'apps.notifications.tasks.send_email',
+            'apps.planning.tasks.send_appointment_reminders',
+            'apps.planning.tasks.escalate_overdue_tasks',
+            'apps.inventory.tasks.check_low_stock',
+        ],
+    },
+    'bulk': {
+        'concurrency': 2,
+        'prefetch_multiplier': 1,  # Tâches longues : un worker ne réserve pas les suivantes
+        'soft_time_limit': 1500,
+        'time_limit': 1800,
+        'acks_late': True,
+        'ignore_result': False,
+        'tasks': [
+            'apps.reports.tasks.generate_report_task',
+            'apps.reports.tasks.send_daily_reports',
+            'apps.notifications.tasks.send_notification_digests',
+            'apps.donations.tasks.process_recurring_donations',
+        ],
+    },
+    'maintenance': {
+        'concurrency': 1,
+        'prefetch_multiplier': 1,
+        'soft_time_limit': 3300,
+        'time_limit': 3600,
+        'acks_late': True,
+        'ignore_result': True,
+        'tasks': [
+            'apps.notifications.tasks.reconcile_notification_counters',
+            'apps.accounts.tasks.cleanup_expired_tokens',
+            'apps.accounts.tasks.flush_login_attempts',
+            'apps.core.tasks.flush_security_incidents',
+            'apps.core.tasks.purge_ip_blocklist',
+            'apps.accounts.tasks.analyze_login_attempts',
+            'apps.accounts.tasks.rollup_login_attempts',
+            'apps.planning.tasks.purge_event_tombstones',
+        ],
+    },
+}
+CELERY_TASK_DEFAULT_QUEUE = 'bulk'  # Tâches non routées : jamais dans la file temps réel
+CELERY_TASK_ROUTES = {
+    task: {'queue': queue}
+    for queue, profile in TASK_QUEUES.items()
+    for task in profile['tasks']
+}
+CELERY_TASK_ANNOTATIONS = {
+    task: {
+        'soft_time_limit': profile['soft_time_limit'],
+        'time_limit': profile['time_limit'],
+        'acks_late': profile['acks_late'],
+        'ignore_result': profile['ignore_result'],
+    }
+    for profile in TASK_QUEUES.values()
+    for task in profile['tasks']
+}
+
+# Notifications temps réel (Server-Sent Events, servi en ASGI)
+NOTIFICATION_STREAM = {
+    'BROKER': env('NOTIFICATION_BROKER', default='redis'),  # 'redis' ou 'memory'
+    'HEARTBEAT_SECONDS': 15,
+    'MAX_CONNECTION_SECONDS': 300,  # Le client se reconnecte ensuite
+    'RETRY_MILLISECONDS': 5000,
+}
+
+# Résumés périodiques des notifications
+NOTIFICATION_DIGEST = {
+    'BATCH_SIZE': 200,  # Destinataires par lot (mémoire et connexion SMTP)
+}
+
+# Verrous des tâches périodiques (exécution unique multi-nœuds)
+TASK_LOCKS = {
+    'TTL_SECONDS': 300,  # Durée du verrou, renouvelé tant que la tâche tourne
+    'RENEW_RATIO': 1 / 3,  # Renouvellement toutes les TTL * RENEW_RATIO secondes
+}
+
+# Rejeu des transactions en conflit de sérialisation (apps.core.transactions)
+TRANSACTION_RETRY = {
+    'MAX_ATTEMPTS': 5,  # Tentatives au total, rejeux compris
+    'BASE_DELAY': 0.01,  # Secondes ; doublé à chaque rejeu, avec gigue aléatoire
+    'MAX_DELAY': 0.5,
+}
+
+# Génération automatique des plannings d'équipes (apps.planning.rostering)
+ROSTERING = {
+    'ROLES': ['soignant', 'medecin', 'assistant_social', 'logisticien'],  # Personnel planifiable par défaut
+    'MIN_REST_HOURS': 11,  # Repos minimal entre deux équipes
+    'MAX_WEEKLY_HOURS': 48,
+    'LOCAL_SEARCH_ITERATIONS': 2000,  # Transferts d'équilibrage au plus
+    'MAX_DAYS': 62,  # Période maximale d'une génération
+}
+
+# Recherche de créneaux libres communs (apps.planning.free_slots)
+FREE_SLOTS = {
+    'MAX_WINDOW_DAYS': 31,  # Fenêtre de recherche maximale
+    'GRANULARITY_MINUTES': 15,  # Début des créneaux aligné sur ce pas
+    'MAX_RESULTS': 50,
+}
+
+# Création d'événements et ajout de participants par lot (apps.planning.bulk)
+EVENT_BATCH = {
+    'MAX_EVENTS': 100,  # Événements par requête
+    'MAX_PARTICIPANTS': 500,  # Enfants et personnel ajoutés par requête
+}
+
+# Flux de calendrier iCalendar et JSON incrémentaux (apps.planning.feeds)
+CALENDAR_FEEDS = {
+    'PAST_DAYS': 30,  # Événements terminés conservés dans les flux
+    'TOMBSTONE_RETENTION_DAYS': 90,  # Au-delà, un jeton impose une resynchronisation complète
+    'SYNC_SAFETY_SECONDS': 30,  # Recul du jeton : couvre les transactions validées en retard
+}
+
+# Agenda « ma journée » (apps.planning.agenda)
+AGENDA = {
+    'CACHE_TIMEOUT': 900,  # Secondes ; borne la fraîcheur des tâches « en retard »
+    'FOLLOW_UP_DAYS': 7,  # Horizon des suivis médicaux
+    'MAX_TASKS': 50,
+    'MAX_FOLLOW_UPS': 50,
+}
+
+# Couverture en personnel (apps.planning.coverage)
+COVERAGE = {
+    'BUCKET_MINUTES': 15,  # Doit diviser 1440
+    'CHILDREN_PER_STAFF': 8,  # Taux d'encadrement minimal
+    'MAX_DAYS': 62,
+    'MAX_SHORTFALLS': 200,  # Plages en sous-effectif retournées au plus
+}
+
+# Heures travaillées (apps.planning.timesheets)
+TIME_ACCOUNTING = {
+    'DEFAULT_DAILY_HOURS': 8,  # Sans Schedule : heures prévues par jour travaillé
+    'DEFAULT_WORKING_DAYS': [0, 1, 2, 3, 4],  # Sans Schedule : lundi à vendredi
+    'MAX_DAYS': 366,
+}
+
+# Escalade des tâches en retard (apps.planning.escalation)
+TASK_ESCALATION = {
+    'INITIAL_WINDOW_HOURS': 24,  # Première exécution : échéances des dernières 24 heures
+    'BATCH_SIZE': 500,  # Tâches notifiées et escaladées par transaction
+}
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = env('EMAIL_HOST')
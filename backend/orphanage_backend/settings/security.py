@@ -119,6 +119,7 @@ except Exception:
 
 CORS_ALLOW_CREDENTIALS = True
 CORS_PREFLIGHT_MAX_AGE = 86400
+CORS_EXPOSE_HEADERS = ['Retry-After']
 
 # Méthodes HTTP autorisées
 CORS_ALLOW_METHODS = [
@@ -189,10 +190,13 @@ AXES_VERBOSE = True
 # =============================================================================
 
 # Configuration des sessions
+SESSION_ENGINE = 'apps.core.session_backend'  # Sessions dans Redis, sans écriture en base
+SESSION_CACHE_ALIAS = 'default'
 SESSION_COOKIE_AGE = 3600  # 1 heure
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Strict'
 SESSION_SAVE_EVERY_REQUEST = True
+SESSION_REFRESH_FRACTION = 0.25  # Expiration prolongée au plus une fois par quart d'heure
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 # Nom du cookie de session personnalisé
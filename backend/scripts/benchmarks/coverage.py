@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Mesure du temps de calcul de la couverture en personnel
+
+Rastérise en tranches de 15 minutes un mois d'équipes synthétiques (effectif
+et minimum requis) avec ``apps.planning.coverage``, puis, si la base
+configurée contient des équipes, chronomètre ``compute_coverage`` complet
+(requêtes comprises) sur le mois en cours.
+
+Usage :
+    python scripts/benchmarks/coverage.py --days 31 --shifts-per-day 40
+"""
+
+import os
+import sys
+import argparse
+import calendar
+import time
+
+import django
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orphanage_backend.settings.base')
+django.setup()
+
+from django.utils import timezone
+
+from apps.core.metrics import percentile
+from apps.planning.coverage import MINUTES_PER_DAY, rasterize, shift_buckets
+from apps.planning.models import Shift
+
+def synthetic_shifts(days, shifts_per_day, rng):
+    count = days * shifts_per_day
+    offsets = np.repeat(np.arange(days), shifts_per_day)
+    start_minutes = rng.integers(0, 96, count) * 15
+    end_minutes = (start_minutes + rng.choice([240, 480, 600], count)) % MINUTES_PER_DAY
+    staffed = rng.integers(0, 12, count).astype(np.int32)
+    minimums = rng.integers(1, 10, count).astype(np.int32)
+    return offsets, start_minutes, end_minutes, staffed, minimums
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--shifts-per-day', type=int, default=40)
+    parser.add_argument('--rounds', type=int, default=50)
+    options = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    offsets, start_minutes, end_minutes, staffed, minimums = synthetic_shifts(options.days, options.shifts_per_day, rng)
+    size = options.days * MINUTES_PER_DAY // 15
+
+    print("📊 Couverture en personnel")
+    print(f"   {options.days} jours, {len(offsets)} équipes, {size} tranches de 15 minutes\n")
+
+    timings = []
+    for _ in range(options.rounds):
+        started = time.perf_counter()
+        starts, ends = shift_buckets(offsets, start_minutes, end_minutes, 15)
+        gap = rasterize(starts, ends, staffed, size) - rasterize(starts, ends, minimums, size)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"Rastérisation        p50={percentile(timings, 0.5):8.2f} ms   p99={percentile(timings, 0.99):8.2f} ms   "
+          f"{int((gap < 0).sum())} tranches en sous-effectif")
+
+    from apps.planning.coverage import compute_coverage
+    today = timezone.localdate()
+    start_date = today.replace(day=1)
+    end_date = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    shifts = Shift.objects.filter(date__gte=start_date, date__lte=end_date).count()  # type: ignore[attr-defined]
+    timings = []
+    for _ in range(max(options.rounds // 5, 1)):
+        started = time.perf_counter()
+        coverage = compute_coverage(start_date, end_date)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"Calcul complet (base) p50={percentile(timings, 0.5):8.2f} ms   {shifts} équipes du mois en base, "
+          f"{coverage['summary']['understaffed_buckets']} tranches en sous-effectif")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Mesure du temps de détection des conflits d'un événement
+
+Vérifie un événement avec de nombreux participants : balayage seul sur des
+intervalles synthétiques (``sweep_conflicts``), puis vérification complète
+(requête unique + balayage) sur la base configurée avec les premiers
+membres du personnel et enfants existants.
+
+Usage :
+    python scripts/benchmarks/event_conflicts.py --participants 50 --events 20
+"""
+
+import os
+import sys
+import argparse
+import random
+import time
+import uuid
+from datetime import timedelta
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orphanage_backend.settings.base')
+django.setup()
+
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.children.models import Child
+from apps.core.metrics import percentile
+from apps.planning.conflicts import (
+    RESOURCE_STAFF, find_event_conflicts, make_candidate, sweep_conflicts,
+)
+
+def synthetic_rows(staff_ids, events, start, rng):
+    """Intervalles existants : ``events`` événements d'une heure par participant sur la semaine"""
+    rows = []
+    for staff_id in staff_ids:
+        for _ in range(events):
+            begins = start + timedelta(minutes=15 * rng.randrange(7 * 96))
+            rows.append({
+                'kind': RESOURCE_STAFF, 'resource': staff_id, 'event': str(uuid.uuid4()),
+                'title': 'Synthétique', 'start': begins, 'end': begins + timedelta(hours=1),
+            })
+    return rows
+
+def measure(function, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--participants', type=int, default=50)
+    parser.add_argument('--events', type=int, default=20, help='Événements existants par participant')
+    parser.add_argument('--rounds', type=int, default=200)
+    options = parser.parse_args()
+
+    rng = random.Random(42)
+    start = timezone.now().replace(minute=0, second=0, microsecond=0)
+    staff_ids = [str(uuid.uuid4()) for _ in range(options.participants)]
+    candidate = make_candidate(None, start + timedelta(days=3), start + timedelta(days=3, hours=2), 'Salle 1', staff_ids)
+    rows = synthetic_rows(staff_ids, options.events, start, rng)
+
+    print("📅 Détection des conflits d'un événement")
+    print(f"   {options.participants} participants, {len(rows)} intervalles existants, {options.rounds} mesures\n")
+
+    timings, conflicts = measure(lambda: sweep_conflicts([candidate], rows), options.rounds)
+    print(f"Balayage seul        p50={percentile(timings, 0.5):7.3f} ms   p99={percentile(timings, 0.99):7.3f} ms   "
+          f"{len(conflicts)} conflits")
+
+    staff = list(User.objects.filter(is_active=True).values_list('pk', flat=True)[:options.participants])
+    children = list(Child.objects.values_list('pk', flat=True)[:max(options.participants - len(staff), 0)])
+    timings, conflicts = measure(lambda: find_event_conflicts(
+        candidate['start'], candidate['end'], 'Salle 1', staff, children,
+    ), options.rounds)
+    print(f"Vérification en base p50={percentile(timings, 0.5):7.3f} ms   p99={percentile(timings, 0.99):7.3f} ms   "
+          f"{len(staff) + len(children)} participants réels, {len(conflicts)} conflits")
+
+if __name__ == '__main__':
+    main()
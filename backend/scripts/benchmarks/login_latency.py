@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Benchmark de la connexion JWT sous attaque par force brute simulée
+
+Des threads « attaquants » envoient des mots de passe erronés sur un ensemble
+de comptes cibles depuis des IP aléatoires, pendant que des threads
+« légitimes » se connectent avec les bons identifiants. Le script affiche
+p50/p99 des deux populations et le nombre de requêtes SQL par connexion.
+
+Usage :
+    python scripts/benchmarks/login_latency.py --attackers 8 --users 2 --requests 50
+    python scripts/benchmarks/login_latency.py --hasher md5   # coût du pipeline seul
+
+Les comptes de benchmark (bench-login-*) sont supprimés à la fin.
+"""
+
+import os
+import sys
+import argparse
+import random
+import threading
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orphanage_backend.settings.base')
+django.setup()
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.login_attempts import flush_pending_attempts
+from apps.accounts.models import LoginAttempt, User
+from apps.core.metrics import percentile, record_timing
+
+LOGIN_URL = '/api/v1/auth/login/'
+PASSWORD = 'Bench-Login-2024!'
+
+def random_ip():
+    return f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+
+def create_accounts(prefix, count):
+    users = []
+    for index in range(count):
+        email = f"bench-login-{prefix}-{index}@example.org"
+        user = User.objects.create_user(
+            email=email,
+            username=email,
+            password=PASSWORD,
+            status='approved',
+            is_verified=True
+        )
+        users.append(user)
+    return users
+
+def worker(emails, password, count, timings, statuses):
+    client = Client()
+    try:
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.post(
+                LOGIN_URL,
+                {'email': random.choice(emails), 'password': password},
+                content_type='application/json',
+                REMOTE_ADDR=random_ip()
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    finally:
+        connections.close_all()
+
+def count_queries(email, password):
+    with CaptureQueriesContext(connection) as queries:
+        Client().post(
+            LOGIN_URL,
+            {'email': email, 'password': password},
+            content_type='application/json',
+            REMOTE_ADDR=random_ip()
+        )
+    return len(queries.captured_queries)
+
+def report(name, timings, statuses):
+    print(
+        f"{name:<10} requêtes={len(timings):<5} "
+        f"p50={percentile(timings, 0.50):8.1f} ms  "
+        f"p99={percentile(timings, 0.99):8.1f} ms  "
+        f"statuts={dict(sorted(statuses.items()))}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--attackers', type=int, default=8)
+    parser.add_argument('--users', type=int, default=2)
+    parser.add_argument('--targets', type=int, default=20, help="Comptes visés par l'attaque")
+    parser.add_argument('--requests', type=int, default=50, help='Requêtes par thread')
+    parser.add_argument('--hasher', choices=['default', 'md5'], default='default')
+    options = parser.parse_args()
+
+    if options.hasher == 'md5':
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    # Les limites par IP fausseraient la mesure : chaque requête a sa propre IP
+    settings.RATELIMIT_ENABLE = False
+
+    targets = create_accounts('target', options.targets)
+    legit = create_accounts('user', options.users)
+    target_emails = [user.email for user in targets]
+    legit_emails = [user.email for user in legit]
+
+    try:
+        print("🔐 Connexion JWT sous force brute simulée")
+        print(f"   {options.attackers} attaquants, {options.users} utilisateurs légitimes, "
+              f"{options.requests} requêtes par thread, hasher={options.hasher}\n")
+
+        print(f"   Requêtes SQL : succès={count_queries(legit_emails[0], PASSWORD)}, "
+              f"échec={count_queries(target_emails[0], 'wrong')}\n")
+
+        attack_timings, attack_statuses = [], {}
+        legit_timings, legit_statuses = [], {}
+        threads = [
+            threading.Thread(target=worker, args=(target_emails, 'wrong', options.requests, attack_timings, attack_statuses))
+            for _ in range(options.attackers)
+        ] + [
+            threading.Thread(target=worker, args=(legit_emails, PASSWORD, options.requests, legit_timings, legit_statuses))
+            for _ in range(options.users)
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        report('attaque', attack_timings, attack_statuses)
+        report('légitime', legit_timings, legit_statuses)
+        print(f"\n   Débit: {(len(attack_timings) + len(legit_timings)) / elapsed:.1f} connexions/s")
+        print(f"   Tentatives journalisées par lots: {flush_pending_attempts()}")
+
+        for timing in legit_timings:
+            record_timing('benchmarks.login.legit', timing)
+    finally:
+        emails = target_emails + legit_emails
+        LoginAttempt.objects.filter(email__in=emails).delete()  # type: ignore[attr-defined]
+        User.objects.filter(email__in=emails).delete()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Profilage du coût de chaque middleware par requête
+
+Construit la chaîne de middlewares (sans le reste du gestionnaire Django),
+mesure le temps propre de chaque couche (temps inclusif moins celui des
+couches internes) sur des requêtes GET d'API, et compare la chaîne
+d'origine (contrôles et en-têtes séparés, limitation de débit en cache) à
+``settings.MIDDLEWARE`` (``SecurityPipelineMiddleware``).
+
+Usage :
+    python scripts/benchmarks/middleware_overhead.py --requests 2000
+"""
+
+import os
+import sys
+import argparse
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orphanage_backend.settings.base')
+django.setup()
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+from apps.core.metrics import percentile
+
+# Chaîne d'origine, avec la limitation de débit par middleware activée
+LEGACY_MIDDLEWARE = [
+    'apps.core.middleware.RateLimitMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django_otp.middleware.OTPMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'axes.middleware.AxesMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'csp.middleware.CSPMiddleware',
+    'apps.core.middleware.SecurityHeadersMiddleware',
+    'apps.core.middleware.AuditLogMiddleware',
+]
+
+class TimedLayer:
+    """Enveloppe une couche et enregistre son temps inclusif par requête"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.samples = []
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        try:
+            return self.inner(request)
+        finally:
+            self.samples.append(time.perf_counter() - started)
+
+def view(request):
+    return JsonResponse({'status': 'ok'})
+
+def build_chain(paths):
+    """Instancie les middlewares comme BaseHandler.load_middleware"""
+    layers = [TimedLayer(view)]
+    for path in reversed(paths):
+        layers.append(TimedLayer(import_string(path)(layers[-1])))
+    return list(reversed(layers))  # Couche externe en premier
+
+def profile(paths, requests, clients):
+    layers = build_chain(paths)
+    factory = RequestFactory()
+    for index in range(requests):
+        request = factory.get('/api/v1/children/', REMOTE_ADDR=f'10.0.{index % clients // 256}.{index % 256}')
+        layers[0](request)
+
+    rows = []
+    for path, layer, inner in zip(paths, layers, layers[1:]):
+        own = [(outer - nested) * 1e6 for outer, nested in zip(layer.samples, inner.samples)]
+        rows.append((path, own))
+    total = [(outer - nested) * 1e6 for outer, nested in zip(layers[0].samples, layers[-1].samples)]
+    return rows, total
+
+def report(title, rows, total):
+    print(f"\n{title}")
+    for path, own in rows:
+        print(f"   {path:<55} p50={percentile(own, 0.5):8.1f} µs   p99={percentile(own, 0.99):8.1f} µs")
+    print(f"   {'Total middlewares':<55} p50={percentile(total, 0.5):8.1f} µs   p99={percentile(total, 0.99):8.1f} µs")
+    return percentile(total, 0.5)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=200, help='Adresses IP distinctes')
+    options = parser.parse_args()
+
+    print("🛡️  Coût des middlewares par requête")
+    print(f"   {options.requests} requêtes GET, {options.clients} clients")
+
+    legacy = report('Avant (contrôles séparés)', *profile(LEGACY_MIDDLEWARE, options.requests, options.clients))
+    current = report('Après (settings.MIDDLEWARE)', *profile(settings.MIDDLEWARE, options.requests, options.clients))
+    print(f"\nGain médian : {legacy - current:.1f} µs par requête (x{legacy / current:.2f})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Benchmark de la vérification de l'historique des mots de passe
+
+Compare la vérification séquentielle (une exécution PBKDF2 après l'autre)
+et la vérification parallèle de ``apps.accounts.password_history`` pour un
+mot de passe absent de l'historique (pire cas : tous les hashs sont vérifiés)
+et présent en dernière position.
+
+Usage :
+    python scripts/benchmarks/password_history.py --depth 5 --rounds 5
+"""
+
+import os
+import sys
+import argparse
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orphanage_backend.settings.base')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+
+from apps.accounts.password_history import any_password_matches
+from apps.core.metrics import percentile
+
+def serial_matches(password, hashes):
+    """Comportement d'origine : vérifications successives"""
+    return any(check_password(password, encoded) for encoded in hashes)
+
+def measure(function, password, hashes, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function(password, hashes)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--depth', type=int, default=settings.PASSWORD_HISTORY.get('DEPTH', 5))
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--hasher', default=settings.PASSWORD_HISTORY.get('HASHER') or 'default')
+    options = parser.parse_args()
+
+    hasher = get_hasher(options.hasher)
+    hashes = [make_password(f'Ancien-Mot-De-Passe-{index}!', hasher=hasher.algorithm) for index in range(options.depth)]
+
+    print("🔑 Vérification de l'historique des mots de passe")
+    print(f"   profondeur={options.depth}, hasher={hasher.algorithm}, "
+          f"workers={settings.PASSWORD_HISTORY.get('MAX_WORKERS', 4)}, {options.rounds} mesures\n")
+
+    cases = [
+        ('absent', 'Nouveau-Mot-De-Passe-1!'),
+        ('dernier', f'Ancien-Mot-De-Passe-{options.depth - 1}!'),
+    ]
+    for case, password in cases:
+        serial = measure(serial_matches, password, hashes, options.rounds)
+        parallel = measure(any_password_matches, password, hashes, options.rounds)
+        print(
+            f"{case:<8} séquentiel p50={percentile(serial, 0.5):8.1f} ms   "
+            f"parallèle p50={percentile(parallel, 0.5):8.1f} ms   "
+            f"gain x{percentile(serial, 0.5) / percentile(parallel, 0.5):.1f}"
+        )
+
+if __name__ == '__main__':
+    main()
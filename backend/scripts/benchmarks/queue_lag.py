@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Benchmark de latence des files Celery (isolation temps réel / traitements longs)
+
+Deux topologies sont comparées avec la même concurrence totale :
+
+- ``shared`` : une seule file, un seul pool de workers (situation d'origine) ;
+- ``routed`` : files ``realtime`` et ``bulk`` servies par des workers dédiés,
+  avec les profils de ``settings.TASK_QUEUES``.
+
+Le script remplit la file avec des traitements longs, puis envoie des tâches
+sondes à intervalle régulier. La latence d'une sonde est le délai entre son
+envoi et le début de son exécution.
+
+Usage :
+    python scripts/benchmarks/queue_lag.py --bulk-jobs 40 --bulk-seconds 0.5 --probes 50
+
+Les workers sont démarrés dans le processus (pool de threads) sur le broker
+configuré (``CELERY_BROKER_URL``).
+"""
+
+import os
+import sys
+import argparse
+import threading
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orphanage_backend.settings.base')
+django.setup()
+
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from django.conf import settings
+
+from apps.core.metrics import percentile, record_timing
+
+BULK_TASK = 'benchmarks.queue_lag.bulk_job'
+PROBE_TASK = 'benchmarks.queue_lag.probe'
+
+def make_app(name, routes):
+    """Application Celery isolée (une par worker, chacune avec sa sélection de files)"""
+    app = Celery(name, broker=settings.CELERY_BROKER_URL, set_as_current=False)
+    app.conf.update(
+        task_routes=routes,
+        task_ignore_result=True,
+        task_default_queue='default',
+        worker_hijack_root_logger=False,
+        # Transports par scrutation (memory://) : scrutation fine pour ne pas
+        # mesurer l'intervalle de polling au lieu de l'attente en file
+        broker_transport_options={'polling_interval': 0.01},
+    )
+    return app
+
+def register_tasks(app, lags, done):
+    @app.task(name=BULK_TASK)
+    def bulk_job(seconds):
+        time.sleep(seconds)
+
+    @app.task(name=PROBE_TASK)
+    def probe(sent_at):
+        lags.append((time.time() - sent_at) * 1000)
+        done.release()
+
+    return bulk_job, probe
+
+def run_scenario(name, workers, routes, options):
+    """Exécute un scénario et retourne les latences des sondes (ms)"""
+    lags = []
+    done = threading.Semaphore(0)
+
+    producer = make_app(f'{name}-producer', routes)
+    bulk_job, probe = register_tasks(producer, lags, done)
+
+    contexts = []
+    for index, (queue, concurrency, prefetch) in enumerate(workers):
+        app = make_app(f'{name}-{queue}-{index}', routes)
+        app.conf.worker_prefetch_multiplier = prefetch
+        register_tasks(app, lags, done)
+        context = start_worker(
+            app,
+            concurrency=concurrency,
+            pool='threads',
+            perform_ping_check=False,
+            queues=[queue],
+            shutdown_timeout=options.bulk_jobs * options.bulk_seconds + 10,
+        )
+        context.__enter__()
+        contexts.append(context)
+
+    try:
+        for _ in range(options.bulk_jobs):
+            bulk_job.delay(options.bulk_seconds)
+
+        for _ in range(options.probes):
+            probe.delay(time.time())
+            time.sleep(options.probe_interval)
+
+        for _ in range(options.probes):
+            if not done.acquire(timeout=options.bulk_jobs * options.bulk_seconds + 30):
+                raise RuntimeError(f"Scénario {name}: sondes non exécutées")
+    finally:
+        for context in reversed(contexts):
+            context.__exit__(None, None, None)
+
+    for lag in lags:
+        record_timing(f'benchmarks.queue_lag.{name}', lag)
+    return lags
+
+def report(name, lags):
+    print(
+        f"{name:<8} sondes={len(lags):<4} "
+        f"p50={percentile(lags, 0.50):8.1f} ms  "
+        f"p99={percentile(lags, 0.99):8.1f} ms  "
+        f"max={max(lags):8.1f} ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--bulk-jobs', type=int, default=40)
+    parser.add_argument('--bulk-seconds', type=float, default=0.5)
+    parser.add_argument('--probes', type=int, default=50)
+    parser.add_argument('--probe-interval', type=float, default=0.02)
+    options = parser.parse_args()
+
+    realtime = settings.TASK_QUEUES['realtime']
+    bulk = settings.TASK_QUEUES['bulk']
+    total_concurrency = realtime['concurrency'] + bulk['concurrency']
+
+    print("⏱️  Latence des sondes temps réel sous charge de traitements longs")
+    print(f"   {options.bulk_jobs} traitements de {options.bulk_seconds}s, "
+          f"{options.probes} sondes, concurrence totale {total_concurrency}\n")
+
+    shared = run_scenario(
+        'shared',
+        workers=[('default', total_concurrency, 4)],
+        routes={},
+        options=options,
+    )
+    report('shared', shared)
+
+    routed = run_scenario(
+        'routed',
+        workers=[
+            ('realtime', realtime['concurrency'], realtime['prefetch_multiplier']),
+            ('bulk', bulk['concurrency'], bulk['prefetch_multiplier']),
+        ],
+        routes={BULK_TASK: {'queue': 'bulk'}, PROBE_TASK: {'queue': 'realtime'}},
+        options=options,
+    )
+    report('routed', routed)
+
+if __name__ == '__main__':
+    main()
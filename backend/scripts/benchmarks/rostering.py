@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Mesure du temps de génération d'un planning d'équipes
+
+Génère un problème synthétique (personnel avec jours et horaires de travail
+variés, congés et formations aléatoires, quatre équipes par jour) et le
+résout avec ``RosterSolver`` en mémoire : temps de résolution, places non
+pourvues et répartition des heures entre le personnel.
+
+Usage :
+    python scripts/benchmarks/rostering.py --staff 200 --days 31
+"""
+
+import os
+import sys
+import argparse
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orphanage_backend.settings.base')
+django.setup()
+
+from apps.planning.rostering import RosterSolver
+
+# (type, début, fin, effectif minimal) : matin, après-midi, soir, nuit
+SHIFT_TEMPLATES = [
+    ('morning', dt_time(6), dt_time(14), 12),
+    ('afternoon', dt_time(14), dt_time(22), 10),
+    ('evening', dt_time(18), dt_time(23), 4),
+    ('night', dt_time(22), dt_time(6), 6),
+]
+
+# (jours travaillés, début, fin) : profils de contrats
+SCHEDULE_TEMPLATES = [
+    ({0, 1, 2, 3, 4}, dt_time(6), dt_time(22)),
+    ({0, 1, 2, 3, 4, 5, 6}, dt_time(6), dt_time(23)),
+    ({2, 3, 4, 5, 6}, dt_time(14), dt_time(23)),
+    ({0, 1, 2, 3, 4, 5, 6}, dt_time(22), dt_time(6)),
+    ({0, 1, 3, 5}, dt_time(6), dt_time(14)),
+]
+
+def build_problem(staff_count, days, seed):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+
+    staff = {}
+    blocks = {}
+    for staff_id in range(staff_count):
+        staff[staff_id] = rng.choice(SCHEDULE_TEMPLATES)
+        # Environ un quart du personnel a une absence dans le mois
+        if rng.random() < 0.25:
+            absence_start = datetime.combine(start + timedelta(days=rng.randrange(days)), dt_time())
+            blocks[staff_id] = [(absence_start, absence_start + timedelta(days=rng.randint(1, 7)))]
+
+    shifts = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for shift_type, start_time, end_time, minimum in SHIFT_TEMPLATES:
+            shifts.append((f"{day}:{shift_type}", day, start_time, end_time, minimum, minimum + 4, []))
+    return staff, shifts, blocks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--staff', type=int, default=200)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--seed', type=int, default=42)
+    options = parser.parse_args()
+
+    staff, shifts, blocks = build_problem(options.staff, options.days, options.seed)
+    slots = sum(shift[4] for shift in shifts)
+    print("🗓️  Génération de planning")
+    print(f"   {options.staff} membres du personnel, {len(shifts)} équipes, {slots} places sur {options.days} jours")
+
+    started = time.perf_counter()
+    solver = RosterSolver(staff, shifts, blocks)
+    prepared = time.perf_counter()
+    solver.solve()
+    finished = time.perf_counter()
+
+    statistics = solver.statistics()
+    print(f"\nPréparation (éligibilité) : {prepared - started:.2f} s")
+    print(f"Résolution                : {finished - prepared:.2f} s")
+    print(f"Total                     : {finished - started:.2f} s")
+    print(f"\nAttributions              : {statistics['assignments']}")
+    print(f"Places non pourvues       : {statistics['unfilled_slots']}")
+    print(f"Personnel affecté         : {statistics['staff_assigned']}")
+    print(
+        f"Heures par personne       : min={statistics['min_hours']:.0f} moy={statistics['mean_hours']:.1f} "
+        f"max={statistics['max_hours']:.0f} écart-type={statistics['stdev_hours']:.1f}"
+    )
+
+if __name__ == '__main__':
+    main()